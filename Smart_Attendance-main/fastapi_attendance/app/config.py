@@ -0,0 +1,93 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Runtime configuration, read from the environment or a local ``.env`` file."""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite:///./attendance.db"
+
+    # Connection pool (QueuePool for both SQLite files and Postgres)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+
+    # Applied to every SQLite connection on connect
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kib: int = 64 * 1024
+
+    resolution_cache_size: int = 10000
+
+    # Minimum attendance percentage for exam eligibility
+    attendance_threshold_percent: float = 75.0
+
+    # Cached GET responses (class_attendance, od_requests, bus_sync) with ETags.
+    # Only writes through this process invalidate them: set 0, which also stops
+    # ETags and 304s, when running several workers or writing to the DB directly
+    read_cache_size: int = 1000
+
+    # Verified bearer tokens; entries also expire at the token's own exp
+    token_cache_size: int = 10000
+    token_cache_ttl_seconds: int = 300
+
+    # Password hashing: bcrypt cost, concurrent hashes, and waiting requests
+    # before logins are turned away with 503
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 32
+    password_hash_retry_after_seconds: int = 2
+
+    # BLE boarding inference: window length, trailing windows averaged, and the
+    # RSSI at which a student boards / alights (hysteresis band between them)
+    presence_window_seconds: int = 30
+    presence_smoothing_windows: int = 3
+    presence_enter_rssi: float = -75.0
+    presence_exit_rssi: float = -85.0
+    presence_min_boarded_seconds: int = 60
+    # Class that boarding marks present, matched to students by roll number
+    transport_class_name: str = "Transport"
+
+    # BLE sighting retention: syncs older than ble_raw_retention_days are
+    # compacted into per-minute RSSI summaries, which are dropped after
+    # ble_summary_retention_days (0 keeps them forever). The bus_sync rows
+    # themselves go once they are ble_sync_history_days old and purged (0
+    # keeps them forever). The compaction job runs every
+    # ble_compaction_interval_seconds (0 disables it) and handles at most
+    # ble_compaction_batch_syncs syncs per transaction.
+    ble_raw_retention_days: int = 7
+    ble_summary_retention_days: int = 365
+    ble_sync_history_days: int = 730
+    ble_compaction_interval_seconds: int = 3600
+    ble_compaction_batch_syncs: int = 50
+
+    # Idempotency-Key replay: how long a finished response is kept, the lease a
+    # running request holds on its key (renewed every third of it until the
+    # request ends; a retry may take over a lease left to lapse), replays kept
+    # in memory, the purge interval (0 disables the job), and the largest
+    # response body stored for replay
+    idempotency_ttl_seconds: int = 24 * 3600
+    idempotency_lock_seconds: int = 60
+    idempotency_cache_size: int = 10000
+    idempotency_purge_interval_seconds: int = 3600
+    idempotency_max_body_bytes: int = 1024 * 1024
+
+    # Per-route latency and SQL query metrics at /metrics; Server-Timing adds
+    # each request's query count and DB time to its response headers
+    metrics_enabled: bool = True
+    server_timing_header: bool = False
+
+    # Content-addressed upload store for face captures and OD attachments:
+    # directory, bytes per read/write, and the largest accepted file of each kind
+    upload_store_dir: str = "blobs"
+    upload_chunk_bytes: int = 1024 * 1024
+    face_upload_max_bytes: int = 5 * 1024 * 1024
+    od_upload_max_bytes: int = 10 * 1024 * 1024
+
+    # Length of the client TFLite face embeddings
+    face_embedding_dim: int = 512
+
+
+settings = Settings()
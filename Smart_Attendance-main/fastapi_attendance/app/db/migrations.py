@@ -0,0 +1,271 @@
+"""Versioned schema migrations.
+
+Each migration is a function registered with ``@migration(version, description)``
+and run once, in order, inside its own transaction. The applied version is
+kept in the single-row ``schema_version`` table. Every transaction first
+takes a database-wide lock (``BEGIN IMMEDIATE`` on SQLite, an advisory lock
+on PostgreSQL) and re-reads the version under it, so workers migrating at
+the same time never apply a step twice. Other databases get no lock:
+migrate them once, before starting the workers.
+
+A brand-new database is created straight from the models and stamped with the
+latest version. A database that predates this module (tables but no
+``schema_version``) is treated as ``BASELINE_VERSION``, the original
+``create_all`` schema, and upgraded from there. Migrations must tolerate
+objects that already exist, since baseline tables missing from an old
+database are created from the current models.
+
+Run ``python -m app.db.migrations`` to migrate without starting the API.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from .session import Base, engine
+from ..config import settings
+from ..models import models  # noqa: F401  (registers every table on Base.metadata)
+from ..services.attendance_summary import rebuild_summary
+
+MIGRATIONS = []
+
+# pg_advisory_xact_lock key held while migrating (any constant unique to this app)
+MIGRATION_LOCK_KEY = 0x5A77_E4DA
+# How long a SQLite worker waits for another's migration before giving up
+MIGRATION_LOCK_TIMEOUT_MS = 10 * 60 * 1000
+
+# The schema Base.metadata.create_all produced before migrations existed
+BASELINE_VERSION = 1
+BASELINE_TABLES = {
+    "students", "classes", "enrollments", "attendance",
+    "od_requests", "bus_sync", "student_ble_data", "users",
+}
+
+_version_table = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, nullable=False),
+)
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda item: item[0])
+        return fn
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else BASELINE_VERSION
+
+
+def _current_version(conn: Connection):
+    inspector = inspect(conn)
+    if inspector.has_table("schema_version"):
+        version = conn.execute(select(_version_table.c.version)).scalar()
+        if version is not None:
+            return version
+    if inspector.has_table("students"):
+        return BASELINE_VERSION
+    return None
+
+
+def _stamp(conn: Connection, version: int):
+    conn.execute(_version_table.delete())
+    conn.execute(_version_table.insert().values(version=version))
+
+
+@contextmanager
+def _locked(bind: Engine):
+    """A transaction that holds the database-wide migration lock from its first statement."""
+    with bind.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # Another worker's migration can outlast the usual busy timeout
+            conn.exec_driver_sql(f"PRAGMA busy_timeout={MIGRATION_LOCK_TIMEOUT_MS}")
+            conn.commit()
+        try:
+            with conn.begin():
+                if sqlite:
+                    # Takes the write lock before the first read, not on the first write
+                    conn.exec_driver_sql("BEGIN IMMEDIATE")
+                elif conn.dialect.name == "postgresql":
+                    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                yield conn
+        finally:
+            if sqlite:
+                conn.exec_driver_sql(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+                conn.commit()
+
+
+def run_migrations(bind: Engine = engine) -> int:
+    """Bring the database at ``bind`` up to the latest version and return it.
+
+    Each step reads the version under the migration lock, so when several
+    workers start at once one applies a migration and the rest wait, then
+    find it done.
+    """
+    while True:
+        with _locked(bind) as conn:
+            current = _current_version(conn)
+            _version_table.create(conn, checkfirst=True)
+            if current is None:
+                Base.metadata.create_all(conn)
+                _stamp(conn, latest_version())
+                return latest_version()
+            if not conn.execute(select(_version_table.c.version)).first():
+                baseline = [table for table in Base.metadata.sorted_tables if table.name in BASELINE_TABLES]
+                Base.metadata.create_all(conn, tables=baseline)
+                _stamp(conn, current)
+            pending = [(version, fn) for version, _description, fn in MIGRATIONS if version > current]
+            if not pending:
+                return current
+            version, fn = pending[0]
+            fn(conn)
+            _stamp(conn, version)
+
+
+def _create_indexes(conn: Connection, names):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+
+def _to_utc_naive(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _to_iso_date(value: str) -> str:
+    # OD dates were free-form form input; accept the formats the app has sent
+    for parse in (
+        lambda v: _to_utc_naive(v).date(),
+        lambda v: datetime.strptime(v, "%d/%m/%Y").date(),
+        lambda v: datetime.strptime(v, "%d-%m-%Y").date(),
+    ):
+        try:
+            return parse(value.strip()).isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised OD request date {value!r}; fix the row and re-run migrations")
+
+
+def _rewrite_sqlite_column(conn: Connection, table: str, column: str, convert, batch: int = 5000):
+    """Rewrite text values into the format SQLAlchemy's SQLite Date/DateTime types read back."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(f"SELECT id, {column} FROM {table} WHERE id > :last ORDER BY id LIMIT :batch"),
+            {"last": last_id, "batch": batch},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text(f"UPDATE {table} SET {column} = :value WHERE id = :id"),
+            [{"id": row_id, "value": convert(value)} for row_id, value in rows if value is not None],
+        )
+        last_id = rows[-1][0]
+
+
+@migration(2, "indexes for hot filters")
+def _hot_path_indexes(conn: Connection):
+    _create_indexes(conn, {
+        "ix_attendance_class_id_date",
+        "ix_enrollments_class_id",
+        "ix_student_ble_data_bus_sync_id",
+        "ix_bus_sync_sync_timestamp",
+        "ix_od_requests_status_id",
+        "ix_od_requests_roll_number_id",
+        "ix_od_requests_status_roll_number",
+        "ix_od_requests_date",
+    })
+
+
+@migration(3, "real Date/DateTime columns for sync and OD timestamps")
+def _temporal_columns(conn: Connection):
+    conversions = [
+        ("bus_sync", "sync_timestamp", "timestamp"),
+        ("student_ble_data", "timestamp", "timestamp"),
+        ("od_requests", "date", "date"),
+    ]
+    if conn.dialect.name == "sqlite":
+        # SQLite stores both types as text, so normalising the values is the migration
+        for table, column, kind in conversions:
+            if kind == "date":
+                convert = _to_iso_date
+            else:
+                convert = lambda value: _to_utc_naive(value).strftime("%Y-%m-%d %H:%M:%S.%f")
+            _rewrite_sqlite_column(conn, table, column, convert)
+        return
+    for table, column, kind in conversions:
+        if kind == "date":
+            using = f"{column}::date"
+            sql_type = "DATE"
+        else:
+            using = f"{column}::timestamptz AT TIME ZONE 'UTC'"
+            sql_type = "TIMESTAMP WITHOUT TIME ZONE"
+        conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {sql_type} USING {using}"))
+
+
+@migration(4, "face embeddings table")
+def _face_embeddings(conn: Connection):
+    models.FaceEmbedding.__table__.create(conn, checkfirst=True)
+
+
+@migration(5, "uploaded files manifest")
+def _uploaded_files(conn: Connection):
+    # Existing files are indexed by the first GET /list_uploads reconcile
+    models.UploadedFile.__table__.create(conn, checkfirst=True)
+
+
+@migration(6, "attendance summary table, backfilled from attendance")
+def _attendance_summary(conn: Connection):
+    models.AttendanceSummary.__table__.create(conn, checkfirst=True)
+    rebuild_summary(conn)
+
+
+@migration(7, "student roll numbers")
+def _student_roll_numbers(conn: Connection):
+    if "roll_number" not in {column["name"] for column in inspect(conn).get_columns("students")}:
+        conn.execute(text("ALTER TABLE students ADD COLUMN roll_number VARCHAR"))
+    _create_indexes(conn, {"ix_students_roll_number"})
+
+
+@migration(8, "BLE compaction: per-minute sighting summaries")
+def _ble_minutes(conn: Connection):
+    if "compacted_at" not in {column["name"] for column in inspect(conn).get_columns("bus_sync")}:
+        conn.execute(text("ALTER TABLE bus_sync ADD COLUMN compacted_at TIMESTAMP"))
+    models.StudentBLEMinute.__table__.create(conn, checkfirst=True)
+
+
+@migration(9, "idempotency_keys table")
+def _idempotency_keys(conn: Connection):
+    models.IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+@migration(10, "content-addressed upload store")
+def _blobs(conn: Connection):
+    models.Blob.__table__.create(conn, checkfirst=True)
+    for table, column in (("uploaded_files", "sha256"), ("od_requests", "attachment_sha256")):
+        if column not in {existing["name"] for existing in inspect(conn).get_columns(table)}:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} VARCHAR"))
+
+
+@migration(11, "replay idempotent response headers")
+def _idempotency_headers(conn: Connection):
+    if "headers" not in {column["name"] for column in inspect(conn).get_columns("idempotency_keys")}:
+        conn.execute(text("ALTER TABLE idempotency_keys ADD COLUMN headers VARCHAR"))
+
+
+@migration(12, "BLE summary purge stamp")
+def _ble_purged_at(conn: Connection):
+    if "purged_at" not in {column["name"] for column in inspect(conn).get_columns("bus_sync")}:
+        conn.execute(text("ALTER TABLE bus_sync ADD COLUMN purged_at TIMESTAMP"))
+    _create_indexes(conn, {"ix_bus_sync_purged_at_sync_timestamp"})
+
+
+if __name__ == "__main__":
+    print(f"schema at version {run_migrations()}")
@@ -1,16 +1,63 @@
-﻿from fastapi import FastAPI
+﻿import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI
 from .routers.enroll import router as enroll_router
 from .routers.attendance import router as attendance_router
 from .routers.upload import router as upload_router
 from .routers.od_requests import router as od_requests_router
 from .routers.bus_sync import router as bus_sync_router
 from .routers.auth import router as auth_router
-from .db.session import Base, engine
+from .routers.system import router as system_router
+from .routers.faces import router as faces_router
+from .routers.export import router as export_router
+from .routers.presence import router as presence_router
+from .routers.sync import router as sync_router
+from .db.session import async_engine
+from .db.migrations import run_migrations
+from .config import settings
+from .services.ble_retention import compaction_loop
+from .services.idempotency import IdempotencyMiddleware, purge_loop
+from .services.metrics import MetricsMiddleware
+from .services.upload_store import UploadLimitMiddleware
 
-app = FastAPI(title="Attendance API", version="1.0.0")
 
-# Ensure tables are created
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Periodic maintenance jobs; an interval of 0 turns a job off
+    jobs = [
+        asyncio.create_task(loop(interval))
+        for loop, interval in (
+            (compaction_loop, settings.ble_compaction_interval_seconds),
+            (purge_loop, settings.idempotency_purge_interval_seconds),
+        )
+        if interval > 0
+    ]
+    yield
+    for job in jobs:
+        job.cancel()
+        with suppress(asyncio.CancelledError):
+            await job
+    # Pooled async connections hold driver threads open until disposed
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Attendance API", version="1.0.0", lifespan=lifespan)
+
+# Bring the schema up to date before serving; workers starting together take
+# turns on the migration lock, so each step is applied once
+run_migrations()
+
+# Replays the stored response for a retried write that repeats its Idempotency-Key
+app.add_middleware(IdempotencyMiddleware)
+# Wraps IdempotencyMiddleware and every route (inside metrics, when enabled),
+# so an oversized upload is turned away before any of them reads it
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/upload_face": settings.face_upload_max_bytes,
+    "/od_requests": settings.od_upload_max_bytes,
+})
+# Added last so it is outermost and times everything above
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.server_timing_header)
 
 app.include_router(auth_router)
 app.include_router(enroll_router)
@@ -18,3 +65,8 @@ app.include_router(attendance_router)
 app.include_router(upload_router)
 app.include_router(od_requests_router)
 app.include_router(bus_sync_router)
+app.include_router(faces_router)
+app.include_router(export_router)
+app.include_router(presence_router)
+app.include_router(sync_router)
+app.include_router(system_router)
@@ -1,12 +1,14 @@
-﻿from sqlalchemy import Column, Integer, String, ForeignKey, Date, UniqueConstraint, Boolean
+﻿from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, UniqueConstraint, Boolean, Index, LargeBinary, Float
 from sqlalchemy.orm import relationship
 from ..db.session import Base
 
 class Student(Base):
     __tablename__ = "students"
+    __table_args__ = (Index("ix_students_roll_number", "roll_number", unique=True),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, nullable=False, index=True)
+    roll_number = Column(String, nullable=True)  # links BLE sightings to the student
 
     enrollments = relationship("Enrollment", back_populates="student")
 
@@ -20,7 +22,11 @@ class Class(Base):
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
-    __table_args__ = (UniqueConstraint("student_id", "class_id", name="uq_student_class"),)
+    __table_args__ = (
+        UniqueConstraint("student_id", "class_id", name="uq_student_class"),
+        # uq_student_class leads with student_id; class rosters need class_id first
+        Index("ix_enrollments_class_id", "class_id", "student_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
@@ -31,7 +37,10 @@ class Enrollment(Base):
 
 class Attendance(Base):
     __tablename__ = "attendance"
-    __table_args__ = (UniqueConstraint("student_id", "class_id", "date", name="uq_attendance"),)
+    __table_args__ = (
+        UniqueConstraint("student_id", "class_id", "date", name="uq_attendance"),
+        Index("ix_attendance_class_id_date", "class_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
@@ -39,39 +48,134 @@ class Attendance(Base):
     date = Column(Date, nullable=False)
     status = Column(String, nullable=False)  # 'present' or 'absent'
 
+class AttendanceSummary(Base):
+    """Running per-student, per-class attendance totals, kept in step with ``attendance``."""
+    __tablename__ = "attendance_summary"
+    __table_args__ = (
+        UniqueConstraint("student_id", "class_id", name="uq_attendance_summary"),
+        Index("ix_attendance_summary_class_id", "class_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    present_count = Column(Integer, nullable=False, default=0)  # 'present' and 'od' days
+    absent_count = Column(Integer, nullable=False, default=0)
+    first_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+
+class FaceEmbedding(Base):
+    __tablename__ = "face_embeddings"
+    __table_args__ = (Index("ix_face_embeddings_class_id_id", "class_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    roll_number = Column(String, nullable=False, index=True)
+    class_id = Column(Integer, ForeignKey("classes.id"), nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # L2-normalised float32 bytes
+    created_at = Column(DateTime, nullable=False)  # UTC
+
+class UploadedFile(Base):
+    """Manifest of files in the uploads directory, so listings never walk the folder."""
+    __tablename__ = "uploaded_files"
+    __table_args__ = (Index("ix_uploaded_files_student_roll_id", "student_roll", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    filename = Column(String, unique=True, nullable=False)
+    student_roll = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    modified = Column(DateTime, nullable=False)  # local time, as os.stat reports it
+    sha256 = Column(String, nullable=True)  # content in the upload store; NULL for a file in uploads/
+
+class Blob(Base):
+    """One stored upload body, named by its SHA-256 and shared by every row that references it."""
+    __tablename__ = "blobs"
+
+    sha256 = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False)  # UTC
+
 class ODRequest(Base):
     __tablename__ = "od_requests"
+    __table_args__ = (
+        # Keyset pagination walks id descending within the filtered range
+        Index("ix_od_requests_status_id", "status", "id"),
+        Index("ix_od_requests_roll_number_id", "roll_number", "id"),
+        Index("ix_od_requests_status_roll_number", "status", "roll_number", "id"),
+        Index("ix_od_requests_date", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     student_name = Column(String, nullable=False)
     roll_number = Column(String, nullable=False)
-    date = Column(String, nullable=False)  # Date for which OD is requested
+    date = Column(Date, nullable=False)  # Date for which OD is requested
     reason = Column(String, nullable=False)
     file_name = Column(String, nullable=True)  # Name of uploaded file
+    attachment_sha256 = Column(String, nullable=True)  # attachment content in the upload store
     status = Column(String, nullable=False, default="pending")  # 'pending', 'approved', 'rejected'
 
 class BusSync(Base):
     __tablename__ = "bus_sync"
+    __table_args__ = (
+        Index("ix_bus_sync_sync_timestamp", "sync_timestamp"),
+        Index("ix_bus_sync_purged_at_sync_timestamp", "purged_at", "sync_timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     driver_id = Column(String, nullable=False)
     bus_route = Column(String, nullable=False)
-    sync_timestamp = Column(String, nullable=False)  # ISO timestamp
+    sync_timestamp = Column(DateTime, nullable=False)  # UTC
     student_count = Column(Integer, nullable=False)
-    student_data = Column(String, nullable=True)  # JSON string of student data
+    student_data = Column(String, nullable=True)  # legacy JSON copy of the sightings; no longer written
+    compacted_at = Column(DateTime, nullable=True)  # UTC; raw sightings replaced by per-minute rows
+    purged_at = Column(DateTime, nullable=True)  # UTC; per-minute rows deleted past summary retention
 
 class StudentBLEData(Base):
     __tablename__ = "student_ble_data"
+    __table_args__ = (Index("ix_student_ble_data_bus_sync_id", "bus_sync_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     roll_number = Column(String, nullable=False)
     device_name = Column(String, nullable=False)
     device_id = Column(String, nullable=False)
-    timestamp = Column(String, nullable=False)  # ISO timestamp
+    timestamp = Column(DateTime, nullable=False)  # UTC
     rssi = Column(Integer, nullable=False)
     is_online = Column(String, nullable=False)  # 'true' or 'false' as string
     bus_sync_id = Column(Integer, nullable=True)  # Foreign key to bus_sync
 
+class StudentBLEMinute(Base):
+    """Per-student, per-minute RSSI summary that replaces raw sightings once a sync is compacted."""
+    __tablename__ = "student_ble_minutes"
+    __table_args__ = (Index("ix_student_ble_minutes_bus_sync_id", "bus_sync_id"),)
+
+    id = Column(Integer, primary_key=True)
+    bus_sync_id = Column(Integer, nullable=False)
+    roll_number = Column(String, nullable=False)
+    device_name = Column(String, nullable=False)
+    device_id = Column(String, nullable=False)
+    minute = Column(DateTime, nullable=False)  # UTC, start of the minute
+    rssi_min = Column(Integer, nullable=False)
+    rssi_max = Column(Integer, nullable=False)
+    rssi_mean = Column(Float, nullable=False)
+    sightings = Column(Integer, nullable=False)
+    online_sightings = Column(Integer, nullable=False)
+
+class IdempotencyKey(Base):
+    """A write request's Idempotency-Key and, once it finished, the response to replay."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+        {"sqlite_with_rowid": False},
+    )
+
+    key = Column(LargeBinary, primary_key=True)  # 16-byte digest of caller and key
+    fingerprint = Column(LargeBinary, nullable=False)  # 8-byte digest of method, path and query
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is running
+    content_type = Column(String, nullable=True)  # only set on responses stored before headers were
+    headers = Column(String, nullable=True)  # JSON [[name, value], ...] of the response, latin-1
+    body = Column(LargeBinary, nullable=True)
+    expires_at = Column(DateTime, nullable=False)  # UTC; lease while running, TTL once complete
+
 class User(Base):
     __tablename__ = "users"
 
@@ -1,12 +1,37 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import Date, String, literal, select
 from sqlalchemy.orm import Session
-from datetime import date
+from typing import Optional
+from datetime import date, timedelta
 from ..db.session import SessionLocal
-from ..models.models import Student, Class, Attendance, Enrollment
-from ..schemas.schemas import MarkAttendanceRequest, ClassAttendanceResponse, AttendanceRecord
+from ..db.upsert import dialect_insert
+from ..config import settings
+from ..models.models import Student, Class, Attendance, Enrollment, AttendanceSummary
+from ..services.attendance_summary import apply_changes, previous_statuses
+from ..services.read_cache import read_cache
+from ..services.resolution import resolution_cache
+from ..schemas.schemas import (
+    MarkAttendanceRequest,
+    ClassAttendanceResponse,
+    AttendanceRecord,
+    BulkMarkAttendanceRequest,
+    BulkMarkAttendanceResponse,
+    BulkAttendanceResult,
+    AttendanceSummaryRecord,
+    AttendanceSummaryResponse,
+    ClassAttendanceGridResponse,
+)
 
 router = APIRouter()
 
+# Rows per INSERT statement; keeps bulk writes under SQLite's bound-parameter limit
+UPSERT_CHUNK_SIZE = 500
+
+# Longest span GET /class_attendance/range will build a grid for
+MAX_RANGE_DAYS = 366
+# Grid cell characters: index i in the status legend is written as GRID_CODES[i]
+GRID_CODES = "0123456789abcdefghijklmnopqrstuvwxyz"
+
 
 def get_db():
     db = SessionLocal()
@@ -16,36 +41,162 @@ def get_db():
         db.close()
 
 
+def _upsert_from(db: Session, pair_query, on: date, status: str) -> bool:
+    """Upsert the attendance row for the (student_id, class_id) selected by ``pair_query``.
+
+    The ids are checked by the INSERT ... SELECT itself, so callers can pass
+    cached ids and learn from a ``False`` return that they were stale.
+    """
+    source = pair_query.add_columns(literal(on, Date()), literal(status, String()))
+    stmt = dialect_insert(db, Attendance).from_select(["student_id", "class_id", "date", "status"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["student_id", "class_id", "date"],
+        set_={"status": stmt.excluded.status},
+    )
+    return db.execute(stmt).rowcount > 0
+
+
+def _upsert_tracked(db: Session, pair_for, student_id: int, class_id: int, on: date, status: str) -> bool:
+    """``_upsert_from`` that also applies the change to the attendance summary."""
+    previous = previous_statuses(db, class_id, on, [student_id]).get(student_id)
+    if not _upsert_from(db, pair_for(student_id, class_id), on, status):
+        return False
+    apply_changes(db, class_id, on, {student_id: (previous, status)})
+    return True
+
+
+def _enrollment_pair(student_id: int, class_id: int):
+    return select(Enrollment.student_id, Enrollment.class_id).where(
+        Enrollment.student_id == student_id,
+        Enrollment.class_id == class_id,
+    )
+
+
+def _existing_pair(student_id: int, class_id: int):
+    return select(Student.id, Class.id).join(Class, Class.id == class_id).where(Student.id == student_id)
+
+
+def _resolve_ids(db: Session, student_name: str, class_name: str):
+    return resolution_cache.student_id(db, student_name), resolution_cache.class_id(db, class_name)
+
+
+def _write_with_cached_ids(db: Session, req: MarkAttendanceRequest, pair_for):
+    """Try the write with cached ids, re-resolving once from the database if it misses.
+
+    Returns ``None`` when the student or class does not exist, otherwise whether
+    ``pair_for`` matched and the row was written.
+    """
+    student_id, class_id = _resolve_ids(db, req.student_name, req.class_name)
+    if student_id is not None and class_id is not None:
+        if _upsert_tracked(db, pair_for, student_id, class_id, req.date, req.status):
+            return True
+    resolution_cache.forget_students([req.student_name])
+    resolution_cache.forget_class(req.class_name)
+    student_id, class_id = _resolve_ids(db, req.student_name, req.class_name)
+    if student_id is None or class_id is None:
+        return None
+    return _upsert_tracked(db, pair_for, student_id, class_id, req.date, req.status)
+
+
 @router.post("/mark_attendance")
 def mark_attendance(req: MarkAttendanceRequest, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.name == req.student_name).first()
-    clazz = db.query(Class).filter(Class.name == req.class_name).first()
-
-    if not student or not clazz:
+    written = _write_with_cached_ids(db, req, _enrollment_pair)
+    if written is None:
         raise HTTPException(status_code=404, detail="Student or Class not found. Enroll first.")
-
-    enrolled = db.query(Enrollment).filter(Enrollment.student_id == student.id, Enrollment.class_id == clazz.id).first()
-    if not enrolled:
+    if not written:
         raise HTTPException(status_code=400, detail="Student is not enrolled in this class")
 
-    record = db.query(Attendance).filter(
-        Attendance.student_id == student.id,
-        Attendance.class_id == clazz.id,
-        Attendance.date == req.date,
-    ).first()
+    db.commit()
+    read_cache.bump("attendance")
+    return {"message": "Attendance marked"}
+
+
+def upsert_attendance(db: Session, rows: list[dict]) -> None:
+    """Write attendance rows in one statement, updating status on ``uq_attendance`` conflicts."""
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = dialect_insert(db, Attendance).values(rows[start:start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["student_id", "class_id", "date"],
+            set_={"status": stmt.excluded.status},
+        )
+        db.execute(stmt)
+
+
+def _resolve_roll_call(db: Session, class_name: str, names):
+    class_id = resolution_cache.class_id(db, class_name)
+    if class_id is None:
+        return None, {}, set()
+    student_ids = resolution_cache.student_ids(db, names)
+    enrolled = {
+        student_id
+        for (student_id,) in db.query(Enrollment.student_id).filter(
+            Enrollment.class_id == class_id,
+            Enrollment.student_id.in_(student_ids.values()),
+        )
+    }
+    return class_id, student_ids, enrolled
+
+
+def mark_roll_call(db: Session, class_name: str, on: date, statuses: dict) -> Optional[dict]:
+    """Upsert one class's roll call (student name -> status) for ``on`` without committing.
 
-    if record:
-        record.status = req.status
-    else:
-        record = Attendance(student_id=student.id, class_id=clazz.id, date=req.date, status=req.status)
-        db.add(record)
+    Returns each name's outcome ('marked', 'student_not_found' or
+    'not_enrolled'), or ``None`` when the class does not exist.
+    """
+    class_id, student_ids, enrolled = _resolve_roll_call(db, class_name, statuses.keys())
+    suspects = [name for name, student_id in student_ids.items() if student_id not in enrolled]
+    if class_id is None or suspects:
+        # Cached ids may be stale; resolve the class and unmatched names afresh once
+        resolution_cache.forget_class(class_name)
+        resolution_cache.forget_students(suspects)
+        class_id, student_ids, enrolled = _resolve_roll_call(db, class_name, statuses.keys())
+    if class_id is None:
+        return None
 
+    previous = previous_statuses(db, class_id, on, enrolled) if enrolled else {}
+    rows = []
+    changes = {}
+    outcomes = {}
+    for name, status in statuses.items():
+        student_id = student_ids.get(name)
+        if student_id is None:
+            outcomes[name] = "student_not_found"
+        elif student_id not in enrolled:
+            outcomes[name] = "not_enrolled"
+        else:
+            outcomes[name] = "marked"
+            rows.append({"student_id": student_id, "class_id": class_id, "date": on, "status": status})
+            changes[student_id] = (previous.get(student_id), status)
+
+    upsert_attendance(db, rows)
+    apply_changes(db, class_id, on, changes)
+    return outcomes
+
+
+@router.post("/mark_attendance/bulk", response_model=BulkMarkAttendanceResponse)
+def mark_attendance_bulk(req: BulkMarkAttendanceRequest, db: Session = Depends(get_db)):
+    # Last entry wins when a student appears twice in the same roll call
+    statuses = {entry.student_name: entry.status for entry in req.entries}
+    outcomes = mark_roll_call(db, req.class_name, req.date, statuses)
+    if outcomes is None:
+        raise HTTPException(status_code=404, detail="Class not found. Enroll first.")
     db.commit()
-    return {"message": "Attendance marked"}
+    read_cache.bump("attendance")
+
+    results = [
+        BulkAttendanceResult(student_name=entry.student_name, status=entry.status, outcome=outcomes[entry.student_name])
+        for entry in req.entries
+    ]
+    marked = sum(outcome == "marked" for outcome in outcomes.values())
+    return BulkMarkAttendanceResponse(class_name=req.class_name, date=req.date, marked=marked, results=results)
 
 
 @router.get("/class_attendance", response_model=ClassAttendanceResponse)
-def class_attendance(class_name: str, on: date, db: Session = Depends(get_db)):
+def class_attendance(request: Request, class_name: str, on: date, db: Session = Depends(get_db)):
+    cached = read_cache.lookup(request, "attendance")
+    if cached.response:
+        return cached.response
+
     clazz = db.query(Class).filter(Class.name == class_name).first()
     if not clazz:
         raise HTTPException(status_code=404, detail="Class not found")
@@ -65,27 +216,141 @@ def class_attendance(class_name: str, on: date, db: Session = Depends(get_db)):
         for att, student in rows
     ]
 
-    return ClassAttendanceResponse(class_name=class_name, records=records)
+    return read_cache.store(cached, ClassAttendanceResponse(class_name=class_name, records=records))
 
-@router.put("/attendance/update")
-def update_attendance_status(req: MarkAttendanceRequest, db: Session = Depends(get_db)):
-    student = db.query(Student).filter(Student.name == req.student_name).first()
-    clazz = db.query(Class).filter(Class.name == req.class_name).first()
+@router.get("/class_attendance/range", response_model=ClassAttendanceGridResponse)
+def class_attendance_range(
+    class_name: str,
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: Session = Depends(get_db),
+):
+    """Students x dates attendance for a class, as a packed columnar grid.
 
-    if not student or not clazz:
-        raise HTTPException(status_code=404, detail="Student or Class not found")
+    ``grid[i][j]`` is the status of ``students[i]`` on ``dates[j]``: ``'.'``
+    when nothing was marked, otherwise the base-36 index into ``statuses``.
+    """
+    days = (to_date - from_date).days + 1
+    if days < 1:
+        raise HTTPException(status_code=400, detail="'to' must not be before 'from'")
+    if days > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_RANGE_DAYS} days")
+    class_id = resolution_cache.class_id(db, class_name)
+    if class_id is None:
+        raise HTTPException(status_code=404, detail="Class not found")
 
-    record = db.query(Attendance).filter(
-        Attendance.student_id == student.id,
-        Attendance.class_id == clazz.id,
-        Attendance.date == req.date,
-    ).first()
+    # One pass over the roster, left-joined to its attendance in the range
+    rows = db.query(Student.id, Student.name, Attendance.date, Attendance.status).select_from(Enrollment).join(
+        Student, Student.id == Enrollment.student_id
+    ).outerjoin(
+        Attendance,
+        (Attendance.student_id == Enrollment.student_id)
+        & (Attendance.class_id == Enrollment.class_id)
+        & Attendance.date.between(from_date, to_date),
+    ).filter(Enrollment.class_id == class_id).all()
 
-    if record:
-        record.status = req.status
-    else:
-        record = Attendance(student_id=student.id, class_id=clazz.id, date=req.date, status=req.status)
-        db.add(record)
+    names = {}
+    cells = {}
+    statuses = []
+    codes = {}
+    for student_id, name, on, status in rows:
+        row = cells.get(student_id)
+        if row is None:
+            row = cells[student_id] = bytearray(b"." * days)
+            names[student_id] = name
+        if on is None:
+            continue
+        code = codes.get(status)
+        if code is None:
+            if len(statuses) == len(GRID_CODES):
+                raise HTTPException(status_code=500, detail="Too many distinct attendance statuses to pack")
+            code = codes[status] = ord(GRID_CODES[len(statuses)])
+            statuses.append(status)
+        row[(on - from_date).days] = code
+
+    # Sorted here rather than in SQL, so the query needs no temporary sort
+    order = sorted(cells, key=lambda student_id: (names[student_id], student_id))
+    return ClassAttendanceGridResponse(
+        class_name=class_name,
+        from_date=from_date,
+        to_date=to_date,
+        students=[names[student_id] for student_id in order],
+        dates=[from_date + timedelta(days=offset) for offset in range(days)],
+        statuses=statuses,
+        grid=[cells[student_id].decode("ascii") for student_id in order],
+    )
+
+@router.put("/attendance/update")
+def update_attendance_status(req: MarkAttendanceRequest, db: Session = Depends(get_db)):
+    if not _write_with_cached_ids(db, req, _existing_pair):
+        raise HTTPException(status_code=404, detail="Student or Class not found")
 
     db.commit()
+    read_cache.bump("attendance")
     return {"message": "Attendance updated successfully"}
+
+
+def _summary_records(rows, threshold: float) -> list[AttendanceSummaryRecord]:
+    records = []
+    for summary, student_name, class_name in rows:
+        counted = summary.present_count + summary.absent_count
+        percentage = round(100 * summary.present_count / counted, 2) if counted else None
+        records.append(AttendanceSummaryRecord(
+            student_name=student_name,
+            class_name=class_name,
+            present_count=summary.present_count,
+            absent_count=summary.absent_count,
+            percentage=percentage,
+            eligible=percentage is None or percentage >= threshold,
+            first_date=summary.first_date,
+            last_date=summary.last_date,
+        ))
+    return records
+
+
+def _summary_query(db: Session):
+    return db.query(AttendanceSummary, Student.name, Class.name).join(
+        Student, Student.id == AttendanceSummary.student_id
+    ).join(Class, Class.id == AttendanceSummary.class_id)
+
+
+@router.get("/attendance/summary/student", response_model=AttendanceSummaryResponse)
+def student_summary(student_name: str, class_name: Optional[str] = None, db: Session = Depends(get_db)):
+    student_id = resolution_cache.student_id(db, student_name)
+    if student_id is None:
+        raise HTTPException(status_code=404, detail="Student not found")
+    query = _summary_query(db).filter(AttendanceSummary.student_id == student_id)
+    if class_name:
+        query = query.filter(Class.name == class_name)
+    threshold = settings.attendance_threshold_percent
+    return AttendanceSummaryResponse(threshold=threshold, records=_summary_records(query.all(), threshold))
+
+
+@router.get("/attendance/summary/class", response_model=AttendanceSummaryResponse)
+def class_summary(class_name: str, db: Session = Depends(get_db)):
+    class_id = resolution_cache.class_id(db, class_name)
+    if class_id is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+    query = _summary_query(db).filter(AttendanceSummary.class_id == class_id).order_by(Student.name)
+    threshold = settings.attendance_threshold_percent
+    return AttendanceSummaryResponse(threshold=threshold, records=_summary_records(query.all(), threshold))
+
+
+@router.get("/attendance/summary/below_threshold", response_model=AttendanceSummaryResponse)
+def below_threshold_summary(
+    class_name: Optional[str] = None,
+    threshold: Optional[float] = Query(None, ge=0, le=100),
+    db: Session = Depends(get_db),
+):
+    """Students whose attendance is under ``threshold`` percent (the configured rule by default)."""
+    if threshold is None:
+        threshold = settings.attendance_threshold_percent
+    counted = AttendanceSummary.present_count + AttendanceSummary.absent_count
+    query = _summary_query(db).filter(counted > 0, AttendanceSummary.present_count * 100 < threshold * counted)
+    if class_name:
+        class_id = resolution_cache.class_id(db, class_name)
+        if class_id is None:
+            raise HTTPException(status_code=404, detail="Class not found")
+        query = query.filter(AttendanceSummary.class_id == class_id)
+    query = query.order_by(Class.name, Student.name)
+    return AttendanceSummaryResponse(threshold=threshold, records=_summary_records(query.all(), threshold))
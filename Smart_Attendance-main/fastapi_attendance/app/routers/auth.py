@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from ..db.session import SessionLocal
+from ..config import settings
+from ..db.session import AsyncSessionLocal, SessionLocal
 from ..models.models import User
 from ..schemas.schemas import UserCreate, UserLogin, TokenResponse
+from ..services.password_hasher import PasswordHasherBusy, password_hasher, pwd_context
+from ..services.token_cache import CachedUser, token_cache
 import os
 
 router = APIRouter()
@@ -16,9 +20,6 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Security
 security = HTTPBearer()
 
@@ -29,6 +30,11 @@ def get_db():
     finally:
         db.close()
 
+# Login and register hash on the event loop's behalf, so they use the async session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -48,12 +54,27 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress, try again shortly",
+        headers={"Retry-After": str(settings.password_hash_retry_after_seconds)},
+    )
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    # End the read transaction so no pooled connection is held while bcrypt runs
+    await db.commit()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash:
+        # Stored with an outdated bcrypt cost; upgrade it while we have the password
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
@@ -62,31 +83,42 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    token = credentials.credentials
+    # A cached token was verified when stored and its entry expires by the token's exp
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
+    generation = token_cache.generation(username)
     user = get_user_by_username(db, username=username)
     if user is None:
         raise credentials_exception
-    return user
+    return token_cache.put(token, user, payload.get("exp"), generation)
 
 @router.post("/auth/register", response_model=TokenResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    db_user = get_user_by_username(db, username=user.username)
-    if db_user:
+    result = await db.execute(select(User.id).where(User.username == user.username))
+    if result.first():
         raise HTTPException(
             status_code=400,
             detail="Username already registered"
         )
+    await db.commit()
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     db_user = User(
         username=user.username,
         hashed_password=hashed_password,
@@ -96,8 +128,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -114,8 +145,11 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/auth/login", response_model=TokenResponse)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    authenticated_user = authenticate_user(db, user.username, user.password)
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    try:
+        authenticated_user = await authenticate_user(db, user.username, user.password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
     if not authenticated_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -144,7 +178,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     )
 
 @router.get("/auth/validate")
-def validate_token(current_user: User = Depends(get_current_user)):
+def validate_token(current_user: CachedUser = Depends(get_current_user)):
     return {
         "valid": True,
         "username": current_user.username,
@@ -153,7 +187,7 @@ def validate_token(current_user: User = Depends(get_current_user)):
     }
 
 @router.get("/auth/me")
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: CachedUser = Depends(get_current_user)):
     return {
         "username": current_user.username,
         "role": current_user.role,
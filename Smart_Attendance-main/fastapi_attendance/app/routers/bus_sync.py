@@ -1,69 +1,193 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from datetime import datetime
-from ..db.session import SessionLocal
-from ..models.models import BusSync, StudentBLEData
-from ..schemas.schemas import BusSyncRequest, BusSyncResponse
-import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timezone
+from ..db.session import AsyncSessionLocal
+from ..models.models import BusSync, StudentBLEData, StudentBLEMinute
+from ..schemas.schemas import BusSyncHeader, BusSyncRequest, BusSyncResponse, StudentBLEDataRequest
+from ..services.read_cache import read_cache
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Sightings validated and inserted per chunk by the NDJSON stream endpoint
+STREAM_CHUNK_ROWS = 500
+# A single NDJSON record larger than this is rejected rather than buffered
+MAX_NDJSON_LINE_BYTES = 64 * 1024
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO timestamp into the naive UTC datetime the DateTime columns store."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_timestamps(values: list[str]) -> list[datetime]:
+    """Parse a batch of ISO timestamps, converting each distinct string only once."""
+    parsed = {value: _parse_timestamp(value) for value in set(values)}
+    return [parsed[value] for value in values]
+
+
+def _ble_rows(students: list[StudentBLEDataRequest], bus_sync_id: int) -> list[dict]:
+    seen_at = _parse_timestamps([student.timestamp for student in students])
+    return [
+        {
+            "roll_number": student.roll_number,
+            "device_name": student.device_name,
+            "device_id": student.device_id,
+            "timestamp": timestamp,
+            "rssi": student.rssi,
+            "is_online": "true" if student.is_online else "false",
+            "bus_sync_id": bus_sync_id,
+        }
+        for student, timestamp in zip(students, seen_at)
+    ]
+
 
 @router.post("/bus_sync", response_model=BusSyncResponse)
-async def sync_bus_data(sync_data: BusSyncRequest, db: Session = Depends(get_db)):
+async def sync_bus_data(sync_data: BusSyncRequest, db: AsyncSession = Depends(get_db)):
     try:
-        # Create bus sync record
+        sync_timestamp = _parse_timestamp(sync_data.timestamp)
+
+        # Create bus sync record; flushing assigns its id without committing.
+        # Sightings live only in student_ble_data, not as a JSON copy on the sync.
         bus_sync = BusSync(
             driver_id=sync_data.driver_id,
             bus_route=sync_data.bus_route,
-            sync_timestamp=datetime.fromisoformat(sync_data.timestamp.replace('Z', '+00:00')),
+            sync_timestamp=sync_timestamp,
             student_count=len(sync_data.students),
-            student_data=json.dumps([student.dict() for student in sync_data.students])
         )
-        
         db.add(bus_sync)
-        db.commit()
-        db.refresh(bus_sync)
-        
-        # Process individual student BLE data
-        for student_data in sync_data.students:
-            student_ble = StudentBLEData(
-                roll_number=student_data.roll_number,
-                device_name=student_data.device_name,
-                device_id=student_data.device_id,
-                timestamp=datetime.fromisoformat(student_data.timestamp.replace('Z', '+00:00')),
-                rssi=student_data.rssi,
-                is_online=student_data.is_online,
-                bus_sync_id=bus_sync.id
-            )
-            db.add(student_ble)
-        
-        db.commit()
-        
+        await db.flush()
+
+        # Insert every BLE sighting with a single executemany in the same transaction.
+        # Building thousands of row dicts is CPU work, so keep it off the event loop.
+        rows = await run_in_threadpool(_ble_rows, sync_data.students, bus_sync.id)
+        if rows:
+            await db.execute(insert(StudentBLEData.__table__), rows)
+
+        await db.commit()
+        read_cache.bump("bus_sync")
+
+        return BusSyncResponse(
+            sync_id=bus_sync.id,
+            driver_id=bus_sync.driver_id,
+            bus_route=bus_sync.bus_route,
+            student_count=bus_sync.student_count,
+            sync_timestamp=bus_sync.sync_timestamp.isoformat(),
+            message="Bus data synced successfully"
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid timestamp: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to sync bus data: {str(e)}")
+
+async def _iter_ndjson(request: Request):
+    """Yield non-empty lines of the request body without buffering more than one record."""
+    pending = b""
+    async for chunk in request.stream():
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        # Complete lines count too: one large chunk can carry an oversized record whole
+        if any(len(line) > MAX_NDJSON_LINE_BYTES for line in lines) or len(pending) > MAX_NDJSON_LINE_BYTES:
+            raise HTTPException(status_code=413, detail="NDJSON record too large")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+async def _discard_partial_sync(db: AsyncSession, bus_sync_id: int):
+    await db.rollback()
+    await db.execute(delete(StudentBLEData).where(StudentBLEData.bus_sync_id == bus_sync_id))
+    await db.execute(delete(BusSync).where(BusSync.id == bus_sync_id))
+    await db.commit()
+    read_cache.bump("bus_sync")
+
+
+@router.post("/bus_sync/stream", response_model=BusSyncResponse)
+async def sync_bus_data_stream(request: Request, db: AsyncSession = Depends(get_db)):
+    """Ingest a bus sync sent as newline-delimited JSON.
+
+    The first line is a ``BusSyncHeader``; every following line is one
+    ``StudentBLEDataRequest``. Sightings are validated and committed in chunks
+    of ``STREAM_CHUNK_ROWS`` as they arrive, so memory stays bounded however
+    long the trip was.
+    """
+    lines = _iter_ndjson(request)
+    line_number = 1
+    bus_sync = None
+    try:
+        header_line = await anext(lines, None)
+        if header_line is None:
+            raise HTTPException(status_code=400, detail="Empty bus sync stream")
+        header = BusSyncHeader.model_validate_json(header_line)
+
+        bus_sync = BusSync(
+            driver_id=header.driver_id,
+            bus_route=header.bus_route,
+            sync_timestamp=_parse_timestamp(header.timestamp),
+            student_count=0,
+        )
+        db.add(bus_sync)
+        await db.commit()
+        read_cache.bump("bus_sync")
+
+        chunk = []
+        async for line in lines:
+            line_number += 1
+            chunk.append(StudentBLEDataRequest.model_validate_json(line))
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                await db.execute(insert(StudentBLEData.__table__), _ble_rows(chunk, bus_sync.id))
+                bus_sync.student_count += len(chunk)
+                await db.commit()
+                read_cache.bump("bus_sync")
+                chunk = []
+        if chunk:
+            await db.execute(insert(StudentBLEData.__table__), _ble_rows(chunk, bus_sync.id))
+            bus_sync.student_count += len(chunk)
+            await db.commit()
+            read_cache.bump("bus_sync")
+
         return BusSyncResponse(
             sync_id=bus_sync.id,
             driver_id=bus_sync.driver_id,
             bus_route=bus_sync.bus_route,
             student_count=bus_sync.student_count,
-            sync_timestamp=bus_sync.sync_timestamp,
+            sync_timestamp=bus_sync.sync_timestamp.isoformat(),
             message="Bus data synced successfully"
         )
-    
+
     except Exception as e:
+        # Chunks are committed as they arrive, so drop whatever was stored for a failed stream
+        if bus_sync is not None and bus_sync.id is not None:
+            await _discard_partial_sync(db, bus_sync.id)
+        if isinstance(e, HTTPException):
+            raise
+        if isinstance(e, ValidationError):
+            raise HTTPException(status_code=422, detail=f"Invalid record on line {line_number}: {str(e)}")
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=f"Invalid timestamp on line {line_number}: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to sync bus data: {str(e)}")
 
 @router.get("/bus_sync")
-async def get_bus_sync_history(db: Session = Depends(get_db)):
+async def get_bus_sync_history(request: Request, db: AsyncSession = Depends(get_db)):
+    cached = read_cache.lookup(request, "bus_sync")
+    if cached.response:
+        return cached.response
     try:
-        sync_records = db.query(BusSync).order_by(BusSync.sync_timestamp.desc()).limit(50).all()
+        result = await db.execute(select(BusSync).order_by(BusSync.sync_timestamp.desc()).limit(50))
+        sync_records = result.scalars().all()
         
-        return {
+        return read_cache.store(cached, {
             "sync_records": [
                 {
                     "id": record.id,
@@ -74,30 +198,54 @@ async def get_bus_sync_history(db: Session = Depends(get_db)):
                 }
                 for record in sync_records
             ]
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch bus sync history: {str(e)}")
 
+def _raw_student(student: StudentBLEData) -> dict:
+    return {
+        "roll_number": student.roll_number,
+        "device_name": student.device_name,
+        "device_id": student.device_id,
+        "timestamp": student.timestamp.isoformat(),
+        "rssi": student.rssi,
+        "is_online": student.is_online,
+    }
+
+def _compacted_student(row: StudentBLEMinute) -> dict:
+    """A per-minute summary in the raw sighting shape, plus its aggregates."""
+    return {
+        "roll_number": row.roll_number,
+        "device_name": row.device_name,
+        "device_id": row.device_id,
+        "timestamp": row.minute.isoformat(),
+        "rssi": round(row.rssi_mean),
+        "is_online": "true" if row.online_sightings else "false",
+        "rssi_min": row.rssi_min,
+        "rssi_max": row.rssi_max,
+        "sightings": row.sightings,
+        "compacted": True,
+    }
+
 @router.get("/bus_sync/{sync_id}/students")
-async def get_sync_students(sync_id: int, db: Session = Depends(get_db)):
+async def get_sync_students(sync_id: int, db: AsyncSession = Depends(get_db)):
+    """Sightings for one sync: raw rows, or per-minute summaries once the sync is compacted."""
     try:
-        students = db.query(StudentBLEData).filter(StudentBLEData.bus_sync_id == sync_id).all()
-        
+        compacted_at = await db.scalar(select(BusSync.compacted_at).where(BusSync.id == sync_id))
+        if compacted_at is None:
+            result = await db.execute(select(StudentBLEData).where(StudentBLEData.bus_sync_id == sync_id))
+            students = [_raw_student(student) for student in result.scalars()]
+        else:
+            result = await db.execute(
+                select(StudentBLEMinute)
+                .where(StudentBLEMinute.bus_sync_id == sync_id)
+                .order_by(StudentBLEMinute.minute)
+            )
+            students = [_compacted_student(row) for row in result.scalars()]
+
         return {
             "sync_id": sync_id,
-            "students": [
-                {
-                    "roll_number": student.roll_number,
-                    "device_name": student.device_name,
-                    "device_id": student.device_id,
-                    "timestamp": student.timestamp.isoformat(),
-                    "rssi": student.rssi,
-                    "is_online": student.is_online,
-                }
-                for student in students
-            ]
+            "students": students,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch sync students: {str(e)}")
-
-
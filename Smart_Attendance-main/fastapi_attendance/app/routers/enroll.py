@@ -1,13 +1,24 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from ..db.session import SessionLocal, engine, Base
+from typing import Optional
+from itertools import islice
+import csv
+import io
+from ..db.session import SessionLocal
+from ..db.upsert import dialect_insert
 from ..models.models import Student, Class, Enrollment
-from ..schemas.schemas import EnrollRequest, EnrollResponse
+from ..schemas.schemas import EnrollImportError, EnrollImportResponse, EnrollRequest, EnrollResponse
+from ..services.resolution import resolution_cache
 
 router = APIRouter()
 
-# Ensure tables exist
-Base.metadata.create_all(bind=engine)
+# CSV rows parsed, written and committed together by POST /enroll/import
+IMPORT_CHUNK_ROWS = 5000
+# Errors listed in the import response; the rest are only counted
+MAX_IMPORT_ERROR_SAMPLES = 100
+IMPORT_COLUMNS = ("student_name", "class_name")
 
 
 def get_db():
@@ -18,13 +29,92 @@ def get_db():
         db.close()
 
 
+def _invalidate_resolution(req: EnrollRequest):
+    resolution_cache.forget_students([req.student_name])
+    resolution_cache.forget_class(req.class_name)
+
+
+def enroll_many(db: Session, reqs: list[EnrollRequest]) -> list[tuple[str, Optional[int]]]:
+    """Enroll every request with a handful of queries, without committing.
+
+    Returns ``(outcome, student_id)`` per request, in order; the outcome is
+    'enrolled', 'already_enrolled' or 'roll_number_conflict' (the roll
+    number belongs to another student, who keeps it).
+    """
+    names = {req.student_name for req in reqs}
+    students = {student.name: student for student in db.query(Student).filter(Student.name.in_(names))}
+    rolls = {req.roll_number for req in reqs if req.roll_number}
+    roll_owners = dict(
+        db.query(Student.roll_number, Student.name).filter(Student.roll_number.in_(rolls))
+    ) if rolls else {}
+    class_names = {req.class_name for req in reqs}
+    classes = {clazz.name: clazz for clazz in db.query(Class).filter(Class.name.in_(class_names))}
+
+    accepted = []
+    new_rolls = {}  # Student -> roll number it moves to
+    for req in reqs:
+        if req.roll_number and roll_owners.get(req.roll_number, req.student_name) != req.student_name:
+            accepted.append(False)
+            continue
+        student = students.get(req.student_name)
+        if student is None:
+            student = students[req.student_name] = Student(name=req.student_name)
+            db.add(student)
+        current = new_rolls.get(student, student.roll_number)
+        if req.roll_number and current != req.roll_number:
+            # The student's old roll number is free for later requests in the batch
+            roll_owners.pop(current, None)
+            new_rolls[student] = req.roll_number
+            roll_owners[req.roll_number] = req.student_name
+        if req.class_name not in classes:
+            classes[req.class_name] = Class(name=req.class_name)
+            db.add(classes[req.class_name])
+        accepted.append(True)
+    if new_rolls:
+        # Old numbers are cleared first, so one changing hands within the batch
+        # is never held twice when the unique index checks it
+        for student in new_rolls:
+            student.roll_number = None
+        db.flush()
+        for student, roll_number in new_rolls.items():
+            student.roll_number = roll_number
+    db.flush()
+
+    student_ids = {students[req.student_name].id for req, ok in zip(reqs, accepted) if ok}
+    enrolled = set(
+        db.query(Enrollment.student_id, Enrollment.class_id).filter(Enrollment.student_id.in_(student_ids))
+    ) if student_ids else set()
+    results = []
+    for req, ok in zip(reqs, accepted):
+        if not ok:
+            results.append(("roll_number_conflict", None))
+            continue
+        pair = (students[req.student_name].id, classes[req.class_name].id)
+        if pair in enrolled:
+            results.append(("already_enrolled", pair[0]))
+        else:
+            db.add(Enrollment(student_id=pair[0], class_id=pair[1]))
+            enrolled.add(pair)
+            results.append(("enrolled", pair[0]))
+    db.flush()
+    return results
+
+
 @router.post("/enroll", response_model=EnrollResponse)
 def enroll(req: EnrollRequest, db: Session = Depends(get_db)):
     student = db.query(Student).filter(Student.name == req.student_name).first()
     if not student:
         student = Student(name=req.student_name)
         db.add(student)
+    if req.roll_number and student.roll_number != req.roll_number:
+        student.roll_number = req.roll_number
+    try:
         db.flush()
+    except IntegrityError:
+        db.rollback()
+        if not req.roll_number:
+            raise
+        raise HTTPException(status_code=409, detail="Roll number already belongs to another student")
 
     clazz = db.query(Class).filter(Class.name == req.class_name).first()
     if not clazz:
@@ -38,9 +128,171 @@ def enroll(req: EnrollRequest, db: Session = Depends(get_db)):
     ).first()
     if existing:
         db.commit()
+        _invalidate_resolution(req)
         return EnrollResponse(student_id=student.id, class_id=clazz.id, message="Already enrolled")
 
     enrollment = Enrollment(student_id=student.id, class_id=clazz.id)
     db.add(enrollment)
     db.commit()
+    _invalidate_resolution(req)
     return EnrollResponse(student_id=student.id, class_id=clazz.id, message="Enrolled successfully")
+
+
+class _ImportTotals:
+    def __init__(self):
+        self.rows = 0
+        self.students_created = 0
+        self.classes_created = 0
+        self.enrollments_created = 0
+        self.enrollments_existing = 0
+        self.errors = 0
+        self.error_samples = []
+
+    def error(self, line: int, detail: str):
+        self.errors += 1
+        if len(self.error_samples) < MAX_IMPORT_ERROR_SAMPLES:
+            self.error_samples.append(EnrollImportError(line=line, detail=detail))
+
+    def add(self, other: "_ImportTotals"):
+        self.students_created += other.students_created
+        self.classes_created += other.classes_created
+        self.enrollments_created += other.enrollments_created
+        self.enrollments_existing += other.enrollments_existing
+        for sample in sorted(other.error_samples, key=lambda sample: sample.line):
+            self.error(sample.line, sample.detail)
+        # Errors past the sample cap were counted but not listed
+        self.errors += other.errors - len(other.error_samples)
+
+
+def _clean(value) -> str:
+    return (value or "").strip()
+
+
+def _import_chunk(db: Session, chunk: list[tuple[int, dict]], totals: _ImportTotals):
+    """Validate one chunk of CSV rows, then write it with three set-based upserts.
+
+    Counts go to ``totals``, which the caller keeps only if the chunk commits.
+    """
+    rows = []
+    for line, record in chunk:
+        name, class_name = _clean(record.get("student_name")), _clean(record.get("class_name"))
+        if not name or not class_name:
+            totals.error(line, "student_name and class_name are required")
+            continue
+        rows.append((line, name, class_name, _clean(record.get("roll_number")) or None))
+    if not rows:
+        return
+
+    names = {name for _, name, _, _ in rows}
+    known_students = {name for (name,) in db.query(Student.name).filter(Student.name.in_(names))}
+    rolls = {roll for _, _, _, roll in rows if roll}
+    roll_owners = dict(
+        db.query(Student.roll_number, Student.name).filter(Student.roll_number.in_(rolls))
+    ) if rolls else {}
+    held = {name: roll for roll, name in roll_owners.items()}
+
+    # Same rule as POST /enroll: a roll number moves onto the named student
+    # unless another student already holds it, and the one it replaces is freed
+    students = {}
+    accepted = []
+    for line, name, class_name, roll in rows:
+        if roll and roll_owners.get(roll, name) != name:
+            totals.error(line, f"Roll number {roll} already belongs to another student")
+            continue
+        if roll:
+            roll_owners.pop(held.get(name), None)
+            roll_owners[roll] = name
+            held[name] = roll
+        if roll or name not in students:
+            students[name] = roll
+        accepted.append((name, class_name))
+    if not accepted:
+        return
+
+    # Free the numbers being moved first, as enroll_many does, so one changing
+    # hands within the chunk is never held twice when the unique index checks it
+    moving = [name for name, roll in students.items() if roll and name in known_students]
+    if moving:
+        db.execute(update(Student).where(Student.name.in_(moving)).values(roll_number=None))
+
+    # Core executemany: the statement is compiled once, not once per row
+    students_table = Student.__table__
+    stmt = dialect_insert(db, students_table)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"roll_number": func.coalesce(stmt.excluded.roll_number, students_table.c.roll_number)},
+        ),
+        [{"name": name, "roll_number": roll} for name, roll in students.items()],
+    )
+    totals.students_created += len(students.keys() - known_students)
+
+    class_names = {class_name for _, class_name in accepted}
+    known_classes = {name for (name,) in db.query(Class.name).filter(Class.name.in_(class_names))}
+    new_classes = class_names - known_classes
+    if new_classes:
+        db.execute(
+            dialect_insert(db, Class.__table__).on_conflict_do_nothing(),
+            [{"name": name} for name in new_classes],
+        )
+    totals.classes_created += len(new_classes)
+
+    student_ids = dict(db.execute(select(Student.name, Student.id).where(Student.name.in_(students))).all())
+    class_ids = dict(db.execute(select(Class.name, Class.id).where(Class.name.in_(class_names))).all())
+    pairs = {(student_ids[name], class_ids[class_name]) for name, class_name in accepted}
+    created = db.execute(
+        dialect_insert(db, Enrollment.__table__).on_conflict_do_nothing(index_elements=["student_id", "class_id"]),
+        [{"student_id": sid, "class_id": cid} for sid, cid in pairs],
+    ).rowcount
+    totals.enrollments_created += created
+    totals.enrollments_existing += len(accepted) - created
+
+    resolution_cache.forget_students(students)
+    for class_name in class_names:
+        resolution_cache.forget_class(class_name)
+
+
+@router.post("/enroll/import", response_model=EnrollImportResponse)
+def import_enrollments(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Enroll every row of a CSV with ``student_name``, ``class_name`` and optional ``roll_number`` columns.
+
+    The upload is read as a stream and applied ``IMPORT_CHUNK_ROWS`` rows at a
+    time, one transaction per chunk. Rows already enrolled count as existing,
+    so re-running an import, or finishing one that stopped part way, is safe.
+    Invalid rows are counted and skipped.
+    """
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.DictReader(text)
+        missing = [column for column in IMPORT_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"CSV is missing columns: {', '.join(missing)}")
+
+        totals = _ImportTotals()
+        records = ((reader.line_num, record) for record in reader)
+        while chunk := list(islice(records, IMPORT_CHUNK_ROWS)):
+            totals.rows += len(chunk)
+            chunk_totals = _ImportTotals()
+            try:
+                _import_chunk(db, chunk, chunk_totals)
+                db.commit()
+                totals.add(chunk_totals)
+            except IntegrityError:
+                # A concurrent enrollment took a name or roll number; only this chunk is lost
+                db.rollback()
+                for line, _ in chunk:
+                    totals.error(line, "Conflicted with a concurrent write; import the row again")
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV: {e}")
+    finally:
+        text.detach()
+
+    return EnrollImportResponse(
+        rows=totals.rows,
+        students_created=totals.students_created,
+        classes_created=totals.classes_created,
+        enrollments_created=totals.enrollments_created,
+        enrollments_existing=totals.enrollments_existing,
+        errors=totals.errors,
+        error_samples=totals.error_samples,
+    )
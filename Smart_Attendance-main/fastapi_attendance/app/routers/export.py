@@ -0,0 +1,156 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from datetime import date
+from ..db.session import SessionLocal
+from ..models.models import Attendance, Class, Student
+from ..services.resolution import resolution_cache
+import csv
+import io
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional; CSV needs nothing extra
+    pa = None
+    pq = None
+
+router = APIRouter()
+
+# Rows fetched per round trip, and per CSV chunk / Parquet row group
+EXPORT_BATCH_ROWS = 5000
+
+EXPORT_COLUMNS = ["class_name", "student_name", "date", "status"]
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _export_query(class_id: Optional[int], date_from: Optional[date], date_to: Optional[date]):
+    query = select(Class.name, Student.name, Attendance.date, Attendance.status).join(
+        Class, Class.id == Attendance.class_id
+    ).join(Student, Student.id == Attendance.student_id)
+    if class_id is not None:
+        query = query.where(Attendance.class_id == class_id)
+    if date_from:
+        query = query.where(Attendance.date >= date_from)
+    if date_to:
+        query = query.where(Attendance.date <= date_to)
+    # Matches ix_attendance_class_id_date, so rows stream in index order without a sort
+    return query.order_by(Attendance.class_id, Attendance.date)
+
+
+def _batches(query):
+    """Yield lists of at most ``EXPORT_BATCH_ROWS`` rows from a streaming cursor.
+
+    The session lives inside the generator: the response outlives the request
+    dependencies, so a ``Depends(get_db)`` session would already be closed.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(stream_results=True, yield_per=EXPORT_BATCH_ROWS))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _csv_stream(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in _batches(query):
+        writer.writerows((class_name, student, on.isoformat(), status) for class_name, student, on, status in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands everything written so far to the response on ``drain``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_stream(query):
+    schema = pa.schema([
+        ("class_name", pa.string()),
+        ("student_name", pa.string()),
+        ("date", pa.date32()),
+        ("status", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in _batches(query):
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+@router.get("/export/attendance")
+def export_attendance(
+    format: str = Query("csv", pattern="^(csv|parquet)$"),
+    class_name: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """Stream attendance joined to student and class names, one batch at a time.
+
+    Memory stays at one batch whatever the row count. ``format=parquet``
+    writes one row group per batch and needs ``pyarrow`` installed.
+    """
+    class_id = None
+    if class_name:
+        class_id = resolution_cache.class_id(db, class_name)
+        if class_id is None:
+            raise HTTPException(status_code=404, detail="Class not found")
+    query = _export_query(class_id, date_from, date_to)
+
+    if format == "parquet":
+        if pq is None:
+            raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+        return StreamingResponse(
+            _parquet_stream(query),
+            media_type="application/vnd.apache.parquet",
+            headers={"Content-Disposition": 'attachment; filename="attendance.parquet"'},
+        )
+    return StreamingResponse(
+        _csv_stream(query),
+        media_type="text/csv",
+        headers={"Content-Disposition": 'attachment; filename="attendance.csv"'},
+    )
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from ..db.session import SessionLocal
+from ..models.models import FaceEmbedding
+from ..services.face_index import face_index, normalize
+from ..services.resolution import resolution_cache
+from ..schemas.schemas import (
+    FaceEmbeddingRequest,
+    FaceEmbeddingResponse,
+    IdentifyFaceRequest,
+    IdentifyFaceResponse,
+    FaceMatch,
+    FaceCandidate,
+)
+
+router = APIRouter()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _class_id(db: Session, class_name: str) -> int:
+    class_id = resolution_cache.class_id(db, class_name)
+    if class_id is None:
+        raise HTTPException(status_code=404, detail="Class not found")
+    return class_id
+
+
+@router.post("/face_embeddings", response_model=FaceEmbeddingResponse)
+def store_face_embeddings(req: FaceEmbeddingRequest, db: Session = Depends(get_db)):
+    class_id = _class_id(db, req.class_name)
+    try:
+        vectors = normalize(req.embeddings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    created_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.execute(insert(FaceEmbedding.__table__), [
+        {
+            "roll_number": req.roll_number,
+            "class_id": class_id,
+            "vector": vector.tobytes(),
+            "created_at": created_at,
+        }
+        for vector in vectors
+    ])
+    # The next search of the class reads the committed rows into its matrix
+    db.commit()
+
+    return FaceEmbeddingResponse(
+        roll_number=req.roll_number,
+        class_name=req.class_name,
+        stored=len(vectors),
+        message="Face embeddings stored",
+    )
+
+
+@router.post("/identify_face", response_model=IdentifyFaceResponse)
+def identify_face(req: IdentifyFaceRequest, db: Session = Depends(get_db)):
+    """Match every face in the request against the class in one batched search."""
+    class_id = _class_id(db, req.class_name)
+    try:
+        queries = normalize(req.embeddings)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    matches = []
+    for ranked in face_index.search(db, class_id, queries, req.top_k):
+        candidates = [FaceCandidate(roll_number=roll, score=score) for roll, score in ranked]
+        best = candidates[0] if candidates and candidates[0].score >= req.min_score else None
+        matches.append(FaceMatch(
+            roll_number=best.roll_number if best else None,
+            score=best.score if best else None,
+            candidates=candidates,
+        ))
+    return IdentifyFaceResponse(class_name=req.class_name, matches=matches)
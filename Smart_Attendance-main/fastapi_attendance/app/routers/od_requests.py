@@ -1,24 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Query, Request
+from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
-from ..db.session import SessionLocal
-from ..models.models import ODRequest
-from ..schemas.schemas import ODRequestResponse, ODRequestUpdate
-import os
+from ..config import settings
+from ..db.session import AsyncSessionLocal
+from ..models.models import Attendance, Enrollment, ODRequest, Student
+from ..schemas.schemas import (
+    BulkODRequestUpdate,
+    BulkODRequestUpdateResponse,
+    ODRequestResponse,
+    ODRequestUpdate,
+)
+from ..services.attendance_summary import apply_transitions
+from ..services.read_cache import read_cache
+from ..services.upload_store import UploadTooLarge, store_upload
+from .attendance import upsert_attendance
 
 router = APIRouter()
 
-# Create od_uploads directory if it doesn't exist
-OD_UPLOAD_DIR = "od_uploads"
-if not os.path.exists(OD_UPLOAD_DIR):
-    os.makedirs(OD_UPLOAD_DIR)
+# Page size bounds for GET /od_requests
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Most OD requests PUT /od_requests/bulk updates in one transaction
+MAX_BULK_IDS = 1000
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+def _parse_od_date(value: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="OD date must be in YYYY-MM-DD format")
 
 @router.post("/od_requests", response_model=ODRequestResponse)
 async def create_od_request(
@@ -27,82 +44,199 @@ async def create_od_request(
     date: str = Form(...),
     reason: str = Form(...),
     file: UploadFile = File(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
+    od_date = _parse_od_date(date)
     try:
         # Save uploaded file if provided
         file_name = ""
+        attachment_sha256 = None
         if file and file.filename:
             file_name = f"od_{roll_number}_{date}_{file.filename}"
-            file_path = os.path.join(OD_UPLOAD_DIR, file_name)
-            
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            try:
+                blob = await store_upload(db, file, settings.od_upload_max_bytes)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            attachment_sha256 = blob.sha256
         
         # Create OD request record
         od_request = ODRequest(
             student_name=student_name,
             roll_number=roll_number,
-            date=date,
+            date=od_date,
             reason=reason,
             file_name=file_name,
+            attachment_sha256=attachment_sha256,
             status="pending"
         )
         
         db.add(od_request)
-        db.commit()
-        db.refresh(od_request)
+        await db.commit()
+        read_cache.bump("od_requests")
         
         return ODRequestResponse(
             id=od_request.id,
             student_name=od_request.student_name,
             roll_number=od_request.roll_number,
-            date=od_request.date,
+            date=od_request.date.isoformat(),
             reason=od_request.reason,
             file_name=od_request.file_name,
             status=od_request.status,
             message="OD request submitted successfully"
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create OD request: {str(e)}")
 
 @router.get("/od_requests")
-async def get_od_requests(db: Session = Depends(get_db)):
+async def get_od_requests(
+    request: Request,
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    roll_number: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """List OD requests newest first, one keyset page at a time.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next
+    page; it is ``None`` on the last page. The date range is inclusive.
+    """
+    cached = read_cache.lookup(request, "od_requests")
+    if cached.response:
+        return cached.response
     try:
-        requests = db.query(ODRequest).all()
-        return {
+        query = select(ODRequest)
+        if cursor is not None:
+            query = query.where(ODRequest.id < cursor)
+        if status:
+            query = query.where(ODRequest.status == status)
+        if roll_number:
+            query = query.where(ODRequest.roll_number == roll_number)
+        if date_from:
+            query = query.where(ODRequest.date >= date_from)
+        if date_to:
+            query = query.where(ODRequest.date <= date_to)
+
+        # Fetch one extra row to learn whether another page exists
+        result = await db.execute(query.order_by(ODRequest.id.desc()).limit(limit + 1))
+        requests = result.scalars().all()
+        has_more = len(requests) > limit
+        requests = requests[:limit]
+
+        return read_cache.store(cached, {
             "requests": [
                 {
                     "id": req.id,
                     "student_name": req.student_name,
                     "roll_number": req.roll_number,
-                    "date": req.date,
+                    "date": req.date.isoformat(),
                     "reason": req.reason,
                     "file_name": req.file_name,
                     "status": req.status
                 }
                 for req in requests
-            ]
-        }
+            ],
+            "next_cursor": requests[-1].id if has_more else None,
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch OD requests: {str(e)}")
 
+def _od_attendance(db: Session, od_ids: list[int]) -> int:
+    """Mark 'od' for each OD's student and date in every class they are enrolled in.
+
+    Students are matched by roll number. Returns the number of attendance
+    rows written; days already marked 'od' are left alone.
+    """
+    # Every (student, class, date) the ODs cover
+    targets = db.execute(
+        select(Enrollment.student_id, Enrollment.class_id, ODRequest.date)
+        .select_from(ODRequest)
+        .join(Student, Student.roll_number == ODRequest.roll_number)
+        .join(Enrollment, Enrollment.student_id == Student.id)
+        .where(ODRequest.id.in_(od_ids))
+        .distinct()
+    ).all()
+    if not targets:
+        return 0
+    # The statuses about to be replaced, locked like previous_statuses does
+    previous = {
+        (student_id, class_id, on): status
+        for student_id, class_id, on, status in db.execute(
+            select(Attendance.student_id, Attendance.class_id, Attendance.date, Attendance.status)
+            .join(Student, Student.id == Attendance.student_id)
+            .join(ODRequest, (ODRequest.roll_number == Student.roll_number) & (ODRequest.date == Attendance.date))
+            .where(ODRequest.id.in_(od_ids))
+            .with_for_update(of=Attendance)
+        )
+    }
+    changed = [target for target in targets if previous.get(tuple(target)) != "od"]
+    upsert_attendance(db, [
+        {"student_id": student_id, "class_id": class_id, "date": on, "status": "od"}
+        for student_id, class_id, on in changed
+    ])
+    apply_transitions(db, [
+        (student_id, class_id, on, previous.get((student_id, class_id, on)), "od")
+        for student_id, class_id, on in changed
+    ])
+    return len(changed)
+
+def _bulk_update(db: Session, od_ids: list[int], status: str) -> tuple[list[int], int]:
+    updated = db.scalars(
+        update(ODRequest).where(ODRequest.id.in_(od_ids)).values(status=status).returning(ODRequest.id)
+    ).all()
+    changed = _od_attendance(db, updated) if status == "approved" and updated else 0
+    return updated, changed
+
+# Registered before /od_requests/{request_id} so "bulk" is not read as an id
+@router.put("/od_requests/bulk", response_model=BulkODRequestUpdateResponse)
+async def bulk_update_od_requests(req: BulkODRequestUpdate, db: AsyncSession = Depends(get_db)):
+    """Approve or reject a set of OD requests, reconciling attendance in the same transaction.
+
+    Approving marks each student 'od' on the request's date in all of their
+    classes. Rejecting changes only the request. Unknown ids are listed in
+    ``not_found`` and do not fail the rest.
+    """
+    od_ids = list(dict.fromkeys(req.ids))
+    if len(od_ids) > MAX_BULK_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BULK_IDS} ids per request")
+    try:
+        updated, changed = await db.run_sync(_bulk_update, od_ids, req.status)
+        await db.commit()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to update OD requests: {str(e)}")
+    if updated:
+        read_cache.bump("od_requests")
+    if changed:
+        read_cache.bump("attendance")
+
+    found = set(updated)
+    return BulkODRequestUpdateResponse(
+        status=req.status,
+        updated=len(updated),
+        not_found=[od_id for od_id in od_ids if od_id not in found],
+        attendance_changed=changed,
+    )
+
 @router.put("/od_requests/{request_id}")
 async def update_od_request_status(
     request_id: int,
     update_data: ODRequestUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        od_request = db.query(ODRequest).filter(ODRequest.id == request_id).first()
+        od_request = await db.get(ODRequest, request_id)
         
         if not od_request:
             raise HTTPException(status_code=404, detail="OD request not found")
         
         od_request.status = update_data.status
-        db.commit()
+        await db.commit()
+        read_cache.bump("od_requests")
         
         return {
             "message": f"OD request {update_data.status} successfully",
@@ -116,9 +250,9 @@ async def update_od_request_status(
         raise HTTPException(status_code=500, detail=f"Failed to update OD request: {str(e)}")
 
 @router.get("/od_requests/{request_id}")
-async def get_od_request(request_id: int, db: Session = Depends(get_db)):
+async def get_od_request(request_id: int, db: AsyncSession = Depends(get_db)):
     try:
-        od_request = db.query(ODRequest).filter(ODRequest.id == request_id).first()
+        od_request = await db.get(ODRequest, request_id)
         
         if not od_request:
             raise HTTPException(status_code=404, detail="OD request not found")
@@ -127,7 +261,7 @@ async def get_od_request(request_id: int, db: Session = Depends(get_db)):
             "id": od_request.id,
             "student_name": od_request.student_name,
             "roll_number": od_request.roll_number,
-            "date": od_request.date,
+            "date": od_request.date.isoformat(),
             "reason": od_request.reason,
             "file_name": od_request.file_name,
             "status": od_request.status
@@ -0,0 +1,128 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from datetime import date, datetime, time, timedelta
+import numpy as np
+from ..config import settings
+from ..db.session import SessionLocal
+from ..models.models import BusSync, Enrollment, Student, StudentBLEData, StudentBLEMinute
+from ..services.attendance_summary import apply_changes, previous_statuses
+from ..services.presence import PresenceParams, infer_intervals
+from ..services.read_cache import read_cache
+from ..services.resolution import resolution_cache
+from ..schemas.schemas import BoardingIntervalRecord, PresenceAttendanceResponse, PresenceResponse
+from .attendance import upsert_attendance
+
+router = APIRouter()
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _route_sync_ids(db: Session, bus_route: str, on: date) -> list[int]:
+    day = datetime.combine(on, time.min)
+    return [
+        sync_id
+        for (sync_id,) in db.query(BusSync.id).filter(
+            BusSync.bus_route == bus_route,
+            BusSync.sync_timestamp >= day,
+            BusSync.sync_timestamp < day + timedelta(days=1),
+        )
+    ]
+
+
+def _presence(db: Session, sync_ids: list[int]):
+    """Sightings and boarding intervals; a compacted sync contributes one mean reading per minute."""
+    rows = db.query(
+        StudentBLEData.roll_number, StudentBLEData.timestamp, StudentBLEData.rssi, StudentBLEData.is_online
+    ).filter(StudentBLEData.bus_sync_id.in_(sync_ids)).all() if sync_ids else []
+    rows += db.query(
+        StudentBLEMinute.roll_number,
+        StudentBLEMinute.minute,
+        StudentBLEMinute.rssi_mean,
+        case((StudentBLEMinute.online_sightings > 0, "true"), else_="false"),
+    ).filter(StudentBLEMinute.bus_sync_id.in_(sync_ids)).all() if sync_ids else []
+    if not rows:
+        return 0, []
+    rolls, seen_at, rssi, online = zip(*rows)
+    intervals = infer_intervals(
+        rolls, np.array(seen_at, dtype="datetime64[us]"), rssi, np.asarray(online) == "true",
+        PresenceParams.from_settings(),
+    )
+    return len(rows), intervals
+
+
+def _presence_response(sync_ids, sightings, intervals, bus_route=None) -> PresenceResponse:
+    return PresenceResponse(
+        bus_route=bus_route,
+        sync_ids=sync_ids,
+        sightings=sightings,
+        intervals=[
+            BoardingIntervalRecord(
+                roll_number=interval.roll_number,
+                boarded_at=interval.boarded_at.isoformat(),
+                alighted_at=interval.alighted_at.isoformat(),
+            )
+            for interval in intervals
+        ],
+    )
+
+
+@router.get("/bus_sync/{sync_id}/presence", response_model=PresenceResponse)
+def sync_presence(sync_id: int, db: Session = Depends(get_db)):
+    """Boarding intervals inferred from one sync's BLE sightings."""
+    bus_route = db.query(BusSync.bus_route).filter(BusSync.id == sync_id).scalar()
+    if bus_route is None:
+        raise HTTPException(status_code=404, detail="Bus sync not found")
+    sightings, intervals = _presence(db, [sync_id])
+    return _presence_response([sync_id], sightings, intervals, bus_route)
+
+
+@router.get("/presence", response_model=PresenceResponse)
+def route_presence(bus_route: str, on: date, db: Session = Depends(get_db)):
+    """Boarding intervals across every sync a route uploaded on ``on`` (UTC day)."""
+    sync_ids = _route_sync_ids(db, bus_route, on)
+    sightings, intervals = _presence(db, sync_ids)
+    return _presence_response(sync_ids, sightings, intervals, bus_route)
+
+
+@router.post("/presence/attendance", response_model=PresenceAttendanceResponse)
+def mark_transport_attendance(bus_route: str, on: date, db: Session = Depends(get_db)):
+    """Mark every student who boarded the route on ``on`` present in the transport class.
+
+    Students are matched by roll number and must be enrolled in the class;
+    students who never boarded are left as they are.
+    """
+    class_name = settings.transport_class_name
+    class_id = resolution_cache.class_id(db, class_name)
+    if class_id is None:
+        raise HTTPException(status_code=404, detail=f"Transport class '{class_name}' not found. Enroll first.")
+
+    _, intervals = _presence(db, _route_sync_ids(db, bus_route, on))
+    boarded = {interval.roll_number for interval in intervals}
+    students = dict(
+        db.query(Student.roll_number, Student.id).join(
+            Enrollment, (Enrollment.student_id == Student.id) & (Enrollment.class_id == class_id)
+        ).filter(Student.roll_number.in_(boarded)).all()
+    ) if boarded else {}
+
+    previous = previous_statuses(db, class_id, on, students.values()) if students else {}
+    rows = [{"student_id": sid, "class_id": class_id, "date": on, "status": "present"} for sid in students.values()]
+    upsert_attendance(db, rows)
+    apply_changes(db, class_id, on, {sid: (previous.get(sid), "present") for sid in students.values()})
+    db.commit()
+    if rows:
+        read_cache.bump("attendance")
+
+    return PresenceAttendanceResponse(
+        class_name=class_name,
+        date=on,
+        boarded=len(boarded),
+        marked=len(rows),
+        unmatched_roll_numbers=sorted(boarded - students.keys()),
+    )
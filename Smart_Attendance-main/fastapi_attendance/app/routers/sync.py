@@ -0,0 +1,127 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..db.session import SessionLocal
+from ..models.models import ODRequest
+from ..schemas.schemas import (
+    SyncAttendanceOperation,
+    SyncBatchRequest,
+    SyncBatchResponse,
+    SyncEnrollmentOperation,
+    SyncODRequestOperation,
+    SyncOperationResult,
+)
+from ..services.read_cache import read_cache
+from ..services.resolution import resolution_cache
+from .attendance import mark_roll_call
+from .enroll import enroll_many
+
+router = APIRouter()
+
+# Largest batch applied in one transaction; clients split bigger queues
+MAX_BATCH_OPERATIONS = 1000
+# Outcomes that mean the operation was applied (or already had been)
+APPLIED_OUTCOMES = {"marked", "enrolled", "already_enrolled", "submitted"}
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _apply_enrollments(db: Session, ops: list[SyncEnrollmentOperation]) -> dict:
+    if not ops:
+        return {}
+    return {
+        op.local_key: SyncOperationResult(type=op.type, outcome=outcome, id=student_id)
+        for op, (outcome, student_id) in zip(ops, enroll_many(db, ops))
+    }
+
+
+def _apply_attendance(db: Session, ops: list[SyncAttendanceOperation]) -> dict:
+    """One roll call per (class, date); the last mark for a student on a day wins."""
+    roll_calls = {}
+    for op in ops:
+        roll_calls.setdefault((op.class_name, op.date), {})[op.student_name] = op.status
+    outcomes = {key: mark_roll_call(db, *key, statuses) for key, statuses in roll_calls.items()}
+    results = {}
+    for op in ops:
+        marked = outcomes[(op.class_name, op.date)]
+        outcome = "class_not_found" if marked is None else marked[op.student_name]
+        results[op.local_key] = SyncOperationResult(type=op.type, outcome=outcome)
+    return results
+
+
+def _apply_od_requests(db: Session, ops: list[SyncODRequestOperation]) -> dict:
+    if not ops:
+        return {}
+    ids = db.scalars(
+        insert(ODRequest).returning(ODRequest.id, sort_by_parameter_order=True),
+        [
+            {
+                "student_name": op.student_name,
+                "roll_number": op.roll_number,
+                "date": op.date,
+                "reason": op.reason,
+                "file_name": "",
+                "status": "pending",
+            }
+            for op in ops
+        ],
+    ).all()
+    return {
+        op.local_key: SyncOperationResult(type=op.type, outcome="submitted", id=od_id)
+        for op, od_id in zip(ops, ids)
+    }
+
+
+@router.post("/sync/batch", response_model=SyncBatchResponse)
+def sync_batch(req: SyncBatchRequest, db: Session = Depends(get_db)):
+    """Apply a device's queued attendance marks, enrollments and OD requests in one transaction.
+
+    Enrollments are applied first so attendance in the same batch can use
+    them. Every operation gets a result under its ``local_key``; one that
+    cannot be applied (unknown student, roll number taken, ...) is reported
+    there and does not fail the rest. OD requests are created without an
+    attachment; clients upload those with ``POST /od_requests``.
+    """
+    if len(req.operations) > MAX_BATCH_OPERATIONS:
+        raise HTTPException(status_code=422, detail=f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+    local_keys = [op.local_key for op in req.operations]
+    if len(set(local_keys)) != len(local_keys):
+        raise HTTPException(status_code=422, detail="local_key must be unique within a batch")
+
+    by_type = {"attendance": [], "enrollment": [], "od_request": []}
+    for op in req.operations:
+        by_type[op.type].append(op)
+
+    try:
+        results = _apply_enrollments(db, by_type["enrollment"])
+        results.update(_apply_attendance(db, by_type["attendance"]))
+        results.update(_apply_od_requests(db, by_type["od_request"]))
+        db.commit()
+    except IntegrityError:
+        # A concurrent writer took a name or roll number mid-batch; nothing was applied
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Batch conflicted with a concurrent write; retry it")
+    finally:
+        enrolled = by_type["enrollment"]
+        resolution_cache.forget_students([op.student_name for op in enrolled])
+        for class_name in {op.class_name for op in enrolled}:
+            resolution_cache.forget_class(class_name)
+
+    if any(result.outcome == "marked" for result in results.values()):
+        read_cache.bump("attendance")
+    if by_type["od_request"]:
+        read_cache.bump("od_requests")
+
+    applied = sum(result.outcome in APPLIED_OUTCOMES for result in results.values())
+    return SyncBatchResponse(
+        applied=applied,
+        failed=len(results) - applied,
+        results={key: results[key] for key in local_keys},
+    )
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+from ..config import settings
+from ..db.session import pool_stats
+from ..services.idempotency import idempotency_store
+from ..services.metrics import CONTENT_TYPE, metrics_registry
+from ..services.read_cache import read_cache
+from ..services.resolution import resolution_cache
+from ..services.token_cache import token_cache
+
+router = APIRouter()
+
+
+@router.get("/system/cache_stats")
+def cache_stats():
+    return {
+        "resolution": resolution_cache.stats(),
+        "tokens": token_cache.stats(),
+        "reads": read_cache.stats(),
+        "idempotency": idempotency_store.stats(),
+    }
+
+
+@router.get("/system/pool")
+def pool():
+    return pool_stats()
+
+
+@router.get("/metrics")
+def metrics():
+    """Per-route request counts, latency, SQL statements and DB time for a Prometheus scrape."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics_registry.render(), media_type=CONTENT_TYPE)
@@ -1,20 +1,125 @@
-from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from typing import Optional
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..config import settings
+from ..db.session import AsyncSessionLocal
+from ..db.upsert import dialect_insert
+from ..models.models import UploadedFile
+from ..services.upload_store import UploadTooLarge, blob_path, release_blob, store_upload
 import os
-import shutil
+import re
 from datetime import datetime
 
 router = APIRouter()
 
-# Create uploads directory if it doesn't exist
+# Page size bounds for GET /list_uploads
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Files saved here before the content store; still picked up by the manifest
 UPLOAD_DIR = "uploads"
 if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
+# Names written by upload_face: student_<roll>_<YYYYmmdd>_<HHMMSS>_<original name>
+_UPLOAD_NAME = re.compile(r"^student_(.+?)_\d{8}_\d{6}_")
+
+# Directory mtime at the last reconcile; None forces one on the first listing
+_scanned_mtime_ns = None
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _manifest_row(filename: str, stat: os.stat_result) -> dict:
+    match = _UPLOAD_NAME.match(filename)
+    return {
+        "filename": filename,
+        "student_roll": match.group(1) if match else "",
+        "size": stat.st_size,
+        "modified": datetime.fromtimestamp(stat.st_mtime),
+        "sha256": None,
+    }
+
+async def _record_uploads(db: AsyncSession, rows: list[dict]):
+    """Upsert manifest rows by filename, releasing the blob each overwritten row pointed at."""
+    replaced = await db.scalars(select(UploadedFile.sha256).where(
+        UploadedFile.filename.in_([row["filename"] for row in rows]),
+        UploadedFile.sha256.is_not(None),
+    ))
+    for sha256 in replaced.all():
+        await release_blob(db, sha256)
+    stmt = dialect_insert(db, UploadedFile)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["filename"],
+        set_={"size": stmt.excluded.size, "modified": stmt.excluded.modified, "sha256": stmt.excluded.sha256},
+    )
+    await db.execute(stmt, rows)
+
+def _scan_new_files(known: set[str]) -> tuple[set[str], list[dict]]:
+    """One ``os.scandir`` pass; only files missing from the manifest are stat'ed."""
+    present = set()
+    added = []
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            present.add(entry.name)
+            if entry.name not in known:
+                added.append(_manifest_row(entry.name, entry.stat()))
+    return present, added
+
+async def _reconcile_manifest(db: AsyncSession):
+    """Bring the manifest in line with files added or removed outside the API.
+
+    Adding, removing or renaming a file changes the directory's mtime, so the
+    folder is only rescanned when that differs from the last reconcile. Rows
+    backed by the content store (``sha256`` set) have no file in the folder
+    and are left alone here; ``_drop_missing_blobs`` checks them page by page.
+    """
+    global _scanned_mtime_ns
+    # Read before scanning, so a change made mid-scan triggers another pass
+    mtime_ns = os.stat(UPLOAD_DIR).st_mtime_ns
+    if mtime_ns == _scanned_mtime_ns:
+        return
+    rows = (await db.execute(select(UploadedFile.filename, UploadedFile.sha256))).all()
+    known = {filename for filename, _ in rows}
+    present, added = await run_in_threadpool(_scan_new_files, known)
+    missing = {filename for filename, sha256 in rows if sha256 is None} - present
+    if missing:
+        await db.execute(delete(UploadedFile).where(UploadedFile.filename.in_(missing)))
+    if added:
+        await _record_uploads(db, added)
+    await db.commit()
+    _scanned_mtime_ns = mtime_ns
+
+def _missing_blobs(sha256s: set[str]) -> set[str]:
+    return {sha256 for sha256 in sha256s if not os.path.exists(blob_path(sha256))}
+
+async def _drop_missing_blobs(db: AsyncSession, files: list[UploadedFile]) -> bool:
+    """Delete the rows among ``files`` whose stored blob is gone, releasing each reference.
+
+    Only the page about to be returned is checked, so a listing costs at most
+    one ``stat`` per row it shows. Returns whether any row was deleted.
+    """
+    missing = await run_in_threadpool(_missing_blobs, {upload.sha256 for upload in files if upload.sha256})
+    gone = [upload for upload in files if upload.sha256 in missing]
+    if not gone:
+        return False
+    for upload in gone:
+        await release_blob(db, upload.sha256)
+    await db.execute(delete(UploadedFile).where(UploadedFile.id.in_([upload.id for upload in gone])))
+    await db.commit()
+    return True
+
 @router.post("/upload_face")
 async def upload_face(
     image: UploadFile = File(...),
-    student_roll: str = Form(...)
+    student_roll: str = Form(...),
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         # Validate file type
@@ -24,46 +129,85 @@ async def upload_face(
         # Generate unique filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"student_{student_roll}_{timestamp}_{image.filename}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
+
+        # Save the file (once per distinct content) and list it under its upload name
+        try:
+            blob = await store_upload(db, image, settings.face_upload_max_bytes)
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        await _record_uploads(db, [{
+            "filename": filename,
+            "student_roll": student_roll,
+            "size": blob.size,
+            "modified": datetime.now(),
+            "sha256": blob.sha256,
+        }])
+        await db.commit()
+
         return JSONResponse(
             status_code=200,
             content={
                 "message": "Image uploaded successfully",
                 "filename": filename,
                 "student_roll": student_roll,
-                "file_size": os.path.getsize(file_path),
+                "file_size": blob.size,
+                "sha256": blob.sha256,
                 "upload_time": timestamp
             }
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @router.get("/list_uploads")
-async def list_uploads():
+async def list_uploads(
+    cursor: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    student_roll: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """List uploaded files newest first from the manifest, one keyset page at a time.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page; it
+    is ``None`` on the last page.
+    """
     try:
         if not os.path.exists(UPLOAD_DIR):
-            return {"uploads": []}
-        
-        files = []
-        for filename in os.listdir(UPLOAD_DIR):
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            if os.path.isfile(file_path):
-                files.append({
-                    "filename": filename,
-                    "size": os.path.getsize(file_path),
-                    "modified": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-                })
-        
-        return {"uploads": files}
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to list uploads: {str(e)}")
+            return {"uploads": [], "next_cursor": None}
+
+        await _reconcile_manifest(db)
 
+        query = select(UploadedFile)
+        if cursor is not None:
+            query = query.where(UploadedFile.id < cursor)
+        if student_roll:
+            query = query.where(UploadedFile.student_roll == student_roll)
 
+        # Fetch one extra row to learn whether another page exists; refetch
+        # if rows had to be dropped for blobs deleted outside the API
+        while True:
+            result = await db.execute(query.order_by(UploadedFile.id.desc()).limit(limit + 1))
+            files = result.scalars().all()
+            if not await _drop_missing_blobs(db, files):
+                break
+        has_more = len(files) > limit
+        files = files[:limit]
 
+        return {
+            "uploads": [
+                {
+                    "id": upload.id,
+                    "filename": upload.filename,
+                    "student_roll": upload.student_roll,
+                    "size": upload.size,
+                    "modified": upload.modified.isoformat()
+                }
+                for upload in files
+            ],
+            "next_cursor": files[-1].id if has_more else None,
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to list uploads: {str(e)}")
@@ -1,21 +1,56 @@
 ﻿from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Optional, Union
 from datetime import date
 
 class EnrollRequest(BaseModel):
     student_name: str = Field(min_length=1)
     class_name: str = Field(min_length=1)
+    roll_number: Optional[str] = Field(None, min_length=1)
 
 class EnrollResponse(BaseModel):
     student_id: int
     class_id: int
     message: str
 
+class EnrollImportError(BaseModel):
+    line: int  # 1-based line in the CSV, header included
+    detail: str
+
+class EnrollImportResponse(BaseModel):
+    rows: int
+    students_created: int
+    classes_created: int
+    enrollments_created: int
+    enrollments_existing: int
+    errors: int
+    error_samples: list[EnrollImportError]  # the first few errors only
+
 class MarkAttendanceRequest(BaseModel):
     student_name: str
     class_name: str
     date: date
     status: str  # 'present' | 'absent'
 
+class BulkAttendanceEntry(BaseModel):
+    student_name: str
+    status: str  # 'present' | 'absent'
+
+class BulkMarkAttendanceRequest(BaseModel):
+    class_name: str
+    date: date
+    entries: list[BulkAttendanceEntry]
+
+class BulkAttendanceResult(BaseModel):
+    student_name: str
+    status: str
+    outcome: str  # 'marked' | 'student_not_found' | 'not_enrolled'
+
+class BulkMarkAttendanceResponse(BaseModel):
+    class_name: str
+    date: date
+    marked: int
+    results: list[BulkAttendanceResult]
+
 class AttendanceRecord(BaseModel):
     student_name: str
     class_name: str
@@ -26,6 +61,29 @@ class ClassAttendanceResponse(BaseModel):
     class_name: str
     records: list[AttendanceRecord]
 
+class ClassAttendanceGridResponse(BaseModel):
+    class_name: str
+    from_date: date
+    to_date: date
+    students: list[str]
+    dates: list[date]
+    statuses: list[str]  # legend: grid character str(i) (base 36) is statuses[i]
+    grid: list[str]  # one string per student, one character per date, '.' = not marked
+
+class AttendanceSummaryRecord(BaseModel):
+    student_name: str
+    class_name: str
+    present_count: int  # includes 'od' days
+    absent_count: int
+    percentage: Optional[float]  # None until a present or absent day is recorded
+    eligible: bool
+    first_date: Optional[date]
+    last_date: Optional[date]
+
+class AttendanceSummaryResponse(BaseModel):
+    threshold: float
+    records: list[AttendanceSummaryRecord]
+
 class ODRequestResponse(BaseModel):
     id: int
     student_name: str
@@ -39,6 +97,16 @@ class ODRequestResponse(BaseModel):
 class ODRequestUpdate(BaseModel):
     status: str  # 'approved' or 'rejected'
 
+class BulkODRequestUpdate(BaseModel):
+    ids: list[int] = Field(min_length=1)
+    status: Literal["approved", "rejected"]
+
+class BulkODRequestUpdateResponse(BaseModel):
+    status: str
+    updated: int
+    not_found: list[int]
+    attendance_changed: int  # attendance rows newly set to 'od'
+
 class StudentBLEDataRequest(BaseModel):
     roll_number: str
     device_name: str
@@ -47,10 +115,12 @@ class StudentBLEDataRequest(BaseModel):
     rssi: int
     is_online: bool
 
-class BusSyncRequest(BaseModel):
+class BusSyncHeader(BaseModel):
     driver_id: str
     bus_route: str
     timestamp: str
+
+class BusSyncRequest(BusSyncHeader):
     students: list[StudentBLEDataRequest]
 
 class BusSyncResponse(BaseModel):
@@ -61,6 +131,88 @@ class BusSyncResponse(BaseModel):
     sync_timestamp: str
     message: str
 
+class FaceEmbeddingRequest(BaseModel):
+    roll_number: str
+    class_name: str
+    embeddings: list[list[float]]  # one row per captured face
+
+class FaceEmbeddingResponse(BaseModel):
+    roll_number: str
+    class_name: str
+    stored: int
+    message: str
+
+class IdentifyFaceRequest(BaseModel):
+    class_name: str
+    embeddings: list[list[float]]  # one row per face in the frame
+    top_k: int = Field(1, ge=1, le=10)
+    min_score: float = 0.0
+
+class FaceCandidate(BaseModel):
+    roll_number: str
+    score: float
+
+class FaceMatch(BaseModel):
+    roll_number: Optional[str]  # None when the best score is below min_score
+    score: Optional[float]
+    candidates: list[FaceCandidate]
+
+class IdentifyFaceResponse(BaseModel):
+    class_name: str
+    matches: list[FaceMatch]
+
+class BoardingIntervalRecord(BaseModel):
+    roll_number: str
+    boarded_at: str
+    alighted_at: str
+
+class PresenceResponse(BaseModel):
+    bus_route: Optional[str] = None
+    sync_ids: list[int]
+    sightings: int
+    intervals: list[BoardingIntervalRecord]
+
+class PresenceAttendanceResponse(BaseModel):
+    class_name: str
+    date: date
+    boarded: int
+    marked: int
+    unmatched_roll_numbers: list[str]  # boarded, but no enrolled student has the roll number
+
+class SyncAttendanceOperation(MarkAttendanceRequest):
+    type: Literal["attendance"]
+    local_key: str = Field(min_length=1)
+
+class SyncEnrollmentOperation(EnrollRequest):
+    type: Literal["enrollment"]
+    local_key: str = Field(min_length=1)
+
+class SyncODRequestOperation(BaseModel):
+    type: Literal["od_request"]
+    local_key: str = Field(min_length=1)
+    student_name: str
+    roll_number: str
+    date: date
+    reason: str
+
+SyncOperation = Annotated[
+    Union[SyncAttendanceOperation, SyncEnrollmentOperation, SyncODRequestOperation],
+    Field(discriminator="type"),
+]
+
+class SyncBatchRequest(BaseModel):
+    operations: list[SyncOperation]
+
+class SyncOperationResult(BaseModel):
+    type: str
+    outcome: str
+    id: Optional[int] = None  # OD request id, or the student id for an enrollment
+
+class SyncBatchResponse(BaseModel):
+    applied: int
+    failed: int
+    results: dict[str, SyncOperationResult]  # keyed by the operation's local_key
+
 class UserCreate(BaseModel):
     username: str
     password: str
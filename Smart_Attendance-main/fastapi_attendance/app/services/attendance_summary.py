@@ -0,0 +1,121 @@
+"""Per-student, per-class attendance totals kept alongside the raw ``attendance`` rows.
+
+Every attendance write reads the statuses it is about to replace and applies
+the difference to ``attendance_summary`` in the same transaction, so the
+summary endpoints never aggregate raw rows. ``rebuild_summary`` recomputes the
+table from scratch; run ``python -m app.services.attendance_summary`` after
+editing attendance outside the API.
+"""
+from datetime import date
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from ..db.upsert import dialect_insert
+from ..models.models import Attendance, AttendanceSummary
+
+# Statuses that count towards attendance; anything else outside ABSENT is ignored
+ATTENDED_STATUSES = ("present", "od")
+ABSENT_STATUSES = ("absent",)
+
+# Summary rows per upsert statement, well under SQLite's bound-parameter limit
+SUMMARY_CHUNK_SIZE = 500
+
+
+def _tally(status) -> tuple[int, int]:
+    if status in ATTENDED_STATUSES:
+        return 1, 0
+    if status in ABSENT_STATUSES:
+        return 0, 1
+    return 0, 0
+
+
+def previous_statuses(db: Session, class_id: int, on: date, student_ids) -> dict:
+    """Current status per student for one class and day, locking the rows where the database can."""
+    rows = db.execute(
+        select(Attendance.student_id, Attendance.status).where(
+            Attendance.class_id == class_id,
+            Attendance.date == on,
+            Attendance.student_id.in_(list(student_ids)),
+        ).with_for_update()
+    )
+    return dict(rows.all())
+
+
+def apply_changes(db: Session, class_id: int, on: date, changes: dict) -> None:
+    """Fold ``{student_id: (old_status, new_status)}`` for one class and day into the summary."""
+    apply_transitions(db, [
+        (student_id, class_id, on, old, new) for student_id, (old, new) in changes.items()
+    ])
+
+
+def apply_transitions(db: Session, transitions) -> None:
+    """Fold ``(student_id, class_id, date, old_status, new_status)`` tuples into the summary.
+
+    Days may differ; transitions for the same student and class are combined
+    first, since one upsert statement cannot touch a row twice.
+    """
+    combined = {}
+    for student_id, class_id, on, old, new in transitions:
+        old_present, old_absent = _tally(old)
+        new_present, new_absent = _tally(new)
+        present, absent = new_present - old_present, new_absent - old_absent
+        # A rewritten day with an unchanged tally moves neither the counts nor the date range
+        if old is not None and not present and not absent:
+            continue
+        row = combined.get((student_id, class_id))
+        if row is None:
+            combined[(student_id, class_id)] = {
+                "student_id": student_id,
+                "class_id": class_id,
+                "present_count": present,
+                "absent_count": absent,
+                "first_date": on,
+                "last_date": on,
+            }
+        else:
+            row["present_count"] += present
+            row["absent_count"] += absent
+            row["first_date"] = min(row["first_date"], on)
+            row["last_date"] = max(row["last_date"], on)
+    rows = list(combined.values())
+
+    table = AttendanceSummary.__table__
+    for start in range(0, len(rows), SUMMARY_CHUNK_SIZE):
+        stmt = dialect_insert(db, table).values(rows[start:start + SUMMARY_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["student_id", "class_id"],
+            set_={
+                "present_count": table.c.present_count + stmt.excluded.present_count,
+                "absent_count": table.c.absent_count + stmt.excluded.absent_count,
+                "first_date": case(
+                    (stmt.excluded.first_date < table.c.first_date, stmt.excluded.first_date),
+                    else_=table.c.first_date,
+                ),
+                "last_date": case(
+                    (stmt.excluded.last_date > table.c.last_date, stmt.excluded.last_date),
+                    else_=table.c.last_date,
+                ),
+            },
+        )
+        db.execute(stmt)
+
+
+def rebuild_summary(bind) -> int:
+    """Recompute every summary row from ``attendance``; ``bind`` is a Session or Connection."""
+    bind.execute(delete(AttendanceSummary))
+    source = select(
+        Attendance.student_id,
+        Attendance.class_id,
+        func.sum(case((Attendance.status.in_(ATTENDED_STATUSES), 1), else_=0)),
+        func.sum(case((Attendance.status.in_(ABSENT_STATUSES), 1), else_=0)),
+        func.min(Attendance.date),
+        func.max(Attendance.date),
+    ).group_by(Attendance.student_id, Attendance.class_id)
+    columns = ["student_id", "class_id", "present_count", "absent_count", "first_date", "last_date"]
+    return bind.execute(insert(AttendanceSummary).from_select(columns, source)).rowcount
+
+
+if __name__ == "__main__":
+    from ..db.session import engine
+
+    with engine.begin() as conn:
+        print(f"rebuilt {rebuild_summary(conn)} attendance summary rows")
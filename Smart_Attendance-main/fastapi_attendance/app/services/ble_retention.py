@@ -0,0 +1,128 @@
+"""Retention for BLE sightings: per-minute compaction and summary expiry.
+
+Each bus sync is the unit of storage: its raw ``student_ble_data`` rows stay
+as uploaded for ``ble_raw_retention_days``, after which one transaction
+replaces them with per-student, per-minute ``student_ble_minutes`` rows
+(min/max/mean RSSI and sighting counts) and stamps ``BusSync.compacted_at``.
+Minute rows are deleted once the sync is older than
+``ble_summary_retention_days`` and the sync is stamped ``purged_at``, so
+later runs only look at syncs that expired since. The ``bus_sync`` row itself
+is kept as trip history for ``ble_sync_history_days``.
+
+Run once from the ``fastapi_attendance`` directory with
+``python -m app.services.ble_retention``; the API also runs it periodically
+(see ``compaction_loop``).
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..db.session import SessionLocal
+from ..models.models import BusSync, StudentBLEData, StudentBLEMinute
+
+logger = logging.getLogger(__name__)
+
+
+def _minute(db: Session, column):
+    """SQL expression truncating a naive UTC timestamp to the start of its minute."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("minute", column)
+    # Same text layout SQLAlchemy's SQLite DateTime type writes and parses
+    return func.strftime("%Y-%m-%d %H:%M:00.000000", column)
+
+
+def compact_syncs(db: Session, sync_ids: list[int], now: datetime) -> int:
+    """Replace the raw sightings of ``sync_ids`` with per-minute summaries; returns raw rows removed."""
+    minute = _minute(db, StudentBLEData.timestamp)
+    source = select(
+        StudentBLEData.bus_sync_id,
+        StudentBLEData.roll_number,
+        StudentBLEData.device_name,
+        StudentBLEData.device_id,
+        minute,
+        func.min(StudentBLEData.rssi),
+        func.max(StudentBLEData.rssi),
+        func.avg(StudentBLEData.rssi),
+        func.count(),
+        func.sum(case((StudentBLEData.is_online == "true", 1), else_=0)),
+    ).where(StudentBLEData.bus_sync_id.in_(sync_ids)).group_by(
+        StudentBLEData.bus_sync_id,
+        StudentBLEData.roll_number,
+        StudentBLEData.device_name,
+        StudentBLEData.device_id,
+        minute,
+    )
+    columns = [
+        "bus_sync_id", "roll_number", "device_name", "device_id", "minute",
+        "rssi_min", "rssi_max", "rssi_mean", "sightings", "online_sightings",
+    ]
+    db.execute(insert(StudentBLEMinute).from_select(columns, source))
+    removed = db.execute(delete(StudentBLEData).where(StudentBLEData.bus_sync_id.in_(sync_ids))).rowcount
+    db.execute(
+        update(BusSync).where(BusSync.id.in_(sync_ids)).values(compacted_at=now, student_data=None)
+    )
+    return removed
+
+
+def run_compaction(now: Optional[datetime] = None) -> dict:
+    """Compact every sync past raw retention, purge expired minute summaries and prune old syncs."""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    raw_cutoff = now - timedelta(days=settings.ble_raw_retention_days)
+    batch = max(1, settings.ble_compaction_batch_syncs)
+    report = {"syncs_compacted": 0, "raw_rows_removed": 0, "summary_rows_purged": 0, "syncs_pruned": 0}
+
+    with SessionLocal() as db:
+        while True:
+            sync_ids = db.scalars(
+                select(BusSync.id)
+                .where(BusSync.compacted_at.is_(None), BusSync.sync_timestamp < raw_cutoff)
+                .order_by(BusSync.sync_timestamp)
+                .limit(batch)
+            ).all()
+            if not sync_ids:
+                break
+            report["raw_rows_removed"] += compact_syncs(db, list(sync_ids), now)
+            report["syncs_compacted"] += len(sync_ids)
+            db.commit()
+
+        if settings.ble_summary_retention_days <= 0:
+            return report
+        summary_cutoff = now - timedelta(days=settings.ble_summary_retention_days)
+        while True:
+            sync_ids = db.scalars(
+                select(BusSync.id)
+                .where(BusSync.purged_at.is_(None), BusSync.sync_timestamp < summary_cutoff)
+                .limit(batch)
+            ).all()
+            if not sync_ids:
+                break
+            report["summary_rows_purged"] += db.execute(
+                delete(StudentBLEMinute).where(StudentBLEMinute.bus_sync_id.in_(sync_ids))
+            ).rowcount
+            db.execute(update(BusSync).where(BusSync.id.in_(sync_ids)).values(purged_at=now))
+            db.commit()
+
+        if settings.ble_sync_history_days > 0:
+            history_cutoff = now - timedelta(days=settings.ble_sync_history_days)
+            report["syncs_pruned"] = db.execute(
+                delete(BusSync).where(BusSync.purged_at.is_not(None), BusSync.sync_timestamp < history_cutoff)
+            ).rowcount
+            db.commit()
+    return report
+
+
+async def compaction_loop(interval_seconds: int):
+    """Run ``run_compaction`` in a worker thread every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(run_compaction)
+        except Exception:
+            logger.exception("BLE compaction failed")
+        await asyncio.sleep(interval_seconds)
+
+
+if __name__ == "__main__":
+    print(run_compaction())
@@ -0,0 +1,170 @@
+from sqlalchemy.orm import Session
+from threading import Lock
+import numpy as np
+from ..config import settings
+from ..models.models import FaceEmbedding
+
+def normalize(vectors) -> np.ndarray:
+    """Return ``vectors`` as a C-contiguous float32 matrix of unit-length rows."""
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[1] != settings.face_embedding_dim:
+        raise ValueError(f"Embeddings must have {settings.face_embedding_dim} values each")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    if not np.all(np.isfinite(norms)) or np.any(norms == 0):
+        raise ValueError("Embeddings must be finite and non-zero")
+    return matrix / norms
+
+
+class StudentGroups:
+    """Rows of a class matrix grouped by student, for reducing scores to one per student.
+
+    ``order`` lists row indices with each student's rows together, ``starts``
+    is where each student's run begins in ``order``, and ``roll_numbers`` names
+    the students in that same order.
+    """
+
+    def __init__(self, codes: np.ndarray, students: list[str]):
+        self.order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[self.order]
+        self.starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(codes) else codes
+        self.roll_numbers = [students[code] for code in sorted_codes[self.starts]]
+
+
+class ClassFaceMatrix:
+    """One class's enrolled embeddings as a single growable float32 matrix.
+
+    Rows are appended in place into spare capacity, doubling when full, so new
+    enrolments never force a rebuild from the database. ``last_id`` is the
+    highest ``FaceEmbedding.id`` held, the point the next catch-up reads from.
+    """
+
+    def __init__(self, dim: int):
+        self._data = np.empty((0, dim), dtype=np.float32)
+        self._roll_numbers = []
+        self._codes = []  # per row, the index of its roll number in _students
+        self._students = []
+        self._code_of = {}
+        self._groups = None  # StudentGroups, rebuilt on the first search after an append
+        self.size = 0
+        self.last_id = 0
+
+    def append(self, vectors: np.ndarray, roll_numbers: list[str], last_id: int):
+        needed = self.size + len(vectors)
+        if needed > len(self._data):
+            grown = np.empty((max(needed, 2 * len(self._data), 64), self._data.shape[1]), dtype=np.float32)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+        self._data[self.size:needed] = vectors
+        self._roll_numbers.extend(roll_numbers)
+        for roll_number in roll_numbers:
+            code = self._code_of.get(roll_number)
+            if code is None:
+                code = self._code_of[roll_number] = len(self._students)
+                self._students.append(roll_number)
+            self._codes.append(code)
+        self._groups = None
+        self.size = needed
+        self.last_id = last_id
+
+    def snapshot(self) -> tuple[np.ndarray, list[str]]:
+        """The filled rows and their roll numbers; later appends never touch this view."""
+        return self._data[:self.size], self._roll_numbers
+
+    def groups(self) -> StudentGroups:
+        """Student grouping of the rows in the current ``snapshot``."""
+        if self._groups is None:
+            self._groups = StudentGroups(np.array(self._codes, dtype=np.int32), self._students)
+        return self._groups
+
+
+def top_k_matches(vectors: np.ndarray, groups: StudentGroups, queries: np.ndarray, top_k: int):
+    """Cosine top-k distinct students per query, from one matrix multiply over ``vectors``.
+
+    Each student scores their best capture, so one student with many
+    captures never crowds the others out of the top k.
+    """
+    if len(vectors) == 0:
+        return [[] for _ in range(len(queries))]
+    # Rows x queries, so gathering each student's rows together copies whole rows
+    scores = vectors @ queries.T
+    best = np.maximum.reduceat(scores[groups.order], groups.starts, axis=0).T
+    k = min(top_k, best.shape[1])
+    if k < best.shape[1]:
+        candidates = np.argpartition(-best, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(best.shape[1]), best.shape)
+    results = []
+    for row, picks in enumerate(candidates):
+        ordered = picks[np.argsort(-best[row, picks])]
+        results.append([(groups.roll_numbers[index], float(best[row, index])) for index in ordered])
+    return results
+
+
+class FaceIndex:
+    """Per-class embedding matrices, loaded from the database on first use.
+
+    Every search first reads the class's rows above its ``last_id``, so
+    embeddings stored by another worker or straight into the database are
+    found without a reload. That assumes ids become visible in order, as
+    they do with SQLite's single writer; a sequence-backed database can
+    commit a lower id after a higher one, and such a row is only seen after
+    ``clear``.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._classes = {}
+        self._load_locks = {}  # class_id -> Lock, so one slow load never blocks other classes
+        self._lock = Lock()
+
+    def _rows(self, db: Session, class_id: int, after_id: int):
+        return db.query(FaceEmbedding.id, FaceEmbedding.roll_number, FaceEmbedding.vector).filter(
+            FaceEmbedding.class_id == class_id, FaceEmbedding.id > after_id
+        ).order_by(FaceEmbedding.id).all()
+
+    def _append(self, matrix: ClassFaceMatrix, rows):
+        # Under self._lock; skips rows a concurrent catch-up already appended
+        rows = [row for row in rows if row.id > matrix.last_id]
+        if rows:
+            vectors = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32)
+            matrix.append(vectors.reshape(len(rows), self.dim), [row.roll_number for row in rows], rows[-1].id)
+
+    def _load(self, db: Session, class_id: int) -> ClassFaceMatrix:
+        matrix = ClassFaceMatrix(self.dim)
+        self._append(matrix, self._rows(db, class_id, 0))
+        return matrix
+
+    def matrix(self, db: Session, class_id: int) -> ClassFaceMatrix:
+        """The class's matrix, loaded or caught up with rows committed since it was last read."""
+        with self._lock:
+            matrix = self._classes.get(class_id)
+            load_lock = self._load_locks.setdefault(class_id, Lock())
+        if matrix is None:
+            with load_lock:
+                with self._lock:
+                    matrix = self._classes.get(class_id)
+                if matrix is None:
+                    matrix = self._load(db, class_id)
+                    with self._lock:
+                        self._classes[class_id] = matrix
+                    return matrix
+        rows = self._rows(db, class_id, matrix.last_id)
+        if rows:
+            with self._lock:
+                self._append(matrix, rows)
+        return matrix
+
+    def search(self, db: Session, class_id: int, queries: np.ndarray, top_k: int):
+        matrix = self.matrix(db, class_id)
+        with self._lock:
+            vectors, _ = matrix.snapshot()
+            groups = matrix.groups()
+        # The multiply runs outside the lock so concurrent identifications overlap
+        return top_k_matches(vectors, groups, queries, top_k)
+
+    def clear(self):
+        with self._lock:
+            self._classes.clear()
+
+
+face_index = FaceIndex(settings.face_embedding_dim)
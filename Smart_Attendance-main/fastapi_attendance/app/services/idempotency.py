@@ -0,0 +1,293 @@
+"""``Idempotency-Key`` support for every write route.
+
+A client that may retry a POST/PUT/PATCH/DELETE sends a unique
+``Idempotency-Key`` header with it and keeps the key for every retry of
+that same request. The first request with a key claims it with a single
+upsert on ``idempotency_keys`` (primary key lookup on a 16-byte digest) and
+runs normally; its response, if below 500, is stored against the key for
+``idempotency_ttl_seconds`` and replayed byte-for-byte, headers included
+(hop-by-hop ones aside), with ``Idempotent-Replayed: true``, to every retry.
+While the first request is still running a retry gets 409. The claim is a
+lease of ``idempotency_lock_seconds`` that the running request renews every
+third of that, so only a claim whose request died is taken over. Server
+errors release the key so the retry runs again.
+
+Keys are scoped to the caller's ``Authorization`` header, and reusing a key
+for a different method, path or query string is rejected with 422. Request
+bodies are not compared. Recently finished responses are also kept in
+memory, so a replay seen by the same process costs no query.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete, select, update
+from starlette.responses import JSONResponse
+from ..config import settings
+from ..db.session import AsyncSessionLocal, SessionLocal
+from ..db.upsert import dialect_insert
+from ..models.models import IdempotencyKey
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+WRITE_METHODS = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+MAX_KEY_LENGTH = 255
+# Meaningful for one connection only (RFC 9110 section 7.6.1), so never stored for replay
+HOP_BY_HOP_HEADERS = frozenset({
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade",
+})
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: bytes
+    status_code: Optional[int]  # None while the first request is still running
+    headers: Optional[list[tuple[bytes, bytes]]]
+    body: Optional[bytes]
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def key_digest(authorization: bytes, key: bytes) -> bytes:
+    return hashlib.sha256(authorization + b"\0" + key).digest()[:16]
+
+
+def request_fingerprint(method: str, path: str, query: bytes) -> bytes:
+    return hashlib.sha256(f"{method} {path}?".encode() + query).digest()[:8]
+
+
+def _encode_headers(headers: list[tuple[bytes, bytes]]) -> str:
+    return json.dumps([[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers])
+
+
+def _stored_headers(headers: Optional[str], content_type: Optional[str], body: Optional[bytes]):
+    if headers is not None:
+        return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(headers)]
+    if body is None:
+        return None
+    # Stored before headers were kept: rebuild what Response would have sent
+    rebuilt = [(b"content-length", str(len(body)).encode())]
+    if content_type:
+        rebuilt.append((b"content-type", content_type.encode("latin-1")))
+    return rebuilt
+
+
+class IdempotencyStore:
+    def __init__(self, cache_size: int):
+        self.completed = LRUCache(cache_size)
+        self.claims = 0
+        self.replays = 0
+        self.conflicts = 0
+
+    async def claim(self, digest: bytes, fingerprint: bytes) -> Optional[StoredResponse]:
+        """Claim ``digest`` for a new request; return the existing entry instead if it is held."""
+        cached = self.completed.get(digest)
+        if cached is not None:
+            return cached
+        now = _utcnow()
+        async with AsyncSessionLocal() as db:
+            stmt = dialect_insert(db, IdempotencyKey).values(
+                key=digest,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=settings.idempotency_lock_seconds),
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["key"],
+                set_={
+                    "fingerprint": stmt.excluded.fingerprint,
+                    "status_code": None,
+                    "content_type": None,
+                    "headers": None,
+                    "body": None,
+                    "expires_at": stmt.excluded.expires_at,
+                },
+                # Only an expired entry or an abandoned claim may be taken over
+                where=IdempotencyKey.expires_at <= now,
+            )
+            claimed = (await db.execute(stmt)).rowcount == 1
+            existing = None
+            if not claimed:
+                row = (await db.execute(
+                    select(
+                        IdempotencyKey.fingerprint,
+                        IdempotencyKey.status_code,
+                        IdempotencyKey.headers,
+                        IdempotencyKey.content_type,
+                        IdempotencyKey.body,
+                    ).where(IdempotencyKey.key == digest)
+                )).one()
+                existing = StoredResponse(
+                    row.fingerprint, row.status_code, _stored_headers(row.headers, row.content_type, row.body), row.body
+                )
+            await db.commit()
+        if claimed:
+            self.claims += 1
+        return existing
+
+    async def complete(self, digest: bytes, stored: StoredResponse):
+        # Cached first so a retry racing the write below already replays
+        self.completed.set(digest, stored, expires_at=time.time() + settings.idempotency_ttl_seconds)
+        expires_at = _utcnow() + timedelta(seconds=settings.idempotency_ttl_seconds)
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IdempotencyKey).where(IdempotencyKey.key == digest).values(
+                    status_code=stored.status_code,
+                    headers=_encode_headers(stored.headers),
+                    body=stored.body,
+                    expires_at=expires_at,
+                )
+            )
+            await db.commit()
+
+    async def extend(self, digest: bytes):
+        """Renew the lease on a claim whose request is still running."""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IdempotencyKey).where(
+                    IdempotencyKey.key == digest, IdempotencyKey.status_code.is_(None)
+                ).values(expires_at=_utcnow() + timedelta(seconds=settings.idempotency_lock_seconds))
+            )
+            await db.commit()
+
+    async def release(self, digest: bytes):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(IdempotencyKey.key == digest, IdempotencyKey.status_code.is_(None))
+            )
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "claims": self.claims,
+            "replays": self.replays,
+            "conflicts": self.conflicts,
+            "replay_cache": self.completed.stats(),
+        }
+
+
+idempotency_store = IdempotencyStore(settings.idempotency_cache_size)
+
+
+def purge_expired(now: Optional[datetime] = None) -> int:
+    """Delete every expired key; returns the number removed."""
+    with SessionLocal() as db:
+        removed = db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= (now or _utcnow()))
+        ).rowcount
+        db.commit()
+    return removed
+
+
+async def purge_loop(interval_seconds: int):
+    """Run ``purge_expired`` in a worker thread every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(purge_expired)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
+        await asyncio.sleep(interval_seconds)
+
+
+async def _hold_claim(store: IdempotencyStore, digest: bytes, done: asyncio.Event):
+    """Renew ``digest``'s lease every third of ``idempotency_lock_seconds`` until ``done`` is set."""
+    interval = settings.idempotency_lock_seconds / 3
+    while True:
+        try:
+            await asyncio.wait_for(done.wait(), interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await store.extend(digest)
+        except Exception:
+            logger.exception("Idempotency key lease renewal failed")
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware applying ``Idempotency-Key`` to every write request that carries one."""
+
+    def __init__(self, app, store: IdempotencyStore = idempotency_store):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in WRITE_METHODS:
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        key = headers.get(b"idempotency-key")
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters"}, status_code=400
+            )
+            return await response(scope, receive, send)
+
+        digest = key_digest(headers.get(b"authorization", b""), key)
+        fingerprint = request_fingerprint(scope["method"], scope["path"], scope.get("query_string", b""))
+        existing = await self.store.claim(digest, fingerprint)
+        if existing is not None:
+            if existing.fingerprint != fingerprint:
+                self.store.conflicts += 1
+                response = JSONResponse(
+                    {"detail": "Idempotency-Key was already used for a different request"}, status_code=422
+                )
+            elif existing.status_code is None:
+                self.store.conflicts += 1
+                response = JSONResponse(
+                    {"detail": "A request with this Idempotency-Key is still in progress"},
+                    status_code=409,
+                    headers={"Retry-After": "1"},
+                )
+            else:
+                self.store.replays += 1
+                await send({
+                    "type": "http.response.start",
+                    "status": existing.status_code,
+                    "headers": [*existing.headers, (b"idempotent-replayed", b"true")],
+                })
+                return await send({"type": "http.response.body", "body": existing.body})
+            return await response(scope, receive, send)
+
+        status = None
+        response_headers = []
+        chunks = []
+        size = 0
+
+        async def capture(message):
+            nonlocal status, response_headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = [
+                    (name, value) for name, value in message.get("headers", [])
+                    if name.lower() not in HOP_BY_HOP_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                # Too large to store: keep counting but stop buffering
+                if size <= settings.idempotency_max_body_bytes:
+                    chunks.append(message.get("body", b""))
+            await send(message)
+
+        done = asyncio.Event()
+        holder = asyncio.create_task(_hold_claim(self.store, digest, done))
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await self.store.release(digest)
+            raise
+        finally:
+            done.set()
+            await holder
+        if status is None or status >= 500 or size > settings.idempotency_max_body_bytes:
+            await self.store.release(digest)
+        else:
+            await self.store.complete(digest, StoredResponse(fingerprint, status, response_headers, b"".join(chunks)))
@@ -0,0 +1,223 @@
+"""Per-route request latency and SQL query counts in Prometheus text format.
+
+``MetricsMiddleware`` times every HTTP request and files it under the route
+template it matched (``/od_requests/{request_id}``, not the raw path), so
+label values stay bounded. A response sent by middleware before routing
+(an idempotent replay, a 409/422 key conflict, a 413 upload) is filed under
+the route its path would have matched. ``track_queries`` hooks an engine's
+``before/after_cursor_execute`` events to count the statements each request
+runs and the time spent in them. The request is found through a context
+variable, which reaches sync routes in the threadpool and async sessions in
+SQLAlchemy's greenlets. ``GET /metrics`` renders it all.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Optional
+import time
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.routing import Match
+
+# Prometheus text exposition format served by /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds, in seconds, for request latency and DB time
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds for statements per request; N+1 routes pile up in the high buckets
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+# Label for requests that matched no route (404s), so stray paths add no series
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def route_template(scope) -> str:
+    """The path template of the route that handled ``scope``, or would have handled it."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Answered before the router ran: match the app's routes the way the router would
+    partial = None
+    for candidate in scope["app"].router.routes:
+        match, _ = candidate.matches(scope)
+        if match == Match.FULL:
+            return candidate.path
+        if match == Match.PARTIAL and partial is None:
+            partial = candidate.path
+    return partial or UNMATCHED_ROUTE
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current: ContextVar[Optional[_RequestStats]] = ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """Request counts and histograms keyed by (method, route); safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.requests = {}  # (method, route, status) -> count
+        self.latency = {}  # (method, route) -> Histogram of seconds
+        self.queries = {}  # (method, route) -> Histogram of statements per request
+        self.db_time = {}  # (method, route) -> Histogram of seconds in the database
+        self.background_queries = 0  # statements run outside any request (maintenance jobs)
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: _RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_BUCKETS)
+                self.db_time[key] = Histogram(LATENCY_BUCKETS)
+            self.latency[key].observe(seconds)
+            self.queries[key].observe(stats.queries)
+            self.db_time[key].observe(stats.db_seconds)
+
+    def count_background_query(self):
+        with self._lock:
+            self.background_queries += 1
+
+    def clear(self):
+        with self._lock:
+            self.requests.clear()
+            self.latency.clear()
+            self.queries.clear()
+            self.db_time.clear()
+            self.background_queries = 0
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requests handled, by route template and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            for name, help_text, histograms in (
+                ("http_request_duration_seconds", "Time to handle a request.", self.latency),
+                ("http_request_db_queries", "SQL statements run while handling a request.", self.queries),
+                ("http_request_db_seconds", "Time a request spent executing SQL.", self.db_time),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (method, route), histogram in sorted(histograms.items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        labels = _labels(method=method, route=route, le=bound)
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    labels = _labels(method=method, route=route)
+                    lines.append(f"{name}_sum{labels} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{labels} {histogram.count}")
+            lines += [
+                "# HELP db_queries_outside_requests_total SQL statements run outside any HTTP request.",
+                "# TYPE db_queries_outside_requests_total counter",
+                f"db_queries_outside_requests_total {self.background_queries}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is None:
+        metrics_registry.count_background_query()
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - started
+
+
+def _discard_failed(exception_context):
+    # after_cursor_execute does not run for a failed statement
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def track_queries(engine):
+    """Count statements and DB time per request on ``engine`` (a sync ``Engine``)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _discard_failed)
+
+
+class MetricsMiddleware:
+    """Record every HTTP request's latency, status and query counts under its route template.
+
+    With ``server_timing`` the response also carries a ``Server-Timing``
+    header with the statements run and DB time up to when it started.
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def recording_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    MutableHeaders(scope=message).append(
+                        "Server-Timing",
+                        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+                        f"app;dur={elapsed_ms:.2f}",
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            _current.reset(token)
+            metrics_registry.observe(
+                scope["method"],
+                route_template(scope),
+                status,
+                time.perf_counter() - start,
+                stats,
+            )
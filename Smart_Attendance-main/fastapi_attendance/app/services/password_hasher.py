@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import asyncio
+from passlib.context import CryptContext
+from ..config import settings
+
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when every hashing slot and queue place is taken."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool, off the event loop.
+
+    At most ``workers`` hashes run at once and at most ``queue_size`` more
+    wait; beyond that callers get ``PasswordHasherBusy`` straight away, so a
+    login storm cannot pile unbounded work up behind the API. bcrypt releases
+    the GIL while hashing, so threads are enough.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, queue_size: int):
+        self.context = context
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = Lock()
+        self.outstanding = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.outstanding >= self.workers + self.queue_size:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.outstanding += 1
+        try:
+            return await asyncio.wrap_future(self._executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self.outstanding -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str):
+        """Return ``(matches, new_hash)``; ``new_hash`` is set when the stored cost is outdated."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "outstanding": self.outstanding,
+            "rejected": self.rejected,
+        }
+
+
+# Hashes at any other cost are re-hashed at bcrypt_rounds on the next successful login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+password_hasher = PasswordHasher(pwd_context, settings.password_hash_workers, settings.password_hash_queue_size)
@@ -0,0 +1,107 @@
+"""Boarding inference from the BLE sightings a bus uploads.
+
+Sightings are binned per student into fixed time windows, the mean RSSI of
+each window is smoothed with a trailing moving average, and a hysteresis
+rule turns the smoothed signal into on-board state: a student boards once
+the signal reaches ``enter_rssi`` and only alights once it falls to
+``exit_rssi`` or disappears, so a phone hovering near one threshold does not
+flap. Runs of on-board windows become boarding intervals.
+
+Everything after loading is NumPy over a students x windows grid; there is
+no per-sighting Python loop.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import numpy as np
+from ..config import settings
+
+
+@dataclass(frozen=True)
+class PresenceParams:
+    window_seconds: int
+    smoothing_windows: int
+    enter_rssi: float
+    exit_rssi: float
+    min_boarded_seconds: int
+
+    @classmethod
+    def from_settings(cls) -> "PresenceParams":
+        return cls(
+            window_seconds=settings.presence_window_seconds,
+            smoothing_windows=settings.presence_smoothing_windows,
+            enter_rssi=settings.presence_enter_rssi,
+            exit_rssi=settings.presence_exit_rssi,
+            min_boarded_seconds=settings.presence_min_boarded_seconds,
+        )
+
+
+@dataclass(frozen=True)
+class BoardingInterval:
+    roll_number: str
+    boarded_at: datetime
+    alighted_at: datetime
+
+
+def _window_means(student: np.ndarray, window: np.ndarray, rssi: np.ndarray, shape):
+    """Per (student, window) RSSI sums and sighting counts as dense matrices."""
+    cells = student * shape[1] + window
+    size = shape[0] * shape[1]
+    sums = np.bincount(cells, weights=rssi, minlength=size).reshape(shape)
+    counts = np.bincount(cells, minlength=size).reshape(shape)
+    return sums, counts
+
+
+def _trailing(matrix: np.ndarray, width: int) -> np.ndarray:
+    """Sum of each row over the trailing ``width`` columns, including the current one."""
+    cumulative = np.cumsum(np.pad(matrix, ((0, 0), (width, 0))), axis=1)
+    return cumulative[:, width:] - cumulative[:, :-width]
+
+
+def _hysteresis(smoothed: np.ndarray, enter: float, exit: float) -> np.ndarray:
+    """On-board state per cell: the last decisive reading carried forward, off before any."""
+    decided = np.where(smoothed >= enter, 1, np.where(smoothed <= exit, 0, -1)).astype(np.int8)
+    columns = np.arange(smoothed.shape[1])
+    last = np.where(decided >= 0, columns, -1)
+    np.maximum.accumulate(last, axis=1, out=last)
+    carried = np.take_along_axis(decided, np.maximum(last, 0), axis=1)
+    return np.where(last >= 0, carried, 0).astype(np.int8)
+
+
+def infer_intervals(roll_numbers, timestamps, rssi, online, params: PresenceParams) -> list[BoardingInterval]:
+    """Boarding intervals per student from parallel sighting arrays.
+
+    ``timestamps`` are naive UTC datetimes (or ``datetime64``). Offline
+    sightings carry no signal and are ignored.
+    """
+    online = np.asarray(online, dtype=bool)
+    if not online.any():
+        return []
+    rolls = np.asarray(roll_numbers, dtype=object)[online]
+    seconds = np.asarray(timestamps, dtype="datetime64[s]")[online].astype(np.int64)
+    signal = np.asarray(rssi, dtype=np.float64)[online]
+
+    names, student = np.unique(rolls, return_inverse=True)
+    start = seconds.min()
+    window = (seconds - start) // params.window_seconds
+    shape = (len(names), int(window.max()) + 1)
+
+    sums, counts = _window_means(student, window, signal, shape)
+    width = max(1, params.smoothing_windows)
+    summed, seen = _trailing(sums, width), _trailing(counts, width)
+    # Windows with no sighting in the trailing span read as no signal at all
+    smoothed = np.full(shape, -np.inf)
+    np.divide(summed, seen, out=smoothed, where=seen > 0)
+
+    state = _hysteresis(smoothed, params.enter_rssi, params.exit_rssi)
+    edges = np.diff(np.pad(state, ((0, 0), (1, 1))), axis=1)
+    # Row-major order pairs each student's boardings with their alightings
+    board_rows, board_cols = np.nonzero(edges == 1)
+    _, alight_cols = np.nonzero(edges == -1)
+
+    keep = (alight_cols - board_cols) * params.window_seconds >= params.min_boarded_seconds
+    origin = datetime(1970, 1, 1) + timedelta(seconds=int(start))
+    step = timedelta(seconds=params.window_seconds)
+    return [
+        BoardingInterval(str(names[row]), origin + int(board) * step, origin + int(alight) * step)
+        for row, board, alight in zip(board_rows[keep], board_cols[keep], alight_cols[keep])
+    ]
@@ -0,0 +1,99 @@
+"""Response cache with strong ETags for read endpoints that are polled constantly.
+
+Each cached endpoint belongs to an entity ("attendance", "od_requests",
+"bus_sync"). Write routes call ``read_cache.bump(entity)`` after they commit,
+which moves that entity's version on; the ETag of a response is derived from
+the request path, query string and entity version alone. A matching
+``If-None-Match`` is therefore answered with 304 before any query runs, and a
+cached body is reused until the next bump.
+
+Versions live in this process and only ``bump`` moves them, so a write that
+does not pass through this process's bump (one served by another worker, or
+made straight to the database) leaves both the cached bodies and the ETags
+current: clients keep getting 304 for data that has changed. Run a single
+worker with no outside writers, or set ``read_cache_size`` to 0, which turns
+off the cache, the ETags and the 304 short-circuit together.
+"""
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional
+import hashlib
+import json
+import uuid
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from ..config import settings
+from .cache import LRUCache
+
+# Distinguishes this process's ETags from any other worker's
+_PROCESS_ID = uuid.uuid4().hex[:8]
+
+
+@dataclass
+class CacheLookup:
+    key: str
+    etag: Optional[str]  # None when the cache is disabled
+    response: Response = None
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ReadCache:
+    def __init__(self, maxsize: int):
+        self.enabled = maxsize > 0
+        self.responses = LRUCache(maxsize)
+        self._versions = {}
+        self._lock = Lock()
+        self.not_modified = 0
+
+    def version(self, entity: str) -> int:
+        return self._versions.get(entity, 0)
+
+    def bump(self, entity: str):
+        with self._lock:
+            self._versions[entity] = self._versions.get(entity, 0) + 1
+
+    def lookup(self, request: Request, entity: str) -> CacheLookup:
+        """Return the request's ETag, plus a ready 304 or cached response when there is one."""
+        key = f"{request.url.path}?{request.url.query}"
+        if not self.enabled:
+            return CacheLookup(key, None)
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        etag = f'"{_PROCESS_ID}.{entity}.{self.version(entity)}.{digest}"'
+        lookup = CacheLookup(key, etag)
+        if _not_modified(request, etag):
+            self.not_modified += 1
+            lookup.response = Response(status_code=304, headers={"ETag": etag})
+            return lookup
+        entry = self.responses.get(key, is_current=lambda cached: cached[0] == etag)
+        if entry is not None:
+            lookup.response = self._response(etag, entry[1])
+        return lookup
+
+    def store(self, lookup: CacheLookup, payload) -> Response:
+        """Serialise ``payload`` once, cache it under the lookup's ETag and return it."""
+        body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode()
+        if lookup.etag is None:
+            return Response(content=body, media_type="application/json")
+        self.responses.set(lookup.key, (lookup.etag, body))
+        return self._response(lookup.etag, body)
+
+    @staticmethod
+    def _response(etag: str, body: bytes) -> Response:
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"ETag": etag, "Cache-Control": "no-cache"},
+        )
+
+    def stats(self) -> dict:
+        return {**self.responses.stats(), "not_modified": self.not_modified, "versions": dict(self._versions)}
+
+
+read_cache = ReadCache(settings.read_cache_size)
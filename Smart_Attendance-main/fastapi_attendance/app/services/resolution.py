@@ -0,0 +1,66 @@
+from sqlalchemy.orm import Session
+from ..models.models import Student, Class
+from ..config import settings
+from .cache import LRUCache
+
+
+class ResolutionCache:
+    """Caches ``Student.name`` and ``Class.name`` to id lookups for the write paths.
+
+    Only names that resolved to a row are cached. Ids can go stale if rows are
+    removed or recreated outside the API, so callers verify them in the write
+    itself and call ``forget_*`` before retrying with fresh lookups.
+    """
+
+    def __init__(self, maxsize: int):
+        self.students = LRUCache(maxsize)
+        self.classes = LRUCache(maxsize)
+
+    def student_id(self, db: Session, name: str):
+        student_id = self.students.get(name)
+        if student_id is None:
+            student_id = db.query(Student.id).filter(Student.name == name).scalar()
+            if student_id is not None:
+                self.students.set(name, student_id)
+        return student_id
+
+    def class_id(self, db: Session, name: str):
+        class_id = self.classes.get(name)
+        if class_id is None:
+            class_id = db.query(Class.id).filter(Class.name == name).scalar()
+            if class_id is not None:
+                self.classes.set(name, class_id)
+        return class_id
+
+    def student_ids(self, db: Session, names) -> dict:
+        """Resolve many student names, querying only the cache misses in one go."""
+        resolved = {}
+        missing = []
+        for name in names:
+            student_id = self.students.get(name)
+            if student_id is None:
+                missing.append(name)
+            else:
+                resolved[name] = student_id
+        if missing:
+            for name, student_id in db.query(Student.name, Student.id).filter(Student.name.in_(missing)):
+                self.students.set(name, student_id)
+                resolved[name] = student_id
+        return resolved
+
+    def forget_students(self, names):
+        for name in names:
+            self.students.pop(name)
+
+    def forget_class(self, name: str):
+        self.classes.pop(name)
+
+    def clear(self):
+        self.students.clear()
+        self.classes.clear()
+
+    def stats(self) -> dict:
+        return {"students": self.students.stats(), "classes": self.classes.stats()}
+
+
+resolution_cache = ResolutionCache(settings.resolution_cache_size)
@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from threading import Lock
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models.models import User
+from .cache import LRUCache
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """The ``User`` columns the auth routes read, detached from any session."""
+    id: int
+    username: str
+    role: str
+    name: str
+    is_active: bool
+
+
+class TokenCache:
+    """Caches verified bearer tokens to the user they resolved to.
+
+    An entry lives until the token's ``exp`` or ``token_cache_ttl_seconds``,
+    whichever comes first. Committing a change to a user bumps that
+    username's generation, and entries stored under an older generation are
+    treated as misses; callers read the generation *before* loading the user,
+    so a load that races a commit is never cached as current. Changes made
+    outside the ORM are only picked up when the TTL runs out.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: int):
+        self.tokens = LRUCache(maxsize)
+        self.ttl_seconds = ttl_seconds
+        self._generations = {}
+        self._lock = Lock()
+        self.invalidations = 0
+
+    def generation(self, username: str) -> int:
+        return self._generations.get(username, 0)
+
+    def get(self, token: str):
+        entry = self.tokens.get(token, is_current=lambda e: e[1] == self.generation(e[0].username))
+        return entry[0] if entry is not None else None
+
+    def put(self, token: str, user: User, exp, generation: int) -> CachedUser:
+        cached = CachedUser(user.id, user.username, user.role, user.name, user.is_active)
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        self.tokens.set(token, (cached, generation), expires_at)
+        return cached
+
+    def invalidate(self, usernames):
+        with self._lock:
+            for username in usernames:
+                self._generations[username] = self._generations.get(username, 0) + 1
+                self.invalidations += 1
+
+    def clear(self):
+        self.tokens.clear()
+
+    def stats(self) -> dict:
+        return {**self.tokens.stats(), "invalidations": self.invalidations}
+
+
+token_cache = TokenCache(settings.token_cache_size, settings.token_cache_ttl_seconds)
+
+
+def _changed_usernames(session: Session) -> set:
+    return session.info.setdefault("token_cache_usernames", set())
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _note_user_change(mapper, connection, target):
+    # A rename must also drop tokens issued for the old username
+    history = inspect(target).attrs.username.history
+    usernames = {target.username, *(history.deleted or ())}
+    _changed_usernames(inspect(target).session).update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    usernames = session.info.pop("token_cache_usernames", None)
+    if usernames:
+        token_cache.invalidate(usernames)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("token_cache_usernames", None)
@@ -0,0 +1,182 @@
+"""Content-addressed store for uploaded face captures and OD attachments.
+
+An upload is copied in ``upload_chunk_bytes`` pieces in a worker thread,
+hashed with SHA-256 as it streams, and saved once under
+``<upload_store_dir>/<aa>/<bb>/<sha256>``. A second upload of the same bytes
+finds the file already there and only adds a reference: each ``blobs`` row
+carries a ``refcount`` of the manifest and OD rows that point at it.
+Overwriting a manifest row (two uploads given the same name) releases the
+blob it pointed at; OD requests are never deleted, so their references are
+never released.
+
+Size limits apply twice: ``UploadLimitMiddleware`` turns away a request
+whose body is too large before the multipart parser buffers it, and the
+copy stops as soon as the file itself passes its limit.
+
+Files are written before the referencing row commits, so a failed request
+can leave an unreferenced file behind; ``python -m app.services.upload_store``
+removes those once they are older than ``STAGING_GRACE_SECONDS``. Saving a
+duplicate touches the existing file, so an upload whose row has not
+committed yet keeps its file out of a collection running meanwhile.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import JSONResponse
+from ..config import settings
+from ..db.upsert import dialect_insert
+from ..models.models import Blob
+
+# Allowance for multipart boundaries and text fields on top of the file limit
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+# Files written or touched more recently than this may belong to an upload still in progress
+STAGING_GRACE_SECONDS = 3600
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit} byte limit")
+        self.limit = limit
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    sha256: str
+    size: int
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(settings.upload_store_dir, sha256[:2], sha256[2:4], sha256)
+
+
+def _write_blob(source, max_bytes: int) -> StoredBlob:
+    """Copy ``source`` into the store, hashing as it goes; blocking, so run it in a thread."""
+    staging = os.path.join(settings.upload_store_dir, "tmp")
+    os.makedirs(staging, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=staging)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := source.read(settings.upload_chunk_bytes):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                out.write(chunk)
+        sha256 = digest.hexdigest()
+        final_path = blob_path(sha256)
+        if os.path.exists(final_path):
+            os.unlink(temp_path)
+            os.utime(final_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp_path, final_path)
+        return StoredBlob(sha256, size)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+async def store_upload(db: AsyncSession, upload: UploadFile, max_bytes: int) -> StoredBlob:
+    """Save ``upload`` (deduplicated) and count one more reference to it, without committing.
+
+    Raises ``UploadTooLarge`` once the file passes ``max_bytes``.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    blob = await run_in_threadpool(_write_blob, upload.file, max_bytes)
+    stmt = dialect_insert(db, Blob).values(
+        sha256=blob.sha256,
+        size=blob.size,
+        refcount=1,
+        created_at=datetime.now(timezone.utc).replace(tzinfo=None),
+    )
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={"refcount": Blob.refcount + 1},
+    ))
+    return blob
+
+
+async def release_blob(db: AsyncSession, sha256: str):
+    """Count one reference fewer to ``sha256``, without committing; the file goes at the next collection."""
+    await db.execute(update(Blob).where(Blob.sha256 == sha256).values(refcount=Blob.refcount - 1))
+
+
+class UploadLimitMiddleware:
+    """Reject a POST to a limited path with 413 once its body passes the limit.
+
+    A declared ``Content-Length`` is checked before anything is read; a
+    chunked body is counted as it arrives and cut off at the limit.
+    """
+
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+        too_large = JSONResponse({"detail": f"Upload exceeds the {limit} byte limit"}, status_code=413)
+        limit += MULTIPART_OVERHEAD_BYTES
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            return await too_large(scope, receive, send)
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not rejected:
+                raise
+        if rejected:
+            await too_large(scope, receive, send)
+
+
+def collect_garbage() -> int:
+    """Delete stored and staging files that no ``blobs`` row references, once past the grace period."""
+    from ..db.session import SessionLocal
+
+    with SessionLocal() as db:
+        referenced = {sha256 for (sha256,) in db.query(Blob.sha256).filter(Blob.refcount > 0)}
+    cutoff = time.time() - STAGING_GRACE_SECONDS
+    removed = 0
+    for root, _, files in os.walk(settings.upload_store_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            if name in referenced or os.stat(path).st_mtime > cutoff:
+                continue
+            os.unlink(path)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    print(f"removed {collect_garbage()} unreferenced files")
@@ -0,0 +1,109 @@
+"""Attendance percentage reads from ``attendance_summary`` vs aggregating raw rows.
+
+Seeds ``--students`` students in each of ``--classes`` classes with
+``--days`` days of attendance, then compares the summary endpoints with
+benchmark-only routes that compute the same figures with GROUP BY over
+``attendance``. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_attendance_summary --students 200 --classes 10 --days 180
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def seed(students, classes, days):
+    from sqlalchemy import insert
+    from app.db.session import SessionLocal
+    from app.models.models import Attendance, Class, Enrollment, Student
+    from app.services.attendance_summary import rebuild_summary
+
+    db = SessionLocal()
+    try:
+        people = [Student(name=f"student-{i:04d}") for i in range(students)]
+        rooms = [Class(name=f"class-{c:02d}") for c in range(classes)]
+        db.add_all(people + rooms)
+        db.flush()
+        db.add_all([Enrollment(student_id=p.id, class_id=r.id) for p in people for r in rooms])
+        start = date(2025, 1, 1)
+        for room in rooms:
+            db.execute(insert(Attendance), [
+                {"student_id": p.id, "class_id": room.id, "date": start + timedelta(days=d),
+                 "status": "absent" if (p.id * 31 + d) % (4 + p.id % 5) == 0 else "present"}
+                for p in people for d in range(days)
+            ])
+        rebuild_summary(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--days", type=int, default=180)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from sqlalchemy import case, func
+        from sqlalchemy.orm import Session
+        from app.db.session import SessionLocal
+        from app.models.models import Attendance, Class, Student
+
+        app = load_app()
+
+        def get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        def raw_query(db):
+            present = func.sum(case((Attendance.status.in_(("present", "od")), 1), else_=0))
+            absent = func.sum(case((Attendance.status == "absent", 1), else_=0))
+            return db.query(Student.name, Class.name, present, absent).join(
+                Student, Student.id == Attendance.student_id
+            ).join(Class, Class.id == Attendance.class_id).group_by(Attendance.student_id, Attendance.class_id)
+
+        @app.get("/bench/raw_student_summary")
+        def raw_student(student_name: str, db: Session = Depends(get_db)):
+            return [list(row) for row in raw_query(db).filter(Student.name == student_name).all()]
+
+        @app.get("/bench/raw_class_summary")
+        def raw_class(class_name: str, db: Session = Depends(get_db)):
+            return [list(row) for row in raw_query(db).filter(Class.name == class_name).all()]
+
+        @app.get("/bench/raw_below_threshold")
+        def raw_below(db: Session = Depends(get_db)):
+            rows = raw_query(db).all()
+            return [list(row) for row in rows if row[2] * 100 < 75 * (row[2] + row[3])]
+
+        seed(args.students, args.classes, args.days)
+        client = TestClient(app)
+
+        def sample(path, params):
+            return summarize([timed(client.get, path, params=params)[1] for _ in range(args.repeat)])
+
+        student = {"student_name": "student-0042"}
+        room = {"class_name": "class-03"}
+        results = {
+            "attendance_rows": args.students * args.classes * args.days,
+            "student": {"summary": sample("/attendance/summary/student", student),
+                        "raw": sample("/bench/raw_student_summary", student)},
+            "class": {"summary": sample("/attendance/summary/class", room),
+                      "raw": sample("/bench/raw_class_summary", room)},
+            "below_threshold": {"summary": sample("/attendance/summary/below_threshold", {}),
+                                "raw": sample("/bench/raw_below_threshold", {})},
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Throughput of ``/auth/validate`` and ``/auth/me`` with and without the token cache.
+
+"uncached" shrinks the cache to zero entries, so every request decodes the JWT
+and queries ``users`` as before. ``get_current_user`` rows time the dependency
+alone, without the HTTP stack. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_auth_cache --requests 2000
+"""
+import argparse
+import json
+
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.security import HTTPAuthorizationCredentials
+        from fastapi.testclient import TestClient
+        from app.db.session import SessionLocal
+        from app.routers.auth import get_current_user
+        from app.services.token_cache import token_cache
+
+        app = load_app()
+        client = TestClient(app)
+        token = client.post("/auth/register", json={
+            "username": "bench", "password": "bench-password", "role": "teacher", "name": "Bench",
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        def run(maxsize):
+            token_cache.clear()
+            token_cache.tokens.maxsize = maxsize
+            result = {}
+            for path in ("/auth/validate", "/auth/me"):
+                samples = [timed(client.get, path, headers=headers)[1] for _ in range(args.requests)]
+                result[path] = {**summarize(samples), "req_per_s": round(len(samples) / sum(samples))}
+            db = SessionLocal()
+            try:
+                samples = [timed(get_current_user, credentials, db)[1] for _ in range(args.requests)]
+            finally:
+                db.close()
+            result["get_current_user"] = {**summarize(samples), "calls_per_s": round(len(samples) / sum(samples))}
+            return result
+
+        maxsize = token_cache.tokens.maxsize
+        results = {"uncached": run(0), "cached": run(maxsize), "cache_stats": token_cache.stats()}
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Storage and read cost of BLE sightings before and after per-minute compaction.
+
+Uploads ``--syncs`` trips of ``--phones`` phones sighted every ``--interval``
+seconds for ``--minutes`` through ``/bus_sync``, then runs the compaction job as
+if the raw retention period had passed. Reports the database file size
+(after VACUUM) raw and compacted, the JSON copy the old handler also kept on
+every ``bus_sync`` row, compaction time, and ``/bus_sync/{id}/students``
+latency on raw and compacted syncs. Run from the ``fastapi_attendance``
+directory::
+
+    python -m benchmarks.bench_ble_retention --syncs 20 --phones 60 --minutes 30
+"""
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def trip(phones, minutes, interval, rng):
+    start = datetime(2025, 1, 6, 7, 0, 0)
+    return {
+        "driver_id": "driver-1",
+        "bus_route": "R1",
+        "timestamp": start.isoformat() + "Z",
+        "students": [
+            {
+                "roll_number": f"R{phone:03d}",
+                "device_name": f"phone-{phone}",
+                "device_id": f"AA:BB:CC:{phone:02d}",
+                "timestamp": (start + timedelta(seconds=second)).isoformat() + "Z",
+                "rssi": int(rng.gauss(-60, 4)),
+                "is_online": True,
+            }
+            for second in range(0, minutes * 60, interval)
+            for phone in range(phones)
+        ],
+    }
+
+
+def db_size(engine):
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize("attendance.db")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--syncs", type=int, default=20)
+    parser.add_argument("--phones", type=int, default=60)
+    parser.add_argument("--minutes", type=int, default=30)
+    parser.add_argument("--interval", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+        from app.db.session import SessionLocal, engine
+        from app.models.models import StudentBLEData, StudentBLEMinute
+        from app.services.ble_retention import run_compaction
+
+        client = TestClient(load_app())
+        body = trip(args.phones, args.minutes, args.interval, random.Random(5))
+        sync_ids = [client.post("/bus_sync", json=body).json()["sync_id"] for _ in range(args.syncs)]
+        json_copy = len(json.dumps(body["students"]).encode()) * args.syncs
+
+        def students_latency(sync_id):
+            return summarize([
+                timed(client.get, f"/bus_sync/{sync_id}/students")[1] for _ in range(args.repeat)
+            ])
+
+        def presence_intervals(sync_id):
+            return len(client.get(f"/bus_sync/{sync_id}/presence").json()["intervals"])
+
+        raw_size = db_size(engine)
+        raw_read = students_latency(sync_ids[-1])
+        raw_intervals = presence_intervals(sync_ids[-1])
+
+        report, seconds = timed(run_compaction, datetime(2025, 1, 6) + timedelta(days=30))
+        compacted_size = db_size(engine)
+        with SessionLocal() as db:
+            raw_rows = db.scalar(select(func.count()).select_from(StudentBLEData))
+            minute_rows = db.scalar(select(func.count()).select_from(StudentBLEMinute))
+
+        print(json.dumps({
+            "syncs": args.syncs,
+            "sightings_per_sync": len(body["students"]),
+            "legacy_json_copy_bytes": json_copy,
+            "raw_db_bytes": raw_size,
+            "compacted_db_bytes": compacted_size,
+            "size_ratio": round(raw_size / compacted_size, 1),
+            "compaction": {**report, "seconds": round(seconds, 3)},
+            "rows_after": {"raw": raw_rows, "minutes": minute_rows},
+            "students_endpoint": {"raw": raw_read, "compacted": students_latency(sync_ids[-1])},
+            "presence_intervals": {"raw": raw_intervals, "compacted": presence_intervals(sync_ids[-1])},
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Rows per second for ``/bus_sync`` ingestion, per-row ORM adds vs one executemany.
+
+The "before" numbers come from a copy of the original handler mounted on a
+benchmark-only route, so both paths pay the same HTTP and validation cost.
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_bus_sync --sizes 100 1000 10000
+"""
+import argparse
+import json
+from datetime import datetime, timedelta
+
+from .common import load_app, temp_workdir, timed
+
+
+def legacy_sync(sync_data, db):
+    """The pre-bulk handler body: one ORM object per sighting and two commits."""
+    from app.models.models import BusSync, StudentBLEData
+
+    bus_sync = BusSync(
+        driver_id=sync_data.driver_id,
+        bus_route=sync_data.bus_route,
+        sync_timestamp=datetime.fromisoformat(sync_data.timestamp.replace('Z', '+00:00')),
+        student_count=len(sync_data.students),
+        student_data=json.dumps([student.dict() for student in sync_data.students]),
+    )
+    db.add(bus_sync)
+    db.commit()
+    db.refresh(bus_sync)
+    for student_data in sync_data.students:
+        db.add(StudentBLEData(
+            roll_number=student_data.roll_number,
+            device_name=student_data.device_name,
+            device_id=student_data.device_id,
+            timestamp=datetime.fromisoformat(student_data.timestamp.replace('Z', '+00:00')),
+            rssi=student_data.rssi,
+            is_online=student_data.is_online,
+            bus_sync_id=bus_sync.id,
+        ))
+    db.commit()
+    return {"sync_id": bus_sync.id}
+
+
+def payload(sightings):
+    start = datetime(2025, 1, 6, 7, 0, 0)
+    return {
+        "driver_id": "driver-1",
+        "bus_route": "R1",
+        "timestamp": start.isoformat() + "Z",
+        "students": [
+            {
+                "roll_number": f"R{i % 60:03d}",
+                "device_name": f"phone-{i % 60}",
+                "device_id": f"AA:BB:CC:{i % 60:02d}",
+                "timestamp": (start + timedelta(seconds=i // 60)).isoformat() + "Z",
+                "rssi": -40 - i % 50,
+                "is_online": True,
+            }
+            for i in range(sightings)
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from sqlalchemy.orm import Session
+        from app.db.session import SessionLocal
+        from app.schemas.schemas import BusSyncRequest
+
+        app = load_app()
+
+        def get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.post("/bench/legacy_bus_sync")
+        def legacy_route(sync_data: BusSyncRequest, db: Session = Depends(get_db)):
+            return legacy_sync(sync_data, db)
+
+        client = TestClient(app)
+        results = []
+        for size in args.sizes:
+            body = payload(size)
+            row = {"sightings": size}
+            for label, path in (("before", "/bench/legacy_bus_sync"), ("after", "/bus_sync")):
+                best = min(timed(client.post, path, json=body)[1] for _ in range(args.repeat))
+                row[f"{label}_rows_per_s"] = round(size / best)
+            row["speedup"] = round(row["after_rows_per_s"] / row["before_rows_per_s"], 1)
+            results.append(row)
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
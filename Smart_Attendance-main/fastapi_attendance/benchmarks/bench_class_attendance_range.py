@@ -0,0 +1,76 @@
+"""One ``GET /class_attendance/range`` grid vs one ``GET /class_attendance`` call per day.
+
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_class_attendance_range --students 120 --days 90
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from .bench_mark_attendance import seed
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def seed_attendance(class_name, days, start):
+    from sqlalchemy import insert
+    from app.db.session import SessionLocal
+    from app.models.models import Attendance, Class, Enrollment
+
+    db = SessionLocal()
+    try:
+        class_id = db.query(Class.id).filter(Class.name == class_name).scalar()
+        student_ids = [sid for (sid,) in db.query(Enrollment.student_id).filter(Enrollment.class_id == class_id)]
+        db.execute(insert(Attendance), [
+            {"student_id": sid, "class_id": class_id, "date": start + timedelta(days=d),
+             "status": ("present", "present", "present", "absent", "od")[(sid + d) % 5]}
+            for sid in student_ids for d in range(days) if (sid * 7 + d) % 13
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=120)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+
+        client = TestClient(load_app())
+        start = date(2025, 1, 6)
+        seed("Bench", args.students)
+        seed_attendance("Bench", args.days, start)
+        days = [start + timedelta(days=d) for d in range(args.days)]
+
+        def per_day():
+            size = 0
+            for day in days:
+                resp = client.get("/class_attendance", params={"class_name": "Bench", "on": day.isoformat()})
+                resp.raise_for_status()
+                size += len(resp.content)
+            return size
+
+        def grid():
+            resp = client.get("/class_attendance/range", params={
+                "class_name": "Bench", "from": days[0].isoformat(), "to": days[-1].isoformat(),
+            })
+            resp.raise_for_status()
+            return len(resp.content)
+
+        per_day_runs = [timed(per_day) for _ in range(args.repeat)]
+        grid_runs = [timed(grid) for _ in range(args.repeat)]
+        print(json.dumps({
+            "students": args.students,
+            "days": args.days,
+            "per_day_calls": {**summarize([t for _, t in per_day_runs]), "bytes": per_day_runs[0][0]},
+            "range_grid": {**summarize([t for _, t in grid_runs]), "bytes": grid_runs[0][0]},
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
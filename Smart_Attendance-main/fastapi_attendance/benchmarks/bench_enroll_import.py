@@ -0,0 +1,86 @@
+"""Semester onboarding: ``POST /enroll/import`` vs one ``POST /enroll`` per row.
+
+Builds a CSV of ``--students`` students spread over ``--sections`` sections
+(``--rows`` enrollments, every student with a roll number) and imports it
+in one upload. A re-import of the same file shows the all-existing path, and
+a third, under ``tracemalloc``, gives the peak memory of an import (the
+timings run without tracing, which slows Python several times over). The
+per-row baseline posts the first ``--sample`` rows to ``/enroll`` and
+extrapolates to the whole file.
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_enroll_import --students 8000 --sections 300 --rows 50000
+"""
+import argparse
+import io
+import json
+import random
+import tracemalloc
+
+from .common import load_app, temp_workdir, timed
+
+
+def build_csv(students, sections, rows, rng):
+    out = io.StringIO()
+    out.write("student_name,class_name,roll_number\n")
+    for i in range(rows):
+        student = i % students
+        out.write(f"Student {student:05d},Section {rng.randrange(sections):03d},R{student:05d}\n")
+    return out.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=8000)
+    parser.add_argument("--sections", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--sample", type=int, default=1000)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+
+        client = TestClient(load_app())
+        body = build_csv(args.students, args.sections, args.rows, random.Random(7))
+
+        def upload():
+            response = client.post("/enroll/import", files={"file": ("semester.csv", body, "text/csv")})
+            response.raise_for_status()
+            return response.json()
+
+        first, first_seconds = timed(upload)
+        again, again_seconds = timed(upload)
+        tracemalloc.start()
+        upload()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        lines = body.decode().splitlines()[1:args.sample + 1]
+
+        def per_row():
+            for line in lines:
+                name, class_name, roll = line.split(",")
+                client.post("/enroll", json={
+                    "student_name": f"Other {name}", "class_name": f"Other {class_name}",
+                }).raise_for_status()
+
+        _, sample_seconds = timed(per_row)
+
+        print(json.dumps({
+            "rows": args.rows,
+            "csv_bytes": len(body),
+            "import": {**{k: v for k, v in first.items() if k != "error_samples"},
+                       "seconds": round(first_seconds, 2)},
+            "reimport": {**{k: v for k, v in again.items() if k != "error_samples"},
+                         "seconds": round(again_seconds, 2)},
+            "import_peak_mib": round(peak / 2**20, 1),
+            "per_row_enroll": {
+                "sampled_rows": len(lines),
+                "seconds": round(sample_seconds, 2),
+                "extrapolated_seconds": round(sample_seconds * args.rows / len(lines), 1),
+            },
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
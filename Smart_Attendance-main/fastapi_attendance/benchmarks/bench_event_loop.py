@@ -0,0 +1,109 @@
+"""Latency of unrelated requests while large bus syncs are being written.
+
+Compares the async ``/bus_sync`` route against a benchmark-only copy that does
+the same bulk insert through the synchronous session inside ``async def``,
+which is what every async router used to do. Requests are driven through one
+event loop with httpx's ASGI transport, like a single uvicorn worker.
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_event_loop --sightings 20000 --syncs 4
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .bench_bus_sync import payload
+from .bench_od_requests import seed as seed_od_requests
+from .common import load_app, summarize, temp_workdir
+
+
+async def probe(client, path, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        resp = await client.get(path)
+        resp.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.002)
+
+
+async def scenario(app, sync_path, raw_body, syncs):
+    import httpx
+
+    # A blocked loop can deadlock SQLite writers against in-flight readers; count
+    # those as failed syncs instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        samples = []
+        failed = 0
+        prober = asyncio.create_task(probe(client, "/od_requests?limit=20", stop, samples))
+        await asyncio.sleep(0.2)
+        if sync_path:
+            for _ in range(syncs):
+                resp = await client.post(sync_path, content=raw_body, headers={"content-type": "application/json"})
+                failed += resp.status_code != 200
+        else:
+            await asyncio.sleep(1.0)
+        stop.set()
+        await prober
+
+    # Pooled aiosqlite connections belong to this loop; close them before it ends
+    from app.db.session import async_engine
+    await async_engine.dispose()
+    return {**summarize(samples), "failed_syncs": failed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sightings", type=int, default=20000)
+    parser.add_argument("--syncs", type=int, default=4)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi import Depends
+        from sqlalchemy import insert
+        from sqlalchemy.orm import Session
+        from app.db.session import SessionLocal
+        from app.models.models import BusSync, StudentBLEData
+        from app.routers.bus_sync import _ble_rows, _parse_timestamp
+        from app.schemas.schemas import BusSyncRequest
+
+        app = load_app()
+
+        def get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.post("/bench/blocking_bus_sync")
+        async def blocking_route(sync_data: BusSyncRequest, db: Session = Depends(get_db)):
+            bus_sync = BusSync(
+                driver_id=sync_data.driver_id,
+                bus_route=sync_data.bus_route,
+                sync_timestamp=_parse_timestamp(sync_data.timestamp),
+                student_count=len(sync_data.students),
+            )
+            db.add(bus_sync)
+            db.flush()
+            db.execute(insert(StudentBLEData), _ble_rows(sync_data.students, bus_sync.id))
+            db.commit()
+            return {"sync_id": bus_sync.id}
+
+        seed_od_requests(1000)
+        # Encode once up front so the client side does not compete for the loop
+        body = json.dumps(payload(args.sightings)).encode()
+        results = {
+            "sightings_per_sync": args.sightings,
+            "syncs": args.syncs,
+            "idle": asyncio.run(scenario(app, None, body, args.syncs)),
+            "blocking_session": asyncio.run(scenario(app, "/bench/blocking_bus_sync", body, args.syncs)),
+            "async_session": asyncio.run(scenario(app, "/bus_sync", body, args.syncs)),
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Peak memory and throughput of the attendance export streams.
+
+Drives the CSV and Parquet generators behind ``GET /export/attendance``
+directly (the test client buffers whole responses) and records the
+``tracemalloc`` peak for each. "fetch_all_csv" loads every row before
+writing, which is what a non-streaming export would do. Run from the
+``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_export --rows 100000 500000
+"""
+import argparse
+import csv
+import io
+import json
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from .common import temp_workdir
+
+
+def seed(rows, students=500):
+    from sqlalchemy import delete, insert
+    from app.db.session import SessionLocal
+    from app.models.models import Attendance, Class, Enrollment, Student
+
+    db = SessionLocal()
+    try:
+        db.execute(delete(Attendance))
+        if not db.query(Student.id).first():
+            people = [Student(name=f"student-{i:04d}") for i in range(students)]
+            rooms = [Class(name=f"class-{c:02d}") for c in range(20)]
+            db.add_all(people + rooms)
+            db.flush()
+            db.add_all([Enrollment(student_id=p.id, class_id=r.id) for p in people for r in rooms])
+        start = date(2025, 1, 1)
+        batch = []
+        for i in range(rows):
+            student, rest = i % students + 1, i // students
+            batch.append({"student_id": student, "class_id": rest % 20 + 1,
+                          "date": start + timedelta(days=rest // 20), "status": "present" if i % 6 else "absent"})
+            if len(batch) == 20000:
+                db.execute(insert(Attendance), batch)
+                batch = []
+        if batch:
+            db.execute(insert(Attendance), batch)
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(stream):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in stream)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "bytes": size, "peak_mib": round(peak / 2**20, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from app.db.migrations import run_migrations
+        from app.db.session import SessionLocal
+        from app.routers.export import _csv_stream, _export_query, _parquet_stream, pq
+
+        run_migrations()
+
+        def fetch_all_csv(query):
+            db = SessionLocal()
+            try:
+                rows = db.execute(query).all()
+            finally:
+                db.close()
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows((c, s, on.isoformat(), st) for c, s, on, st in rows)
+            yield buffer.getvalue()
+
+        results = []
+        for rows in args.rows:
+            seed(rows)
+            query = _export_query(None, None, None)
+            result = {"rows": rows, "csv": measure(_csv_stream(query)), "fetch_all_csv": measure(fetch_all_csv(query))}
+            if pq is not None:
+                result["parquet"] = measure(_parquet_stream(query))
+            results.append(result)
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Latency and throughput of ``POST /identify_face`` against large enrolled classes.
+
+For each class size the script reports the cold load of the class matrix, the
+endpoint latency for a frame of ``--faces`` embeddings, the raw search
+throughput, the cost of catching up with one new enrolment against a full
+reload from the database, and a per-row Python loop as the unvectorised
+baseline. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_face_identify --sizes 10000 100000
+"""
+import argparse
+import json
+from datetime import datetime
+
+import numpy as np
+
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def seed(class_name, size, dim, rng):
+    from sqlalchemy import insert
+    from app.db.session import SessionLocal
+    from app.models.models import Class, FaceEmbedding
+    from app.services.face_index import normalize
+
+    db = SessionLocal()
+    try:
+        cls = Class(name=class_name)
+        db.add(cls)
+        db.flush()
+        vectors = normalize(rng.standard_normal((size, dim)))
+        created_at = datetime(2025, 1, 1)
+        for start in range(0, size, 5000):
+            db.execute(insert(FaceEmbedding.__table__), [
+                {"roll_number": f"R{i // 2:06d}", "class_id": cls.id,
+                 "vector": vectors[i].tobytes(), "created_at": created_at}
+                for i in range(start, min(start + 5000, size))
+            ])
+        db.commit()
+        return cls.id, vectors
+    finally:
+        db.close()
+
+
+def python_loop(vectors, roll_numbers, query):
+    best, best_score = None, -2.0
+    for roll_number, vector in zip(roll_numbers, vectors):
+        score = float(np.dot(query, vector))
+        if score > best_score:
+            best, best_score = roll_number, score
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--faces", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+        from app.config import settings
+        from app.db.session import SessionLocal
+        from app.services.face_index import face_index
+
+        app = load_app()
+        client = TestClient(app)
+        rng = np.random.default_rng(7)
+        dim = settings.face_embedding_dim
+        results = []
+
+        for size in args.sizes:
+            class_name = f"bench-{size}"
+            class_id, vectors = seed(class_name, size, dim, rng)
+            # Noisy recaptures of enrolled faces, so every query has a true match
+            picks = rng.integers(0, size, args.faces)
+            frame = vectors[picks] + 0.05 * rng.standard_normal((args.faces, dim)).astype(np.float32)
+            body = {"class_name": class_name, "embeddings": frame.tolist(), "top_k": 3}
+
+            face_index.clear()
+            _, cold = timed(client.post, "/identify_face", json=body)
+            response = client.post("/identify_face", json=body)
+            found = [match["roll_number"] for match in response.json()["matches"]]
+            expected = [f"R{i // 2:06d}" for i in picks]
+
+            db = SessionLocal()
+            try:
+                matrix = face_index.matrix(db, class_id)
+                snapshot, roll_numbers = matrix.snapshot()
+                queries = np.ascontiguousarray(frame / np.linalg.norm(frame, axis=1, keepdims=True))
+                search = [timed(face_index.search, db, class_id, queries, 3)[1] for _ in range(args.repeat)]
+                _, reload = timed(face_index._load, db, class_id)
+            finally:
+                db.close()
+
+            # One new enrolment per search: the catch-up reads it and appends, averaged so the
+            # occasional capacity doubling is amortised as it is in service
+            appends = []
+            db = SessionLocal()
+            try:
+                for i in range(args.repeat):
+                    client.post("/face_embeddings", json={
+                        "class_name": class_name, "roll_number": "R-new", "embeddings": [vectors[i].tolist()],
+                    }).raise_for_status()
+                    appends.append(timed(face_index.matrix, db, class_id)[1])
+            finally:
+                db.close()
+            _, loop = timed(python_loop, snapshot, roll_numbers, queries[0])
+
+            results.append({
+                "enrolled": size,
+                "faces_per_request": args.faces,
+                "accuracy": sum(a == b for a, b in zip(found, expected)) / args.faces,
+                "cold_load_ms": round(cold * 1000, 3),
+                "endpoint": summarize([timed(client.post, "/identify_face", json=body)[1] for _ in range(args.repeat)]),
+                "search": summarize(search),
+                "search_faces_per_s": round(args.faces * len(search) / sum(search)),
+                "incremental_catch_up_ms": round(sum(appends) / len(appends) * 1000, 3),
+                "full_reload_ms": round(reload * 1000, 3),
+                "python_loop_one_face_ms": round(loop * 1000, 3),
+            })
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Overhead of ``Idempotency-Key`` on ``/mark_attendance`` as the key table grows.
+
+For each table size in ``--keys`` (finished keys seeded in bulk), times the
+same upsert with a fresh key (claim, run, store), replayed from the
+in-memory cache, and replayed from the table with that cache cleared; the
+un-keyed request is the baseline. The store happens after the response is
+sent, so a real client waits only for the claim; TestClient waits for both.
+Also shows that retries of an un-keyed ``/bus_sync`` create duplicate syncs
+while keyed retries do not.
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_idempotency --keys 0 100000 1000000
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+from .bench_bus_sync import payload
+from .bench_mark_attendance import seed
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def seed_keys(count):
+    """Add ``count`` finished keys to the table."""
+    from app.db.session import SessionLocal
+    from app.models.models import IdempotencyKey
+
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    with SessionLocal() as db:
+        for start in range(0, count, 10000):
+            db.bulk_insert_mappings(IdempotencyKey, [
+                {
+                    "key": os.urandom(16),
+                    "fingerprint": os.urandom(8),
+                    "status_code": 200,
+                    "headers": '[["content-length", "16"], ["content-type", "application/json"]]',
+                    "body": b'{"message":"ok"}',
+                    "expires_at": expires_at,
+                }
+                for _ in range(start, min(count, start + 10000))
+            ])
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--keys", type=int, nargs="+", default=[0, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+        from app.services.idempotency import idempotency_store
+
+        client = TestClient(load_app())
+        names = seed("Bench", 1)
+        body = {"student_name": names[0], "class_name": "Bench", "date": "2025-01-06", "status": "present"}
+
+        def post(**headers):
+            return timed(client.post, "/mark_attendance", json=body, headers=headers)[1]
+
+        post()
+        results = {"no_key": summarize([post() for _ in range(args.repeat)]), "by_table_size": []}
+        seeded = 0
+        for size in sorted(args.keys):
+            seed_keys(size - seeded)
+            seeded = size
+            keys = [{"Idempotency-Key": f"{size}-{i}"} for i in range(args.repeat)]
+            row = {"seeded_keys": size}
+            row["new_key"] = summarize([post(**key) for key in keys])
+            row["replay_cached"] = summarize([post(**key) for key in keys])
+            idempotency_store.completed.clear()
+            row["replay_from_table"] = summarize([post(**key) for key in keys])
+            results["by_table_size"].append(row)
+
+        trip = payload(50)
+        for _ in range(args.retries):
+            client.post("/bus_sync", json=trip).raise_for_status()
+        for _ in range(args.retries):
+            client.post("/bus_sync", json=trip, headers={"Idempotency-Key": "trip-1"}).raise_for_status()
+        syncs = len(client.get("/bus_sync").json()["sync_records"])
+        results["bus_sync_retries"] = {
+            "attempts_each": args.retries,
+            "syncs_created": syncs,
+            "without_key": args.retries,
+            "with_key": syncs - args.retries,
+        }
+        results["stats"] = idempotency_store.stats()
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Latency of manifest-backed ``GET /list_uploads`` against a large uploads folder.
+
+The "directory walk" row is the original handler (``listdir`` plus two stats
+per file), mounted on a benchmark-only route. "after removal" deletes one file
+out of band before every request, so each sample pays a reconcile. Run from the
+``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_list_uploads --files 20000
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+        from app.routers.upload import UPLOAD_DIR
+
+        app = load_app()
+
+        @app.get("/bench/legacy_list_uploads")
+        def legacy_route():
+            files = []
+            for filename in os.listdir(UPLOAD_DIR):
+                file_path = os.path.join(UPLOAD_DIR, filename)
+                if os.path.isfile(file_path):
+                    files.append({
+                        "filename": filename,
+                        "size": os.path.getsize(file_path),
+                        "modified": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
+                    })
+            return {"uploads": files}
+
+        for i in range(args.files):
+            with open(os.path.join(UPLOAD_DIR, f"student_R{i % 2000:04d}_20250101_090000_{i}.jpg"), "wb") as f:
+                f.write(b"\xff\xd8" * 64)
+        client = TestClient(app)
+
+        def sample(path, params, repeat, before=None):
+            samples = []
+            for _ in range(repeat):
+                if before:
+                    before()
+                samples.append(timed(client.get, path, params=params)[1])
+            return summarize(samples)
+
+        remaining = sorted(os.listdir(UPLOAD_DIR))
+
+        def remove_one():
+            os.remove(os.path.join(UPLOAD_DIR, remaining.pop()))
+
+        results = {
+            "files": args.files,
+            "first_listing_backfill": sample("/list_uploads", {}, 1),
+            "first_page": sample("/list_uploads", {}, args.repeat),
+            "roll_filter": sample("/list_uploads", {"student_roll": "R0042"}, args.repeat),
+            "after_removal": sample("/list_uploads", {}, args.repeat, remove_one),
+            "directory_walk": sample("/bench/legacy_list_uploads", {}, 3),
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Latency of non-auth routes while a burst of logins is being verified.
+
+"inline_bcrypt" is the original login, a sync route that verifies on the
+shared request threadpool, mounted on a benchmark-only path. "bounded_pool"
+is ``/auth/login``, which hashes on the capped bcrypt pool and answers 503
+with Retry-After once its queue is full. An async route and a sync route are
+probed throughout. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_login_burst --logins 100 --rounds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from .bench_od_requests import seed as seed_od_requests
+from .common import load_app, summarize, temp_workdir
+
+PROBES = ("/od_requests?limit=20", "/system/cache_stats")
+
+
+async def probe(client, path, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        resp = await client.get(path)
+        resp.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+
+
+async def scenario(app, login_path, logins):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        stop = asyncio.Event()
+        samples = {path: [] for path in PROBES}
+        probers = [asyncio.create_task(probe(client, path, stop, samples[path])) for path in PROBES]
+        await asyncio.sleep(0.2)
+        statuses = []
+        start = time.perf_counter()
+        if login_path:
+            body = {"username": "bench", "password": "bench-password", "role": "teacher"}
+            responses = await asyncio.gather(*(client.post(login_path, json=body) for _ in range(logins)))
+            statuses = [resp.status_code for resp in responses]
+        else:
+            await asyncio.sleep(1.0)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*probers)
+
+    from app.db.session import async_engine
+    await async_engine.dispose()
+    return {
+        "burst_s": round(elapsed, 3),
+        "ok": statuses.count(200),
+        "rejected_503": statuses.count(503),
+        **{path: summarize(values) for path, values in samples.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        from fastapi import Depends, HTTPException
+        from sqlalchemy.orm import Session
+        from app.routers.auth import get_db, get_user_by_username, verify_password
+        from app.schemas.schemas import UserLogin
+
+        app = load_app()
+
+        @app.post("/bench/inline_login")
+        def inline_login(user: UserLogin, db: Session = Depends(get_db)):
+            found = get_user_by_username(db, user.username)
+            if not found or not verify_password(user.password, found.hashed_password):
+                raise HTTPException(status_code=401)
+            return {"user_id": found.id}
+
+        seed_od_requests(1000)
+        from fastapi.testclient import TestClient
+        TestClient(app).post("/auth/register", json={
+            "username": "bench", "password": "bench-password", "role": "teacher", "name": "Bench",
+        })
+
+        results = {
+            "logins": args.logins,
+            "bcrypt_rounds": args.rounds,
+            "idle": asyncio.run(scenario(app, None, args.logins)),
+            "inline_bcrypt": asyncio.run(scenario(app, "/bench/inline_login", args.logins)),
+            "bounded_pool": asyncio.run(scenario(app, "/auth/login", args.logins)),
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
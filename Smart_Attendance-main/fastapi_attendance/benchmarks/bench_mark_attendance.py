@@ -0,0 +1,85 @@
+"""Single-row ``/mark_attendance`` vs ``/mark_attendance/bulk`` for one class roll call.
+
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_mark_attendance --students 120 --days 5
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from .common import load_app, temp_workdir, timed
+
+
+def seed(class_name, students):
+    from app.db.session import SessionLocal
+    from app.models.models import Class, Enrollment, Student
+
+    db = SessionLocal()
+    try:
+        clazz = Class(name=class_name)
+        db.add(clazz)
+        db.flush()
+        names = [f"student-{i:04d}" for i in range(students)]
+        people = [Student(name=name) for name in names]
+        db.add_all(people)
+        db.flush()
+        db.add_all([Enrollment(student_id=p.id, class_id=clazz.id) for p in people])
+        db.commit()
+        return names
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=120)
+    parser.add_argument("--days", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+
+        client = TestClient(load_app())
+        names = seed("Bench", args.students)
+        start_day = date(2025, 1, 6)
+
+        def single(day):
+            for i, name in enumerate(names):
+                status = "present" if i % 7 else "absent"
+                resp = client.post("/mark_attendance", json={
+                    "student_name": name, "class_name": "Bench", "date": day.isoformat(), "status": status,
+                })
+                resp.raise_for_status()
+
+        def bulk(day):
+            resp = client.post("/mark_attendance/bulk", json={
+                "class_name": "Bench",
+                "date": day.isoformat(),
+                "entries": [
+                    {"student_name": name, "status": "present" if i % 7 else "absent"}
+                    for i, name in enumerate(names)
+                ],
+            })
+            resp.raise_for_status()
+
+        single_times, bulk_times = [], []
+        for d in range(args.days):
+            _, elapsed = timed(single, start_day + timedelta(days=2 * d))
+            single_times.append(elapsed)
+            _, elapsed = timed(bulk, start_day + timedelta(days=2 * d + 1))
+            bulk_times.append(elapsed)
+
+        single_ms = 1000 * sum(single_times) / len(single_times)
+        bulk_ms = 1000 * sum(bulk_times) / len(bulk_times)
+        print(json.dumps({
+            "students": args.students,
+            "days": args.days,
+            "single_row_ms_per_class": round(single_ms, 2),
+            "bulk_ms_per_class": round(bulk_ms, 2),
+            "speedup": round(single_ms / bulk_ms, 1),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
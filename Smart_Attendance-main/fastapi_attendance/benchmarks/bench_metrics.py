@@ -0,0 +1,140 @@
+"""Cost of the /metrics instrumentation, and the query counts it reveals.
+
+Runs the same traffic twice in fresh processes, once with
+``METRICS_ENABLED=false`` and once with metrics on (the settings are read at
+import), and reports p50 latency per route for both. The instrumented run
+also reads ``/metrics`` back and lists the mean SQL statements and DB time
+per request, which is where N+1 routes stand out. Process-to-process noise
+in the p50s is larger than the instrumentation itself, so its bookkeeping
+is also timed directly: the cursor hooks per statement and the
+per-request recording.
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_metrics --students 200 --repeat 300
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from .common import ROOT, load_app, summarize, temp_workdir, timed
+
+SERIES = re.compile(r'^(http_request_db_(?:queries|seconds))_(sum|count)\{method="(\w+)",route="([^"]+)"\} (\S+)$')
+
+
+def query_means(text):
+    """Mean statements and DB milliseconds per request, by "METHOD route", from a /metrics scrape."""
+    values = {}
+    for line in text.splitlines():
+        match = SERIES.match(line)
+        if match:
+            name, kind, method, route, value = match.groups()
+            values[(f"{method} {route}", name, kind)] = float(value)
+    means = {}
+    for (route, name, kind), value in values.items():
+        if kind != "sum":
+            continue
+        count = values[(route, name, "count")]
+        key = "queries" if name.endswith("queries") else "db_ms"
+        mean = value / count if count else 0.0
+        means.setdefault(route, {})[key] = round(mean if key == "queries" else mean * 1000, 3)
+    return means
+
+
+def bookkeeping_cost(iterations):
+    """Microseconds spent in the cursor hooks per statement and in recording one request."""
+    import time
+    from app.services.metrics import (
+        MetricsRegistry, _RequestStats, _after_cursor_execute, _before_cursor_execute, _current,
+    )
+
+    class Connection:
+        info = {}
+
+    conn = Connection()
+    token = _current.set(_RequestStats())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        _before_cursor_execute(conn, None, "SELECT 1", (), None, False)
+        _after_cursor_execute(conn, None, "SELECT 1", (), None, False)
+    per_query = (time.perf_counter() - start) / iterations
+    _current.reset(token)
+
+    registry = MetricsRegistry()
+    stats = _RequestStats()
+    start = time.perf_counter()
+    for i in range(iterations):
+        token = _current.set(stats)
+        _current.reset(token)
+        registry.observe("GET", f"/route/{i % 30}", 200, 0.004, stats)
+    per_request = (time.perf_counter() - start) / iterations
+    return {"per_query_us": round(per_query * 1e6, 2), "per_request_us": round(per_request * 1e6, 2)}
+
+
+def child(args):
+    from fastapi.testclient import TestClient
+    from .bench_mark_attendance import seed
+
+    with temp_workdir():
+        client = TestClient(load_app())
+        names = seed("Bench", args.students)
+        token = client.post("/auth/register", json={
+            "username": "bench", "password": "bench-password", "role": "admin", "name": "Bench",
+        }).json()["access_token"]
+        od_id = client.post("/od_requests", data={
+            "student_name": names[0], "roll_number": "R000", "date": "2025-01-06", "reason": "sports meet",
+        }).json()["id"]
+
+        routes = {
+            "POST /mark_attendance": lambda i: client.post("/mark_attendance", json={
+                "student_name": names[i % len(names)], "class_name": "Bench",
+                "date": "2025-01-06", "status": "present" if i % 2 else "absent"}),
+            "POST /enroll": lambda i: client.post("/enroll", json={
+                "student_name": f"new-{i:05d}", "class_name": "Bench"}),
+            "GET /auth/me": lambda i: client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}),
+            "GET /class_attendance": lambda i: client.get("/class_attendance", params={
+                "class_name": "Bench", "on": "2025-01-06"}),
+            "GET /od_requests/{request_id}": lambda i: client.get(f"/od_requests/{od_id}"),
+        }
+        latency = {}
+        for route, send in routes.items():
+            send(0)
+            samples = [timed(send, i)[1] for i in range(1, args.repeat + 1)]
+            latency[route] = summarize(samples)["p50_ms"]
+        scrape = client.get("/metrics")
+        queries = query_means(scrape.text) if scrape.status_code == 200 else {}
+        print(json.dumps({"p50_ms": latency, "per_request": {route: queries.get(route) for route in routes}}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=300)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child(args)
+
+    runs = {}
+    for label, enabled in (("metrics_off", "false"), ("metrics_on", "true")):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_metrics", "--child",
+             "--students", str(args.students), "--repeat", str(args.repeat)],
+            cwd=ROOT, env={**os.environ, "METRICS_ENABLED": enabled},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        runs[label] = json.loads(output.strip().splitlines()[-1])
+
+    off, on = runs["metrics_off"]["p50_ms"], runs["metrics_on"]["p50_ms"]
+    print(json.dumps({
+        "bookkeeping": bookkeeping_cost(100000),
+        "p50_ms": {route: {"metrics_off": off[route], "metrics_on": on[route],
+                           "overhead_ms": round(on[route] - off[route], 3)} for route in off},
+        "per_request": runs["metrics_on"]["per_request"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Approving a week of ODs: ``PUT /od_requests/bulk`` vs one id at a time.
+
+Seeds ``--students`` students with roll numbers, each enrolled in
+``--classes`` classes, and ``--ods`` pending OD requests spread over five
+days. "per_request" is the old flow: ``PUT /od_requests/{id}`` for every
+request, then a teacher re-marking each affected class with
+``PUT /attendance/update``. "bulk" approves the same number of requests in
+one call that also writes the attendance. Run from the ``fastapi_attendance``
+directory::
+
+    python -m benchmarks.bench_od_bulk --students 400 --classes 6 --ods 500
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from .common import load_app, temp_workdir, timed
+
+START = date(2025, 1, 6)
+
+
+def seed(students, classes, ods):
+    """Create the roster and ``2 * ods`` pending requests; returns each half's ``(id, name, date)``."""
+    from sqlalchemy import insert
+    from app.db.session import SessionLocal
+    from app.models.models import Class, Enrollment, ODRequest, Student
+
+    with SessionLocal() as db:
+        db.execute(insert(Class), [{"name": f"Class {c}"} for c in range(classes)])
+        db.execute(insert(Student), [
+            {"name": f"student-{s:04d}", "roll_number": f"R{s:04d}"} for s in range(students)
+        ])
+        db.execute(insert(Enrollment), [
+            {"student_id": s + 1, "class_id": c + 1} for s in range(students) for c in range(classes)
+        ])
+        rows = [
+            {
+                "student_name": f"student-{i % students:04d}",
+                "roll_number": f"R{i % students:04d}",
+                "date": START + timedelta(days=i // students % 5),
+                "reason": "Sports meet",
+                "file_name": "",
+                "status": "pending",
+            }
+            for i in range(2 * ods)
+        ]
+        ids = db.scalars(insert(ODRequest).returning(ODRequest.id, sort_by_parameter_order=True), rows).all()
+        db.commit()
+    requests = [(od_id, row["student_name"], row["date"]) for od_id, row in zip(ids, rows)]
+    return requests[:ods], requests[ods:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--classes", type=int, default=6)
+    parser.add_argument("--ods", type=int, default=500)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+
+        client = TestClient(load_app())
+        one_by_one, batch = seed(args.students, args.classes, args.ods)
+
+        def per_request():
+            for od_id, name, on in one_by_one:
+                client.put(f"/od_requests/{od_id}", json={"status": "approved"}).raise_for_status()
+                for c in range(args.classes):
+                    client.put("/attendance/update", json={
+                        "student_name": name, "class_name": f"Class {c}", "date": on.isoformat(), "status": "od",
+                    }).raise_for_status()
+            return len(one_by_one) * (1 + args.classes)
+
+        def bulk():
+            response = client.put("/od_requests/bulk", json={
+                "ids": [od_id for od_id, _, _ in batch], "status": "approved",
+            })
+            response.raise_for_status()
+            return response.json()
+
+        requests, per_request_seconds = timed(per_request)
+        result, bulk_seconds = timed(bulk)
+        print(json.dumps({
+            "ods": args.ods,
+            "classes_per_student": args.classes,
+            "per_request": {"requests": requests, "seconds": round(per_request_seconds, 2)},
+            "bulk": {**result, "not_found": len(result["not_found"]), "seconds": round(bulk_seconds, 3)},
+            "speedup": round(per_request_seconds / bulk_seconds, 1),
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Page latency of keyset-paginated ``GET /od_requests`` against a large table.
+
+The "full table" row is the original unpaginated handler, mounted on a
+benchmark-only route. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_od_requests --rows 100000
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from .common import load_app, summarize, temp_workdir, timed
+
+STATUSES = ("pending", "approved", "rejected")
+
+
+def seed(rows):
+    from sqlalchemy import insert
+    from app.db.session import SessionLocal
+    from app.models.models import ODRequest
+
+    start = date(2025, 1, 1)
+    db = SessionLocal()
+    try:
+        db.execute(insert(ODRequest), [
+            {
+                "student_name": f"student-{i % 5000}",
+                "roll_number": f"R{i % 5000:05d}",
+                "date": start + timedelta(days=i % 120),
+                "reason": "Sports meet",
+                "file_name": "",
+                "status": STATUSES[i % 3],
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi import Depends
+        from fastapi.testclient import TestClient
+        from sqlalchemy.orm import Session
+        from app.db.session import SessionLocal
+        from app.models.models import ODRequest
+
+        app = load_app()
+
+        def get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        @app.get("/bench/legacy_od_requests")
+        def legacy_route(db: Session = Depends(get_db)):
+            return {"requests": [
+                {"id": r.id, "student_name": r.student_name, "roll_number": r.roll_number, "date": r.date,
+                 "reason": r.reason, "file_name": r.file_name, "status": r.status}
+                for r in db.query(ODRequest).all()
+            ]}
+
+        seed(args.rows)
+        client = TestClient(app)
+
+        def sample(path, params, repeat):
+            return summarize([timed(client.get, path, params=params)[1] for _ in range(repeat)])
+
+        results = {
+            "rows": args.rows,
+            "first_page": sample("/od_requests", {}, args.repeat),
+            "deep_page": sample("/od_requests", {"cursor": 100}, args.repeat),
+            "status_filter": sample("/od_requests", {"status": "approved", "cursor": args.rows // 2}, args.repeat),
+            "roll_number_filter": sample("/od_requests", {"roll_number": "R00042"}, args.repeat),
+            "date_range": sample("/od_requests", {"date_from": "2025-02-01", "date_to": "2025-02-07"}, args.repeat),
+            "full_table": sample("/bench/legacy_od_requests", {}, 2),
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
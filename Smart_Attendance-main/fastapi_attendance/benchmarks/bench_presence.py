@@ -0,0 +1,121 @@
+"""Boarding inference over a synthetic fleet trace.
+
+Generates ``--buses`` buses x ``--students`` students x ``--minutes`` of BLE
+sightings (one every ``--interval`` seconds per phone) with noisy RSSI: each
+student boards and alights at random times and reads around -60 dBm on
+board and -95 dBm off it. Times the vectorised engine per bus and for the
+whole fleet, checks recovered intervals against the ground truth, and runs a
+per-sighting Python loop with the same windows and hysteresis as the
+baseline. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_presence --buses 50 --students 60 --minutes 60
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from .common import ROOT  # noqa: F401  (puts the app package on sys.path)
+
+
+def fleet(buses, students, minutes, interval, rng):
+    start = np.datetime64("2025-01-06T07:00:00", "s")
+    ticks = np.arange(0, minutes * 60, interval)
+    traces = []
+    truth = {}
+    for bus in range(buses):
+        rolls = np.array([f"B{bus:02d}-S{s:03d}" for s in range(students)], dtype=object)
+        board = rng.integers(0, minutes * 20, students)
+        alight = board + rng.integers(minutes * 15, minutes * 40, students)
+        on_board = (ticks[None, :] >= board[:, None]) & (ticks[None, :] < alight[:, None])
+        rssi = np.where(on_board, -60.0, -95.0) + rng.normal(0, 4, on_board.shape)
+        traces.append((
+            np.repeat(rolls, len(ticks)),
+            np.tile(start + ticks, students),
+            rssi.ravel(),
+            rng.random(rssi.size) > 0.05,
+        ))
+        truth.update({roll: (b, a) for roll, b, a in zip(rolls, board, alight)})
+    return traces, truth
+
+
+def python_loop(rolls, seen_at, rssi, online, params):
+    """Per-sighting reference: dicts of windows, then a per-student state machine."""
+    windows = {}
+    origin = min(seen_at[i] for i in range(len(rolls)) if online[i])
+    for i in range(len(rolls)):
+        if not online[i]:
+            continue
+        slot = int((seen_at[i] - origin) / np.timedelta64(1, "s")) // params.window_seconds
+        total, count = windows.setdefault(rolls[i], {}).get(slot, (0.0, 0))
+        windows[rolls[i]][slot] = (total + rssi[i], count + 1)
+    boarded = 0
+    for slots in windows.values():
+        state = False
+        for slot in range(max(slots) + 1):
+            span = [slots[s] for s in range(slot - params.smoothing_windows + 1, slot + 1) if s in slots]
+            level = sum(t for t, _ in span) / sum(c for _, c in span) if span else -np.inf
+            if not state and level >= params.enter_rssi:
+                state = True
+                boarded += 1
+            elif state and level <= params.exit_rssi:
+                state = False
+    return boarded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buses", type=int, default=50)
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--interval", type=int, default=5)
+    args = parser.parse_args()
+
+    from app.services.presence import PresenceParams, infer_intervals
+
+    params = PresenceParams(window_seconds=30, smoothing_windows=3, enter_rssi=-75.0, exit_rssi=-85.0,
+                            min_boarded_seconds=60)
+    traces, truth = fleet(args.buses, args.students, args.minutes, args.interval, np.random.default_rng(3))
+    sightings = sum(len(trace[0]) for trace in traces)
+
+    start = time.perf_counter()
+    intervals = [interval for trace in traces for interval in infer_intervals(*trace, params)]
+    per_bus = time.perf_counter() - start
+
+    merged = [np.concatenate(column) for column in zip(*traces)]
+    start = time.perf_counter()
+    infer_intervals(*merged, params)
+    whole_fleet = time.perf_counter() - start
+
+    start = time.perf_counter()
+    python_loop(*traces[0], params)
+    loop_one_bus = time.perf_counter() - start
+
+    origin = datetime(2025, 1, 6, 7, 0)
+    errors = []
+    for interval in intervals:
+        board, alight = truth[interval.roll_number]
+        errors.append(abs((interval.boarded_at - origin) / timedelta(seconds=1) - board))
+        errors.append(abs((interval.alighted_at - origin) / timedelta(seconds=1) - alight))
+
+    print(json.dumps({
+        "buses": args.buses,
+        "students_per_bus": args.students,
+        "minutes": args.minutes,
+        "sightings": sightings,
+        "intervals": len(intervals),
+        "students_with_one_interval": sum(1 for roll in truth if sum(i.roll_number == roll for i in intervals) == 1)
+        if len(truth) <= 5000 else None,
+        "median_edge_error_s": float(np.median(errors)) if errors else None,
+        "per_bus_total_ms": round(per_bus * 1000, 1),
+        "whole_fleet_one_call_ms": round(whole_fleet * 1000, 1),
+        "sightings_per_s": round(sightings / per_bus),
+        "python_loop_one_bus_ms": round(loop_one_bus * 1000, 1),
+        "vectorised_one_bus_ms": round(per_bus * 1000 / args.buses, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Latency of the cached read endpoints: uncached, cached body, and 304 revalidation.
+
+"uncached" sets the cache size to zero so every request queries and
+serialises as before. Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_read_cache --students 120 --od-rows 10000
+"""
+import argparse
+import json
+from datetime import date
+
+from .bench_bus_sync import payload
+from .bench_class_attendance_range import seed_attendance
+from .bench_mark_attendance import seed as seed_class
+from .bench_od_requests import seed as seed_od_requests
+from .common import load_app, summarize, temp_workdir, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=120)
+    parser.add_argument("--od-rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+        from app.services.read_cache import read_cache
+
+        client = TestClient(load_app())
+        seed_class("Bench", args.students)
+        seed_attendance("Bench", 5, date(2025, 1, 6))
+        seed_od_requests(args.od_rows)
+        for _ in range(60):
+            client.post("/bus_sync", json=payload(50)).raise_for_status()
+
+        endpoints = {
+            "class_attendance": ("/class_attendance", {"class_name": "Bench", "on": "2025-01-08"}),
+            "od_requests": ("/od_requests", {"limit": 200, "status": "pending"}),
+            "bus_sync": ("/bus_sync", {}),
+        }
+        maxsize = read_cache.responses.maxsize
+        results = {}
+        for name, (path, params) in endpoints.items():
+            read_cache.responses.maxsize = 0
+            uncached = [timed(client.get, path, params=params)[1] for _ in range(args.repeat)]
+            read_cache.responses.maxsize = maxsize
+            etag = client.get(path, params=params).headers["etag"]
+            cached = [timed(client.get, path, params=params)[1] for _ in range(args.repeat)]
+            revalidated = [
+                timed(client.get, path, params=params, headers={"If-None-Match": etag})[1]
+                for _ in range(args.repeat)
+            ]
+            results[name] = {
+                "uncached": summarize(uncached),
+                "cached": summarize(cached),
+                "not_modified": summarize(revalidated),
+            }
+        results["cache_stats"] = read_cache.stats()
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
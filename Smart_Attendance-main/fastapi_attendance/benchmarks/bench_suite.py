@@ -0,0 +1,437 @@
+"""Load test for every router against a synthetic institution.
+
+Seeds a throwaway database with ``--students`` students (each with a roll
+number) spread over ``--classes`` classes, ``--days`` days of attendance,
+``--syncs`` bus syncs of ``--sightings`` BLE sightings, ``--od`` OD requests
+and a few face embeddings per class. Each route is then driven in turn by
+``--concurrency`` clients sharing one event loop through httpx's ASGI
+transport, like a single uvicorn worker; requests are built from a fixed
+``--seed``, so two runs of the same tree send the same traffic.
+
+Prints throughput and p50/p95/p99 per route as JSON (also written to
+``--output``). With ``--baseline`` a previous report is compared and routes
+whose p95 grew by more than ``--tolerance`` (and ``--min-delta-ms``) are
+listed; the exit status is 1 if any did. Run from the ``fastapi_attendance``
+directory::
+
+    python -m benchmarks.bench_suite --requests 200 --concurrency 8 --output before.json
+    python -m benchmarks.bench_suite --requests 200 --concurrency 8 --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from .common import load_app, summarize, temp_workdir, timed
+
+START = date(2025, 1, 6)
+BUS_ROUTES = ["North", "South", "East", "West"]
+# Rows per executemany batch while seeding
+SEED_CHUNK_ROWS = 10000
+
+
+@dataclass
+class Institution:
+    classes: list
+    roster: dict  # class name -> student names
+    rolls: dict  # student name -> roll number
+    days: list
+    sync_ids: list
+    od_ids: list
+    token: str = ""
+    password: str = "load-test-password"
+    counter: dict = field(default_factory=dict)
+
+    def next(self, name):
+        """A fresh number per name, for rows that must not collide with earlier requests."""
+        self.counter[name] = self.counter.get(name, 0) + 1
+        return self.counter[name]
+
+
+@dataclass
+class Scenario:
+    route: str  # "METHOD /path" as reported
+    build: object  # (rng, institution) -> (method, url, httpx request kwargs)
+    scale: float = 1.0  # share of --requests; expensive routes send fewer
+
+
+def _insert(db, model, rows):
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), SEED_CHUNK_ROWS):
+        db.execute(insert(model), rows[start:start + SEED_CHUNK_ROWS])
+
+
+def _sightings(rolls, count, departs):
+    return [
+        {
+            "roll_number": rolls[i % len(rolls)],
+            "device_name": f"tag-{rolls[i % len(rolls)]}",
+            "device_id": f"dev-{i % len(rolls)}",
+            "timestamp": (departs + timedelta(seconds=10 * (i // len(rolls)))).isoformat() + "Z",
+            "rssi": -50 - i % 40,
+            "is_online": i % 3 != 0,
+        }
+        for i in range(count)
+    ]
+
+
+def seed_institution(args, rng) -> Institution:
+    """Write the synthetic institution straight to the database."""
+    import numpy as np
+    from sqlalchemy import select
+    from app.config import settings
+    from app.db.session import SessionLocal
+    from app.models.models import (
+        Attendance, BusSync, Class, Enrollment, FaceEmbedding, ODRequest, Student, StudentBLEData,
+    )
+    from app.routers.bus_sync import _ble_rows
+    from app.schemas.schemas import StudentBLEDataRequest
+    from app.services.attendance_summary import rebuild_summary
+
+    class_names = [f"Class {c:03d}" for c in range(args.classes)] + [settings.transport_class_name]
+    names = [f"student-{s:05d}" for s in range(args.students)]
+    rolls = {name: f"R{s:05d}" for s, name in enumerate(names)}
+    days = [START + timedelta(days=d) for d in range(args.days)]
+    now = datetime(2025, 1, 6)
+
+    with SessionLocal() as db:
+        _insert(db, Class, [{"name": name} for name in class_names])
+        _insert(db, Student, [{"name": name, "roll_number": rolls[name]} for name in names])
+        class_ids = dict(db.execute(select(Class.name, Class.id)).all())
+        student_ids = dict(db.execute(select(Student.name, Student.id)).all())
+
+        roster = {name: [] for name in class_names}
+        for name in names:
+            for class_name in rng.sample(class_names[:-1], min(args.classes_per_student, args.classes)):
+                roster[class_name].append(name)
+        # Everyone who rides the bus is enrolled in the transport class
+        roster[settings.transport_class_name] = names[:args.riders]
+        _insert(db, Enrollment, [
+            {"student_id": student_ids[name], "class_id": class_ids[class_name]}
+            for class_name, members in roster.items() for name in members
+        ])
+        _insert(db, Attendance, [
+            {
+                "student_id": student_ids[name],
+                "class_id": class_ids[class_name],
+                "date": on,
+                "status": "absent" if rng.random() < 0.15 else "present",
+            }
+            for class_name, members in roster.items() for name in members for on in days
+        ])
+        rebuild_summary(db)
+
+        sync_ids = []
+        rider_rolls = [rolls[name] for name in names[:args.riders]]
+        for s in range(args.syncs):
+            departs = datetime.combine(days[s % len(days)], datetime.min.time()) + timedelta(hours=7)
+            bus_sync = BusSync(
+                driver_id=f"driver-{s % len(BUS_ROUTES)}",
+                bus_route=BUS_ROUTES[s % len(BUS_ROUTES)],
+                sync_timestamp=departs,
+                student_count=args.sightings,
+            )
+            db.add(bus_sync)
+            db.flush()
+            sightings = [StudentBLEDataRequest(**row) for row in _sightings(rider_rolls, args.sightings, departs)]
+            _insert(db, StudentBLEData, _ble_rows(sightings, bus_sync.id))
+            sync_ids.append(bus_sync.id)
+
+        _insert(db, ODRequest, [
+            {
+                "student_name": names[i % len(names)],
+                "roll_number": rolls[names[i % len(names)]],
+                "date": days[i % len(days)],
+                "reason": "Sports meet",
+                "file_name": "",
+                "status": "pending",
+            }
+            for i in range(args.od)
+        ])
+        od_ids = list(db.scalars(select(ODRequest.id)))
+
+        vectors = np.random.default_rng(args.seed).standard_normal(
+            (args.classes * args.faces_per_class, settings.face_embedding_dim)
+        ).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        _insert(db, FaceEmbedding, [
+            {
+                "roll_number": rolls[roster[class_name][f % len(roster[class_name])]],
+                "class_id": class_ids[class_name],
+                "vector": vectors[c * args.faces_per_class + f].tobytes(),
+                "created_at": now,
+            }
+            for c, class_name in enumerate(class_names[:-1]) if roster[class_name]
+            for f in range(args.faces_per_class)
+        ])
+        db.commit()
+
+    return Institution(
+        classes=[name for name in class_names if roster[name]],
+        roster=roster,
+        rolls=rolls,
+        days=days,
+        sync_ids=sync_ids,
+        od_ids=od_ids,
+    )
+
+
+def scenarios(inst: Institution, args) -> list:
+    """One request factory per route; each call returns ``(method, url, kwargs)``."""
+    from app.config import settings
+
+    def pick_class(rng):
+        return rng.choice(inst.classes[:-1] or inst.classes)
+
+    def pick_member(rng):
+        class_name = pick_class(rng)
+        return class_name, rng.choice(inst.roster[class_name])
+
+    def pick_day(rng):
+        return rng.choice(inst.days).isoformat()
+
+    def auth(rng):
+        return {"headers": {"Authorization": f"Bearer {inst.token}"}}
+
+    def embedding(rng):
+        return [rng.gauss(0, 1) for _ in range(settings.face_embedding_dim)]
+
+    def mark(rng):
+        class_name, name = pick_member(rng)
+        return {"student_name": name, "class_name": class_name, "date": pick_day(rng),
+                "status": rng.choice(["present", "absent"])}
+
+    def new_student(rng):
+        return f"load-{inst.next('student'):06d}"
+
+    def bus_payload(rng):
+        rider_rolls = [inst.rolls[name] for name in inst.roster[settings.transport_class_name]] or ["R0"]
+        departs = datetime.combine(rng.choice(inst.days), datetime.min.time()) + timedelta(hours=16)
+        header = {"driver_id": "driver-load", "bus_route": rng.choice(BUS_ROUTES),
+                  "timestamp": departs.isoformat() + "Z"}
+        return header, _sightings(rider_rolls, args.payload_sightings, departs)
+
+    def bus_stream(rng):
+        header, sightings = bus_payload(rng)
+        lines = [json.dumps(header)] + [json.dumps(row) for row in sightings]
+        return {"content": "\n".join(lines).encode(), "headers": {"content-type": "application/x-ndjson"}}
+
+    def import_csv(rng):
+        rows = ["student_name,class_name,roll_number"]
+        for _ in range(args.import_rows):
+            name = new_student(rng)
+            rows.append(f"{name},{pick_class(rng)},{name.upper()}")
+        return {"files": {"file": ("import.csv", "\n".join(rows).encode(), "text/csv")}}
+
+    def od_form(rng):
+        name = rng.choice(list(inst.rolls))
+        return {"data": {"student_name": name, "roll_number": inst.rolls[name], "date": pick_day(rng),
+                         "reason": "Sports meet"}}
+
+    def sync_batch(rng):
+        operations = [{"type": "attendance", "local_key": f"a{i}", **mark(rng)} for i in range(10)]
+        name = new_student(rng)
+        operations.append({"type": "enrollment", "local_key": "e", "student_name": name,
+                           "class_name": pick_class(rng)})
+        operations.append({"type": "od_request", "local_key": "o", **od_form(rng)["data"]})
+        return {"json": {"operations": operations}}
+
+    def od_ids(rng, count):
+        start = rng.randrange(max(1, len(inst.od_ids) - count))
+        return inst.od_ids[start:start + count]
+
+    image = bytes(random.Random(args.seed).getrandbits(8) for _ in range(args.image_kib * 1024))
+    first_day, last_day = inst.days[0].isoformat(), inst.days[-1].isoformat()
+
+    return [
+        Scenario("POST /auth/register", lambda rng: ("POST", "/auth/register", {"json": {
+            "username": f"user-{inst.next('user')}", "password": inst.password, "role": "teacher",
+            "name": "Load Test"}}), scale=0.1),
+        Scenario("POST /auth/login", lambda rng: ("POST", "/auth/login", {"json": {
+            "username": "load-admin", "password": inst.password, "role": "admin"}}), scale=0.1),
+        Scenario("GET /auth/validate", lambda rng: ("GET", "/auth/validate", auth(rng))),
+        Scenario("GET /auth/me", lambda rng: ("GET", "/auth/me", auth(rng))),
+        Scenario("POST /enroll", lambda rng: ("POST", "/enroll", {"json": {
+            "student_name": new_student(rng), "class_name": pick_class(rng)}})),
+        Scenario("POST /enroll/import", lambda rng: ("POST", "/enroll/import", import_csv(rng)), scale=0.1),
+        Scenario("POST /mark_attendance", lambda rng: ("POST", "/mark_attendance", {"json": mark(rng)})),
+        Scenario("POST /mark_attendance/bulk", lambda rng: ("POST", "/mark_attendance/bulk", {"json": {
+            "class_name": (class_name := pick_class(rng)), "date": pick_day(rng),
+            "entries": [{"student_name": name, "status": "present"} for name in inst.roster[class_name]]}})),
+        Scenario("GET /class_attendance", lambda rng: ("GET", "/class_attendance", {"params": {
+            "class_name": pick_class(rng), "on": pick_day(rng)}})),
+        Scenario("GET /class_attendance/range", lambda rng: ("GET", "/class_attendance/range", {"params": {
+            "class_name": pick_class(rng), "from": first_day, "to": last_day}})),
+        Scenario("PUT /attendance/update", lambda rng: ("PUT", "/attendance/update", {"json": mark(rng)})),
+        Scenario("GET /attendance/summary/student", lambda rng: ("GET", "/attendance/summary/student", {
+            "params": {"student_name": pick_member(rng)[1]}})),
+        Scenario("GET /attendance/summary/class", lambda rng: ("GET", "/attendance/summary/class", {
+            "params": {"class_name": pick_class(rng)}})),
+        Scenario("GET /attendance/summary/below_threshold", lambda rng: (
+            "GET", "/attendance/summary/below_threshold", {"params": {"class_name": pick_class(rng)}})),
+        Scenario("POST /upload_face", lambda rng: ("POST", "/upload_face", {
+            "data": {"student_roll": inst.rolls[pick_member(rng)[1]]},
+            "files": {"image": ("face.jpg", image, "image/jpeg")}})),
+        Scenario("GET /list_uploads", lambda rng: ("GET", "/list_uploads", {"params": {"limit": 50}})),
+        Scenario("POST /od_requests", lambda rng: ("POST", "/od_requests", od_form(rng))),
+        Scenario("GET /od_requests", lambda rng: ("GET", "/od_requests", {"params": rng.choice([
+            {"limit": 50}, {"status": "pending"}, {"roll_number": inst.rolls[pick_member(rng)[1]]},
+            {"date_from": first_day, "date_to": pick_day(rng)}])})),
+        Scenario("PUT /od_requests/bulk", lambda rng: ("PUT", "/od_requests/bulk", {"json": {
+            "ids": od_ids(rng, 10), "status": rng.choice(["approved", "rejected"])}})),
+        Scenario("PUT /od_requests/{request_id}", lambda rng: (
+            "PUT", f"/od_requests/{rng.choice(inst.od_ids)}", {"json": {"status": "approved"}})),
+        Scenario("GET /od_requests/{request_id}", lambda rng: (
+            "GET", f"/od_requests/{rng.choice(inst.od_ids)}", {})),
+        Scenario("POST /bus_sync", lambda rng: ("POST", "/bus_sync", {"json": {
+            **(payload := bus_payload(rng))[0], "students": payload[1]}}), scale=0.5),
+        Scenario("POST /bus_sync/stream", lambda rng: ("POST", "/bus_sync/stream", bus_stream(rng)), scale=0.5),
+        Scenario("GET /bus_sync", lambda rng: ("GET", "/bus_sync", {})),
+        Scenario("GET /bus_sync/{sync_id}/students", lambda rng: (
+            "GET", f"/bus_sync/{rng.choice(inst.sync_ids)}/students", {})),
+        Scenario("POST /face_embeddings", lambda rng: ("POST", "/face_embeddings", {"json": {
+            "roll_number": inst.rolls[(member := pick_member(rng))[1]], "class_name": member[0],
+            "embeddings": [embedding(rng)]}})),
+        Scenario("POST /identify_face", lambda rng: ("POST", "/identify_face", {"json": {
+            "class_name": pick_class(rng), "embeddings": [embedding(rng)], "top_k": 3}})),
+        Scenario("GET /export/attendance", lambda rng: ("GET", "/export/attendance", {"params": {
+            "class_name": pick_class(rng), "date_from": first_day, "date_to": last_day}}), scale=0.5),
+        Scenario("GET /bus_sync/{sync_id}/presence", lambda rng: (
+            "GET", f"/bus_sync/{rng.choice(inst.sync_ids)}/presence", {})),
+        Scenario("GET /presence", lambda rng: ("GET", "/presence", {"params": {
+            "bus_route": rng.choice(BUS_ROUTES), "on": pick_day(rng)}})),
+        Scenario("POST /presence/attendance", lambda rng: ("POST", "/presence/attendance", {"params": {
+            "bus_route": rng.choice(BUS_ROUTES), "on": pick_day(rng)}})),
+        Scenario("POST /sync/batch", lambda rng: ("POST", "/sync/batch", sync_batch(rng))),
+        Scenario("GET /system/cache_stats", lambda rng: ("GET", "/system/cache_stats", {})),
+        Scenario("GET /system/pool", lambda rng: ("GET", "/system/pool", {})),
+        Scenario("GET /metrics", lambda rng: ("GET", "/metrics", {})),
+    ]
+
+
+async def drive(client, scenario, inst, requests, concurrency, rng):
+    """Send ``requests`` requests from ``concurrency`` workers; returns the route's report."""
+    # Build every request up front so the workers only time the round trips
+    prepared = [scenario.build(rng) for _ in range(requests)]
+    samples = []
+    statuses = {}
+    pending = iter(prepared)
+
+    async def worker():
+        for method, url, kwargs in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                status = str(response.status_code)
+            except Exception as exc:
+                status = type(exc).__name__
+            samples.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    errors = sum(count for status, count in statuses.items() if not status.isdigit() or status >= "500")
+    return {
+        "requests": requests,
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": round(requests / elapsed, 1),
+        **summarize(samples),
+    }
+
+
+async def run(app, inst, selected, args):
+    import httpx
+    from app.db.session import async_engine
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    rng = random.Random(args.seed)
+    report = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+            response = await client.post("/auth/register", json={
+                "username": "load-admin", "password": inst.password, "role": "admin", "name": "Load Admin"})
+            response.raise_for_status()
+            inst.token = response.json()["access_token"]
+            for scenario in selected:
+                requests = max(1, int(args.requests * scenario.scale))
+                report[scenario.route] = await drive(client, scenario, inst, requests, args.concurrency, rng)
+    finally:
+        # Pooled aiosqlite connections belong to this loop; close them before it ends
+        await async_engine.dispose()
+    return report
+
+
+def regressions(report, baseline, tolerance, min_delta_ms):
+    """Routes whose p95 grew past both the relative tolerance and the absolute floor."""
+    found = {}
+    for route, now in report.items():
+        before = baseline.get(route)
+        if before is None:
+            continue
+        delta = now["p95_ms"] - before["p95_ms"]
+        if delta > min_delta_ms and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found[route] = {"baseline_p95_ms": before["p95_ms"], "p95_ms": now["p95_ms"]}
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--classes", type=int, default=40)
+    parser.add_argument("--classes-per-student", type=int, default=5)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--riders", type=int, default=300, help="students enrolled in the transport class")
+    parser.add_argument("--syncs", type=int, default=40)
+    parser.add_argument("--sightings", type=int, default=2000, help="BLE sightings per seeded sync")
+    parser.add_argument("--od", type=int, default=5000)
+    parser.add_argument("--faces-per-class", type=int, default=20)
+    parser.add_argument("--payload-sightings", type=int, default=500, help="sightings per posted sync")
+    parser.add_argument("--import-rows", type=int, default=500)
+    parser.add_argument("--image-kib", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--routes", nargs="+", help="only routes containing one of these strings")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="also write the report here")
+    parser.add_argument("--baseline", help="earlier report to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 growth")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore p95 growth below this")
+    args = parser.parse_args()
+
+    with temp_workdir():
+        app = load_app()
+        inst, seed_seconds = timed(seed_institution, args, random.Random(args.seed))
+        selected = [
+            scenario for scenario in scenarios(inst, args)
+            if not args.routes or any(part in scenario.route for part in args.routes)
+        ]
+        report = asyncio.run(run(app, inst, selected, args))
+
+    result = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "seed_seconds": round(seed_seconds, 2),
+        "routes": report,
+    }
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["routes"]
+        result["regressions"] = regressions(report, baseline, args.tolerance, args.min_delta_ms)
+        failed = bool(result["regressions"])
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
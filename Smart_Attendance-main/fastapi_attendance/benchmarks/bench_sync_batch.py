@@ -0,0 +1,101 @@
+"""Replaying an offline queue: one request per record vs one ``/sync/batch``.
+
+The queue holds ``--enrollments`` new students, attendance for every
+enrolled student over ``--days`` days, and ``--od`` OD requests, which is
+what a device that was offline for a while sends on reconnect. "per_record"
+replays it the way the client used to (``/enroll``, ``/mark_attendance``,
+``/od_requests`` one at a time); "batch" sends it as one request. In-process
+TestClient calls carry no network latency, so on a real link every saved
+round trip adds its RTT on top. Run from the ``fastapi_attendance``
+directory::
+
+    python -m benchmarks.bench_sync_batch --enrollments 40 --days 5 --od 20
+"""
+import argparse
+import json
+from datetime import date, timedelta
+
+from .bench_mark_attendance import seed
+from .common import load_app, temp_workdir, timed
+
+
+def queue(names, enrollments, days, od, tag):
+    """The offline queue as /sync/batch operations, enrollments first."""
+    start = date(2025, 1, 6)
+    new = [f"{tag}-new-{i:03d}" for i in range(enrollments)]
+    operations = [
+        {"type": "enrollment", "local_key": f"e-{name}", "student_name": name, "class_name": "Bench"}
+        for name in new
+    ]
+    operations += [
+        {
+            "type": "attendance",
+            "local_key": f"a-{name}-{day}",
+            "student_name": name,
+            "class_name": "Bench",
+            "date": (start + timedelta(days=day)).isoformat(),
+            "status": "present" if i % 7 else "absent",
+        }
+        for day in range(days)
+        for i, name in enumerate(names + new)
+    ]
+    operations += [
+        {
+            "type": "od_request",
+            "local_key": f"o-{tag}-{i}",
+            "student_name": names[i % len(names)],
+            "roll_number": f"R{i:03d}",
+            "date": start.isoformat(),
+            "reason": "sports meet",
+        }
+        for i in range(od)
+    ]
+    return operations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--enrollments", type=int, default=40)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--od", type=int, default=20)
+    args = parser.parse_args()
+
+    with temp_workdir():
+        from fastapi.testclient import TestClient
+
+        client = TestClient(load_app())
+        names = seed("Bench", args.students)
+
+        def per_record(operations):
+            for op in operations:
+                if op["type"] == "enrollment":
+                    client.post("/enroll", json=op).raise_for_status()
+                elif op["type"] == "attendance":
+                    client.post("/mark_attendance", json=op).raise_for_status()
+                else:
+                    fields = {k: v for k, v in op.items() if k not in ("type", "local_key")}
+                    client.post("/od_requests", data=fields).raise_for_status()
+            return len(operations)
+
+        def batch(operations):
+            response = client.post("/sync/batch", json={"operations": operations})
+            response.raise_for_status()
+            return response.json()["applied"]
+
+        results = {}
+        for label, replay in (("per_record", per_record), ("batch", batch)):
+            operations = queue(names, args.enrollments, args.days, args.od, label)
+            applied, seconds = timed(replay, operations)
+            results[label] = {
+                "operations": len(operations),
+                "applied": applied,
+                "requests": len(operations) if label == "per_record" else 1,
+                "seconds": round(seconds, 3),
+            }
+        results["speedup"] = round(results["per_record"]["seconds"] / results["batch"]["seconds"], 1)
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Face and OD uploads: the content store vs saving each upload whole.
+
+"legacy" is a benchmark-only copy of the old handlers: the OD route read the
+attachment into memory with ``await file.read()`` and the face route copied
+it with ``shutil.copyfileobj`` on the event loop, one file per upload.
+Measures Python peak memory for one ``--size-mib`` OD attachment, disk used
+by ``--duplicates`` uploads of the same face image, ``/od_requests`` probe
+latency while ``--uploads`` attachments are saved, and how much of an
+oversized body is read before it is turned away. Requests go through one
+event loop with httpx's ASGI transport, like a single uvicorn worker.
+Run from the ``fastapi_attendance`` directory::
+
+    python -m benchmarks.bench_upload_store --size-mib 8 --duplicates 50 --uploads 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import time
+import tracemalloc
+
+from .bench_event_loop import probe
+from .bench_od_requests import seed as seed_od_requests
+from .common import load_app, summarize, temp_workdir, timed_async
+
+OD_FIELDS = {"student_name": "Bench", "roll_number": "R001", "date": "2025-01-06", "reason": "sports meet"}
+BOUNDARY = "bench"
+RECEIVE_BYTES = 64 * 1024
+MULTIPART = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+
+def od_form_head():
+    """Multipart body up to the attachment bytes, which the caller appends (then ``OD_FORM_TAIL``)."""
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        for name, value in OD_FIELDS.items()
+    ]
+    parts.append(f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="note.pdf"\r\n'
+                 "Content-Type: application/pdf\r\n\r\n")
+    return "".join(parts).encode()
+
+
+OD_FORM_TAIL = f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def client_for(app):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None)
+
+
+async def post_od(client, path, form):
+    """Post a multipart body encoded up front, in the 64 KiB pieces a server hands the app."""
+    async def pieces():
+        view = memoryview(form)
+        for start in range(0, len(form), RECEIVE_BYTES):
+            yield view[start:start + RECEIVE_BYTES]
+
+    resp = await client.post(path, content=pieces(), headers=MULTIPART)
+    return resp.status_code
+
+
+async def peak_memory(app, paths, form):
+    results = {}
+    async with client_for(app) as client:
+        for label, path in paths.items():
+            await post_od(client, path, form)
+            tracemalloc.start()
+            await post_od(client, path, form)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[label] = round(peak / 2**20, 1)
+    return results
+
+
+async def duplicates(app, paths, image, count):
+    results = {}
+    async with client_for(app) as client:
+        for label, (path, folder) in paths.items():
+            before = disk_usage(folder)
+            for i in range(count):
+                resp = await client.post(path, data={"student_roll": f"R{i:03d}"},
+                                         files={"image": ("face.jpg", image, "image/jpeg")})
+                resp.raise_for_status()
+            results[label] = {"uploads": count, "disk_mib": round((disk_usage(folder) - before) / 2**20, 1)}
+    return results
+
+
+async def under_load(app, path, form, uploads):
+    async with client_for(app) as client:
+        stop = asyncio.Event()
+        samples = []
+        prober = asyncio.create_task(probe(client, "/od_requests?limit=20", stop, samples))
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        if path:
+            for _ in range(uploads):
+                await post_od(client, path, form)
+        else:
+            await asyncio.sleep(1.0)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await prober
+    return {**summarize(samples), "upload_seconds": round(elapsed, 2)}
+
+
+async def oversized(app, path, body):
+    """Status and bytes consumed for an upload streamed without a Content-Length."""
+    import httpx
+
+    sent = 0
+    chunk = 1 << 20
+
+    async def stream():
+        nonlocal sent
+        yield od_form_head()
+        for start in range(0, len(body), chunk):
+            sent += chunk
+            yield body[start:start + chunk]
+        yield OD_FORM_TAIL
+
+    async with client_for(app) as client:
+        request = client.build_request("POST", path, content=stream(), headers=MULTIPART)
+        resp, seconds = await timed_async(client.send(request))
+    return {"status": resp.status_code, "mib_read": round(sent / 2**20, 1), "seconds": round(seconds, 3)}
+
+
+async def run(coro):
+    """Run one scenario, then close the pooled aiosqlite connections bound to its loop."""
+    from app.db.session import async_engine
+
+    try:
+        return await coro
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mib", type=int, default=8)
+    parser.add_argument("--duplicates", type=int, default=50)
+    parser.add_argument("--image-kib", type=int, default=400)
+    parser.add_argument("--uploads", type=int, default=8)
+    parser.add_argument("--oversize-mib", type=int, default=100)
+    args = parser.parse_args()
+
+    with temp_workdir() as workdir:
+        from datetime import date, datetime
+        from fastapi import Depends, File, Form, UploadFile
+        from sqlalchemy.ext.asyncio import AsyncSession
+        from app.config import settings
+        from app.models.models import ODRequest
+        from app.routers.od_requests import get_db
+
+        app = load_app()
+        legacy_od_dir = os.path.join(workdir, "od_uploads")
+        legacy_face_dir = os.path.join(workdir, "legacy_faces")
+        os.makedirs(legacy_od_dir)
+        os.makedirs(legacy_face_dir)
+
+        @app.post("/bench/legacy_od_requests")
+        async def legacy_od(student_name: str = Form(...), roll_number: str = Form(...),
+                            date_: str = Form(..., alias="date"), reason: str = Form(...),
+                            file: UploadFile = File(None), db: AsyncSession = Depends(get_db)):
+            file_name = f"od_{roll_number}_{date_}_{file.filename}"
+            with open(os.path.join(legacy_od_dir, file_name), "wb") as buffer:
+                content = await file.read()
+                buffer.write(content)
+            db.add(ODRequest(student_name=student_name, roll_number=roll_number,
+                             date=date.fromisoformat(date_), reason=reason,
+                             file_name=file_name, status="pending"))
+            await db.commit()
+            return {"file_name": file_name}
+
+        @app.post("/bench/legacy_upload_face")
+        async def legacy_face(image: UploadFile = File(...), student_roll: str = Form(...)):
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            path = os.path.join(legacy_face_dir, f"student_{student_roll}_{timestamp}_{image.filename}")
+            with open(path, "wb") as buffer:
+                shutil.copyfileobj(image.file, buffer)
+            return {"file_size": os.path.getsize(path)}
+
+        seed_od_requests(1000)
+        attachment = od_form_head() + os.urandom(args.size_mib << 20) + OD_FORM_TAIL
+        image = os.urandom(args.image_kib << 10)
+        od_paths = {"legacy": "/bench/legacy_od_requests", "store": "/od_requests"}
+
+        results = {
+            "attachment_mib": args.size_mib,
+            "peak_memory_mib": asyncio.run(run(peak_memory(app, od_paths, attachment))),
+            "duplicate_faces": asyncio.run(run(duplicates(app, {
+                "legacy": ("/bench/legacy_upload_face", legacy_face_dir),
+                "store": ("/upload_face", settings.upload_store_dir),
+            }, image, args.duplicates))),
+            "probe_latency": {
+                "idle": asyncio.run(run(under_load(app, None, attachment, args.uploads))),
+                **{label: asyncio.run(run(under_load(app, path, attachment, args.uploads)))
+                   for label, path in od_paths.items()},
+            },
+        }
+        oversize = os.urandom(args.oversize_mib << 20)
+        results["oversized_upload"] = {
+            "body_mib": args.oversize_mib,
+            "od_limit_mib": round(settings.od_upload_max_bytes / 2**20, 1),
+            **{label: asyncio.run(run(oversized(app, path, oversize))) for label, path in od_paths.items()},
+        }
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
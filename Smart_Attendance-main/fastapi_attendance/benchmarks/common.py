@@ -0,0 +1,68 @@
+"""Shared helpers for the benchmark scripts.
+
+Every benchmark drives the API in-process against a throwaway SQLite database
+inside a temporary working directory, so the checked-in ``attendance.db`` and
+the upload folders are never touched.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+@contextmanager
+def temp_workdir():
+    """Run the enclosed block from a fresh temporary directory."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous)
+
+
+def load_app():
+    """Import the FastAPI app; call only from inside ``temp_workdir``."""
+    from app.main import app
+    return app
+
+
+def timed(fn, *args, **kwargs):
+    """Return ``(result, seconds)`` for a single call."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+async def timed_async(awaitable):
+    """Return ``(result, seconds)`` for awaiting ``awaitable`` once."""
+    start = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - start
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of ``samples`` (``pct`` in 0-100)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """Latency summary in milliseconds."""
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
@@ -0,0 +1,51 @@
+"""Shared fixtures for the API tests.
+
+The app creates its engines, upload folders and schema when it is imported,
+so before anything imports it this module moves into a temporary directory
+and points ``DATABASE_URL`` at a fresh SQLite file there. All tests share
+that database; each one uses its own class, student and key names. Run from
+the ``fastapi_attendance`` directory::
+
+    python -m pytest tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_previous_cwd = os.getcwd()
+_workdir = tempfile.mkdtemp(prefix="attendance-tests-")
+os.chdir(_workdir)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'attendance.db')}"
+
+
+def pytest_unconfigure(config):
+    os.chdir(_previous_cwd)
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    # Entering the client runs the lifespan, which disposes the pools on exit
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,93 @@
+from datetime import date
+
+from app.models.models import AttendanceSummary
+from app.services.attendance_summary import apply_transitions, rebuild_summary
+
+MON, TUE, WED, THU = (date(2025, 1, day) for day in (6, 7, 8, 9))
+
+
+def enroll(client, student_name, class_name):
+    body = client.post("/enroll", json={"student_name": student_name, "class_name": class_name}).json()
+    return body["student_id"], body["class_id"]
+
+
+def summary(db, student_id, class_id):
+    row = db.query(AttendanceSummary).filter_by(student_id=student_id, class_id=class_id).one_or_none()
+    return row and (row.present_count, row.absent_count, row.first_date, row.last_date)
+
+
+def class_summary(db, class_id):
+    rows = db.query(AttendanceSummary).filter_by(class_id=class_id).order_by(AttendanceSummary.student_id)
+    return [(row.student_id, row.present_count, row.absent_count, row.first_date, row.last_date) for row in rows]
+
+
+def test_first_marks_add_to_the_counts_and_date_range(client, db):
+    student_id, class_id = enroll(client, "summary-ada", "summary-first")
+    apply_transitions(db, [
+        (student_id, class_id, TUE, None, "present"),
+        (student_id, class_id, WED, None, "absent"),
+    ])
+    assert summary(db, student_id, class_id) == (1, 1, TUE, WED)
+
+    apply_transitions(db, [(student_id, class_id, MON, None, "od")])
+    assert summary(db, student_id, class_id) == (2, 1, MON, WED)
+
+
+def test_status_changes_move_counts_between_columns(client, db):
+    student_id, class_id = enroll(client, "summary-bo", "summary-change")
+    apply_transitions(db, [(student_id, class_id, MON, None, "absent"), (student_id, class_id, TUE, None, "present")])
+    apply_transitions(db, [(student_id, class_id, MON, "absent", "od")])
+    assert summary(db, student_id, class_id) == (2, 0, MON, TUE)
+
+    apply_transitions(db, [(student_id, class_id, TUE, "present", "absent")])
+    assert summary(db, student_id, class_id) == (1, 1, MON, TUE)
+
+
+def test_unchanged_rewrite_moves_neither_counts_nor_dates(client, db):
+    student_id, class_id = enroll(client, "summary-cy", "summary-rewrite")
+    apply_transitions(db, [(student_id, class_id, MON, None, "present")])
+    apply_transitions(db, [(student_id, class_id, THU, "present", "od"), (student_id, class_id, THU, "absent", "absent")])
+    assert summary(db, student_id, class_id) == (1, 0, MON, MON)
+
+
+def test_transitions_for_one_student_are_combined(client, db):
+    student_id, class_id = enroll(client, "summary-di", "summary-combined")
+    other_id, _ = enroll(client, "summary-ed", "summary-combined")
+    apply_transitions(db, [
+        (student_id, class_id, MON, None, "present"),
+        (student_id, class_id, MON, "present", "absent"),
+        (student_id, class_id, WED, None, "present"),
+        (other_id, class_id, TUE, None, "absent"),
+    ])
+    assert summary(db, student_id, class_id) == (1, 1, MON, WED)
+    assert summary(db, other_id, class_id) == (0, 1, TUE, TUE)
+
+
+def test_api_writes_keep_the_summary_equal_to_a_rebuild(client, db):
+    names = ["summary-fay", "summary-gus", "summary-hal"]
+    class_name = "summary-api"
+    class_id = None
+    for name in names:
+        _, class_id = enroll(client, name, class_name)
+    mark = {"student_name": names[0], "class_name": class_name}
+    assert client.post("/mark_attendance", json={**mark, "date": "2025-01-06", "status": "present"}).status_code == 200
+    assert client.post("/mark_attendance", json={**mark, "date": "2025-01-07", "status": "absent"}).status_code == 200
+    assert client.put("/attendance/update", json={**mark, "date": "2025-01-07", "status": "od"}).status_code == 200
+    assert client.post("/mark_attendance/bulk", json={
+        "class_name": class_name,
+        "date": "2025-01-08",
+        "entries": [{"student_name": name, "status": status} for name, status in zip(names, ["absent", "present", "late"])],
+    }).status_code == 200
+    assert client.post("/sync/batch", json={"operations": [
+        {"type": "attendance", "local_key": "a", "student_name": names[1], "class_name": class_name,
+         "date": "2025-01-08", "status": "absent"},
+        {"type": "attendance", "local_key": "b", "student_name": names[2], "class_name": class_name,
+         "date": "2025-01-09", "status": "present"},
+    ]}).status_code == 200
+
+    incremental = class_summary(db, class_id)
+    rebuild_summary(db)
+    try:
+        assert incremental == class_summary(db, class_id)
+    finally:
+        db.rollback()
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from app.models.models import BusSync, StudentBLEMinute
+from app.services.ble_retention import run_compaction
+
+SIGHTINGS = [
+    # roll, device, second within the trip, rssi, online
+    ("BLE-1", "phone-1", 5, -40, True),
+    ("BLE-1", "phone-1", 30, -60, False),
+    ("BLE-1", "phone-1", 59, -55, False),
+    ("BLE-1", "phone-1", 61, -70, False),
+    ("BLE-2", "phone-2", 10, -80, False),
+    ("BLE-2", "phone-2", 20, -81, False),
+]
+
+
+def post_sync(client, start):
+    response = client.post("/bus_sync", json={
+        "driver_id": "ble-driver",
+        "bus_route": "ble-route",
+        "timestamp": start.isoformat(),
+        "students": [
+            {
+                "roll_number": roll, "device_name": device, "device_id": f"id-{device}",
+                "timestamp": (start + timedelta(seconds=second)).isoformat(), "rssi": rssi, "is_online": online,
+            }
+            for roll, device, second, rssi, online in SIGHTINGS
+        ],
+    })
+    assert response.status_code == 200
+    return response.json()["sync_id"]
+
+
+def by_minute(raw):
+    """What compaction should produce from raw sightings: one row per student, device and minute."""
+    groups = {}
+    for row in raw:
+        minute = datetime.fromisoformat(row["timestamp"]).replace(second=0, microsecond=0)
+        groups.setdefault((row["roll_number"], row["device_name"], row["device_id"], minute), []).append(row)
+    expected = {}
+    for (roll, device, device_id, minute), rows in groups.items():
+        rssi = [row["rssi"] for row in rows]
+        expected[(roll, device, minute.isoformat())] = {
+            "roll_number": roll,
+            "device_name": device,
+            "device_id": device_id,
+            "timestamp": minute.isoformat(),
+            "rssi": round(sum(rssi) / len(rssi)),
+            "is_online": "true" if any(row["is_online"] == "true" for row in rows) else "false",
+            "rssi_min": min(rssi),
+            "rssi_max": max(rssi),
+            "sightings": len(rows),
+            "compacted": True,
+        }
+    return expected
+
+
+def test_compacted_sync_students_match_the_raw_sightings(client):
+    # Past raw retention but well inside summary retention
+    start = (datetime.utcnow() - timedelta(days=30)).replace(second=0, microsecond=0)
+    sync_id = post_sync(client, start)
+    raw = client.get(f"/bus_sync/{sync_id}/students").json()["students"]
+    assert len(raw) == len(SIGHTINGS)
+
+    report = run_compaction()
+    assert report["syncs_compacted"] >= 1
+
+    compacted = client.get(f"/bus_sync/{sync_id}/students").json()["students"]
+    assert {(row["roll_number"], row["device_name"], row["timestamp"]): row for row in compacted} == by_minute(raw)
+    assert sum(row["sightings"] for row in compacted) == len(SIGHTINGS)
+    assert [row["timestamp"] for row in compacted] == sorted(row["timestamp"] for row in compacted)
+
+
+def test_recent_syncs_keep_their_raw_sightings(client):
+    sync_id = post_sync(client, datetime.utcnow().replace(microsecond=0))
+    run_compaction()
+    students = client.get(f"/bus_sync/{sync_id}/students").json()["students"]
+    assert len(students) == len(SIGHTINGS)
+    assert not any(row.get("compacted") for row in students)
+
+
+def test_expired_syncs_are_purged_once_and_pruned_after_the_history_window(client, db):
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    expired = post_sync(client, now - timedelta(days=400))
+    ancient = post_sync(client, now - timedelta(days=800))
+
+    report = run_compaction()
+    assert report["summary_rows_purged"] > 0
+    assert report["syncs_pruned"] >= 1
+    assert db.query(StudentBLEMinute).filter(StudentBLEMinute.bus_sync_id.in_([expired, ancient])).count() == 0
+    assert db.get(BusSync, expired).purged_at is not None
+    assert db.get(BusSync, ancient) is None
+
+    # Stamped syncs are not looked at again
+    assert run_compaction()["summary_rows_purged"] == 0
+    assert client.get(f"/bus_sync/{expired}/students").json()["students"] == []
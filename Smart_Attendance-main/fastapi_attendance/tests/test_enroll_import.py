@@ -0,0 +1,83 @@
+import pytest
+
+from app.models.models import Enrollment, Student
+from app.routers import enroll
+
+
+def import_csv(client, text):
+    return client.post("/enroll/import", files={"file": ("roster.csv", text.encode(), "text/csv")})
+
+
+def rolls(db, *names):
+    found = dict(db.query(Student.name, Student.roll_number).filter(Student.name.in_(names)))
+    return tuple(found.get(name) for name in names)
+
+
+def test_a_roll_number_held_by_another_student_is_rejected(client, db):
+    client.post("/enroll", json={"student_name": "import-ada", "class_name": "import-a", "roll_number": "IMP-1"})
+    response = import_csv(client, (
+        "student_name,class_name,roll_number\n"
+        "import-bo,import-a,IMP-1\n"
+        "import-bo,import-a,IMP-2\n"
+        "import-cy,import-a,IMP-2\n"
+    ))
+    body = response.json()
+    assert response.status_code == 200
+    assert body["errors"] == 2
+    assert [(sample["line"], sample["detail"]) for sample in body["error_samples"]] == [
+        (2, "Roll number IMP-1 already belongs to another student"),
+        (4, "Roll number IMP-2 already belongs to another student"),
+    ]
+    assert rolls(db, "import-ada", "import-bo", "import-cy") == ("IMP-1", "IMP-2", None)
+
+
+def test_a_moved_roll_number_is_free_for_later_rows(client, db):
+    client.post("/enroll", json={"student_name": "import-di", "class_name": "import-b", "roll_number": "IMP-3"})
+    client.post("/enroll", json={"student_name": "import-ed", "class_name": "import-b", "roll_number": "IMP-4"})
+    response = import_csv(client, (
+        "student_name,class_name,roll_number\n"
+        "import-ed,import-b,IMP-5\n"
+        "import-di,import-b,IMP-4\n"
+        "import-fay,import-b,IMP-3\n"
+    ))
+    assert response.json()["errors"] == 0
+    assert rolls(db, "import-di", "import-ed", "import-fay") == ("IMP-4", "IMP-5", "IMP-3")
+
+
+def test_a_blank_roll_number_keeps_the_current_one(client, db):
+    client.post("/enroll", json={"student_name": "import-gus", "class_name": "import-c", "roll_number": "IMP-6"})
+    response = import_csv(client, (
+        "student_name,class_name,roll_number\n"
+        "import-gus,import-c,\n"
+        "import-gus,import-d,\n"
+    ))
+    body = response.json()
+    assert (body["errors"], body["enrollments_created"], body["enrollments_existing"]) == (0, 1, 1)
+    assert rolls(db, "import-gus") == ("IMP-6",)
+
+
+def test_rows_are_checked_against_rows_in_earlier_chunks(client, db, monkeypatch):
+    monkeypatch.setattr(enroll, "IMPORT_CHUNK_ROWS", 1)
+    response = import_csv(client, (
+        "student_name,class_name,roll_number\n"
+        "import-hal,import-e,IMP-7\n"
+        "import-ivy,import-e,IMP-7\n"
+        "import-hal,import-e,IMP-8\n"
+        "import-ivy,import-e,IMP-7\n"
+    ))
+    body = response.json()
+    assert (body["rows"], body["errors"]) == (4, 1)
+    assert body["error_samples"][0]["line"] == 3
+    assert rolls(db, "import-hal", "import-ivy") == ("IMP-8", "IMP-7")
+    hal = db.query(Student.id).filter_by(name="import-hal").scalar()
+    assert db.query(Enrollment).filter_by(student_id=hal).count() == 1
+
+
+@pytest.mark.parametrize("text, detail", [
+    ("student_name,roll_number\nimport-jo,IMP-9\n", "CSV is missing columns: class_name"),
+    (",import-f,IMP-9\n", "CSV is missing columns: student_name, class_name"),
+])
+def test_missing_columns_reject_the_file(client, text, detail):
+    response = import_csv(client, text)
+    assert response.status_code == 400
+    assert response.json()["detail"] == detail
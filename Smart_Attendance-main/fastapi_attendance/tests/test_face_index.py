@@ -0,0 +1,49 @@
+import numpy as np
+
+from app.config import settings
+from app.services.face_index import ClassFaceMatrix, normalize, top_k_matches
+
+
+def unit(rng, count):
+    return normalize(rng.standard_normal((count, settings.face_embedding_dim)))
+
+
+def brute_force(vectors, roll_numbers, query, top_k):
+    best = {}
+    for vector, roll_number in zip(vectors, roll_numbers):
+        best[roll_number] = max(best.get(roll_number, -2.0), float(vector @ query))
+    return sorted(best.items(), key=lambda item: -item[1])[:top_k]
+
+
+def test_many_captures_of_one_student_do_not_crowd_out_others(client):
+    rng = np.random.default_rng(3)
+    query = unit(rng, 1)[0]
+    # Twenty near-identical captures of one student, all closer than anyone else
+    crowd = normalize(query + 0.01 * rng.standard_normal((20, settings.face_embedding_dim)))
+    others = unit(rng, 2)
+    body = {"class_name": "faces-crowd", "embeddings": [query.tolist()], "top_k": 3}
+    client.post("/enroll", json={"student_name": "faces-crowd", "class_name": "faces-crowd"})
+    for roll_number, embeddings in (("F-CROWD", crowd), ("F-1", others[:1]), ("F-2", others[1:])):
+        response = client.post("/face_embeddings", json={
+            "class_name": "faces-crowd", "roll_number": roll_number, "embeddings": embeddings.tolist(),
+        })
+        assert response.status_code == 200
+
+    match = client.post("/identify_face", json=body).json()["matches"][0]
+    assert match["roll_number"] == "F-CROWD"
+    assert sorted(candidate["roll_number"] for candidate in match["candidates"]) == ["F-1", "F-2", "F-CROWD"]
+
+
+def test_top_k_matches_agrees_with_a_brute_force_search():
+    rng = np.random.default_rng(5)
+    matrix = ClassFaceMatrix(settings.face_embedding_dim)
+    roll_numbers = [f"R{index}" for index in rng.integers(0, 40, 300)]
+    for start in range(0, 300, 100):
+        matrix.append(unit(rng, 100), roll_numbers[start:start + 100], start + 100)
+    vectors, _ = matrix.snapshot()
+    queries = unit(rng, 5)
+
+    for query, found in zip(queries, top_k_matches(vectors, matrix.groups(), queries, 5)):
+        expected = brute_force(vectors, roll_numbers, query, 5)
+        assert [roll for roll, _ in found] == [roll for roll, _ in expected]
+        assert np.allclose([score for _, score in found], [score for _, score in expected], atol=1e-5)
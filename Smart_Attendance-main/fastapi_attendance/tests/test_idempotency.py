@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from app.models.models import IdempotencyKey, ODRequest
+from app.services.idempotency import key_digest, request_fingerprint
+
+
+def od_batch(roll_number):
+    return {"operations": [{
+        "type": "od_request", "local_key": "od", "student_name": "idem-student",
+        "roll_number": roll_number, "date": "2025-01-06", "reason": "Sports meet",
+    }]}
+
+
+def od_count(db, roll_number):
+    return db.query(ODRequest).filter_by(roll_number=roll_number).count()
+
+
+def test_first_request_claims_and_retries_replay_it(client, db):
+    headers = {"Idempotency-Key": "idem-replay"}
+    first = client.post("/sync/batch", json=od_batch("IDEM-1"), headers=headers)
+    retry = client.post("/sync/batch", json=od_batch("IDEM-1"), headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.content == first.content
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    for name in ("content-type", "content-length"):
+        assert retry.headers[name] == first.headers[name]
+    assert od_count(db, "IDEM-1") == 1
+
+
+def test_keys_are_scoped_to_the_caller(client, db):
+    first = client.post("/sync/batch", json=od_batch("IDEM-2"), headers={"Idempotency-Key": "idem-scope"})
+    other = client.post("/sync/batch", json=od_batch("IDEM-2"), headers={
+        "Idempotency-Key": "idem-scope", "Authorization": "Bearer someone-else",
+    })
+    assert first.status_code == other.status_code == 200
+    assert "idempotent-replayed" not in other.headers
+    assert od_count(db, "IDEM-2") == 2
+
+
+def test_reusing_a_key_for_another_request_conflicts(client):
+    headers = {"Idempotency-Key": "idem-mismatch"}
+    assert client.post("/sync/batch", json=od_batch("IDEM-3"), headers=headers).status_code == 200
+    response = client.post("/enroll", json={"student_name": "idem-x", "class_name": "idem"}, headers=headers)
+    assert response.status_code == 422
+
+
+def test_running_claim_conflicts_until_its_lease_lapses(client, db):
+    digest = key_digest(b"", b"idem-running")
+    db.add(IdempotencyKey(
+        key=digest,
+        fingerprint=request_fingerprint("POST", "/sync/batch", b""),
+        expires_at=datetime.utcnow() + timedelta(minutes=5),
+    ))
+    db.commit()
+    headers = {"Idempotency-Key": "idem-running"}
+
+    running = client.post("/sync/batch", json=od_batch("IDEM-4"), headers=headers)
+    assert running.status_code == 409
+    assert running.headers["retry-after"] == "1"
+    assert od_count(db, "IDEM-4") == 0
+
+    db.query(IdempotencyKey).filter_by(key=digest).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    taken_over = client.post("/sync/batch", json=od_batch("IDEM-4"), headers=headers)
+    assert taken_over.status_code == 200
+    assert od_count(db, "IDEM-4") == 1
+
+
+def test_client_errors_are_stored_for_replay(client, db):
+    headers = {"Idempotency-Key": "idem-invalid"}
+    invalid = client.post("/sync/batch", json={"operations": "nope"}, headers=headers)
+    assert invalid.status_code == 422
+    assert client.post("/sync/batch", json={"operations": "nope"}, headers=headers).headers["idempotent-replayed"] == "true"
+
+    row = db.query(IdempotencyKey).filter_by(key=key_digest(b"", b"idem-invalid")).one()
+    assert row.status_code == 422
@@ -0,0 +1,73 @@
+"""The hot read/write queries are served by indexes on SQLite.
+
+Builds each query the way the routers do, runs ``EXPLAIN QUERY PLAN`` on the
+migrated test database and fails if any step scans a table without an index
+or sorts with a temporary B-tree.
+"""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import text
+
+
+def hot_queries():
+    from sqlalchemy import select
+    from app.models.models import Attendance, BusSync, Class, Enrollment, ODRequest, Student, StudentBLEData
+
+    on = date(2025, 1, 6)
+    return {
+        "class_attendance": select(Attendance, Student)
+        .join(Student, Student.id == Attendance.student_id)
+        .where(Attendance.class_id == 1, Attendance.date == on),
+        "class_attendance_range": select(Student.id, Student.name, Attendance.date, Attendance.status)
+        .select_from(Enrollment)
+        .join(Student, Student.id == Enrollment.student_id)
+        .outerjoin(Attendance, (Attendance.student_id == Enrollment.student_id)
+                   & (Attendance.class_id == Enrollment.class_id)
+                   & Attendance.date.between(on, date(2025, 4, 5)))
+        .where(Enrollment.class_id == 1),
+        "attendance_export": select(Class.name, Student.name, Attendance.date, Attendance.status)
+        .join(Class, Class.id == Attendance.class_id)
+        .join(Student, Student.id == Attendance.student_id)
+        .where(Attendance.class_id == 1, Attendance.date >= on)
+        .order_by(Attendance.class_id, Attendance.date),
+        "class_roster": select(Enrollment.student_id).where(Enrollment.class_id == 1),
+        "roll_call_enrollment": select(Enrollment.student_id).where(
+            Enrollment.class_id == 1, Enrollment.student_id.in_([1, 2, 3])
+        ),
+        "sync_students": select(StudentBLEData).where(StudentBLEData.bus_sync_id == 1),
+        "sync_history": select(BusSync).order_by(BusSync.sync_timestamp.desc()).limit(50),
+        "retention_purge": select(BusSync.id)
+        .where(BusSync.purged_at.is_(None), BusSync.sync_timestamp < datetime(2025, 1, 6)).limit(50),
+        "od_by_status": select(ODRequest).where(ODRequest.status == "pending")
+        .order_by(ODRequest.id.desc()).limit(51),
+        "od_by_roll_number": select(ODRequest).where(ODRequest.roll_number == "R1")
+        .order_by(ODRequest.id.desc()).limit(51),
+        "od_by_status_and_roll_number": select(ODRequest)
+        .where(ODRequest.status == "pending", ODRequest.roll_number == "R1")
+        .order_by(ODRequest.id.desc()).limit(51),
+    }
+
+
+def problems(plan_rows):
+    """Plan steps that scan a table without an index or sort with a temporary B-tree."""
+    found = []
+    for row in plan_rows:
+        detail = row[-1]
+        if detail.startswith("SCAN") and "USING" not in detail:
+            found.append(detail)
+        if "USE TEMP B-TREE" in detail:
+            found.append(detail)
+    return found
+
+
+@pytest.mark.parametrize("name", sorted(hot_queries()))
+def test_query_uses_indexes(name):
+    from app.db.migrations import run_migrations
+    from app.db.session import engine
+
+    run_migrations()
+    sql = str(hot_queries()[name].compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    assert problems(plan) == [], " | ".join(row[-1] for row in plan)
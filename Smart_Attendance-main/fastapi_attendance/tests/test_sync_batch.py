@@ -0,0 +1,83 @@
+from app.models.models import Attendance, ODRequest, Student
+
+
+def enrollment(key, name, class_name, roll_number=None):
+    return {"type": "enrollment", "local_key": key, "student_name": name,
+            "class_name": class_name, "roll_number": roll_number}
+
+
+def attendance(key, name, class_name, status="present"):
+    return {"type": "attendance", "local_key": key, "student_name": name,
+            "class_name": class_name, "date": "2025-01-06", "status": status}
+
+
+def test_every_operation_gets_its_outcome(client, db):
+    client.post("/enroll", json={"student_name": "batch-holder", "class_name": "batch-other", "roll_number": "BATCH-R1"})
+    client.post("/enroll", json={"student_name": "batch-outsider", "class_name": "batch-other"})
+    response = client.post("/sync/batch", json={"operations": [
+        attendance("mark-new", "batch-new", "batch-class"),
+        enrollment("enroll-new", "batch-new", "batch-class", "BATCH-R2"),
+        enrollment("enroll-again", "batch-new", "batch-class"),
+        enrollment("roll-taken", "batch-thief", "batch-class", "BATCH-R1"),
+        attendance("unknown-student", "batch-nobody", "batch-class"),
+        attendance("not-enrolled", "batch-outsider", "batch-class"),
+        attendance("unknown-class", "batch-new", "batch-missing"),
+        {"type": "od_request", "local_key": "od", "student_name": "batch-new", "roll_number": "BATCH-R2",
+         "date": "2025-01-06", "reason": "Sports meet"},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    outcomes = {key: result["outcome"] for key, result in body["results"].items()}
+    assert outcomes == {
+        "mark-new": "marked",
+        "enroll-new": "enrolled",
+        "enroll-again": "already_enrolled",
+        "roll-taken": "roll_number_conflict",
+        "unknown-student": "student_not_found",
+        "not-enrolled": "not_enrolled",
+        "unknown-class": "class_not_found",
+        "od": "submitted",
+    }
+    assert list(body["results"]) == list(outcomes)  # request order
+    assert (body["applied"], body["failed"]) == (4, 4)
+
+    student = db.query(Student).filter_by(name="batch-new").one()
+    assert body["results"]["enroll-new"]["id"] == body["results"]["enroll-again"]["id"] == student.id
+    assert student.roll_number == "BATCH-R2"
+    assert db.query(Student).filter_by(name="batch-thief").one_or_none() is None
+    assert db.query(Attendance).filter_by(student_id=student.id).one().status == "present"
+    assert db.get(ODRequest, body["results"]["od"]["id"]).status == "pending"
+
+
+def test_last_mark_for_a_student_and_day_wins(client, db):
+    client.post("/enroll", json={"student_name": "batch-twice", "class_name": "batch-twice"})
+    response = client.post("/sync/batch", json={"operations": [
+        attendance("first", "batch-twice", "batch-twice", "absent"),
+        attendance("second", "batch-twice", "batch-twice", "present"),
+    ]})
+    assert response.json()["applied"] == 2
+    student_id = db.query(Student.id).filter_by(name="batch-twice").scalar()
+    assert db.query(Attendance.status).filter_by(student_id=student_id).scalar() == "present"
+
+
+def test_roll_numbers_can_change_hands_within_a_batch(client, db):
+    client.post("/enroll", json={"student_name": "batch-ann", "class_name": "batch-swap", "roll_number": "SWAP-1"})
+    client.post("/enroll", json={"student_name": "batch-ben", "class_name": "batch-swap", "roll_number": "SWAP-2"})
+    response = client.post("/sync/batch", json={"operations": [
+        enrollment("ben", "batch-ben", "batch-swap", "SWAP-3"),
+        enrollment("ann", "batch-ann", "batch-swap", "SWAP-2"),
+        enrollment("cal", "batch-cal", "batch-swap", "SWAP-1"),
+    ]})
+    assert response.status_code == 200
+    assert response.json()["failed"] == 0
+    rolls = dict(db.query(Student.name, Student.roll_number).filter(Student.name.like("batch-%")))
+    assert (rolls["batch-ann"], rolls["batch-ben"], rolls["batch-cal"]) == ("SWAP-2", "SWAP-3", "SWAP-1")
+
+
+def test_malformed_batches_are_rejected_whole(client, db):
+    duplicate_keys = client.post("/sync/batch", json={"operations": [
+        enrollment("same", "batch-dup", "batch-dup"),
+        enrollment("same", "batch-dup", "batch-dup"),
+    ]})
+    assert duplicate_keys.status_code == 422
+    assert db.query(Student).filter_by(name="batch-dup").one_or_none() is None
@@ -0,0 +1,31 @@
+import os
+
+from app.models.models import Blob
+from app.services.upload_store import blob_path
+
+
+def upload(client, roll, content, name="face.jpg"):
+    response = client.post("/upload_face", data={"student_roll": roll},
+                           files={"image": (name, content, "image/jpeg")})
+    assert response.status_code == 200
+    return response.json()
+
+
+def listed(client, roll):
+    return [row["filename"] for row in client.get("/list_uploads", params={"student_roll": roll}).json()["uploads"]]
+
+
+def test_rows_whose_blob_was_deleted_drop_out_of_the_listing(client, db):
+    kept = upload(client, "UP-1", b"kept face")
+    lost = upload(client, "UP-2", b"lost face")
+    again = upload(client, "UP-2", b"lost face", "copy.jpg")
+    assert lost["sha256"] == again["sha256"]
+    assert db.get(Blob, lost["sha256"]).refcount == 2
+
+    os.unlink(blob_path(lost["sha256"]))
+
+    assert listed(client, "UP-2") == []
+    assert listed(client, "UP-1") == [kept["filename"]]
+    db.expire_all()
+    assert db.get(Blob, lost["sha256"]).refcount == 0
+    assert db.get(Blob, kept["sha256"]).refcount == 1
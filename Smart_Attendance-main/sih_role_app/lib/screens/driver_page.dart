@@ -32,6 +32,10 @@ class _DriverPageState extends State<DriverPage> {
   // Offline storage
   static const String _offlineDataKey = 'driver_ble_data';
 
+  // Idempotency-Key for the current batch; kept across retries of an
+  // unchanged batch and dropped whenever the batch changes
+  String? _syncKey;
+
   @override
   void initState() {
     super.initState();
@@ -165,6 +169,7 @@ class _DriverPageState extends State<DriverPage> {
     setState(() {
       _collectedStudents[rollNumber] = studentData;
       _updateStudentList();
+      _syncKey = null;
     });
 
     // Save to offline storage
@@ -195,10 +200,14 @@ class _DriverPageState extends State<DriverPage> {
         'timestamp': DateTime.now().toIso8601String(),
         'students': _collectedStudents.values.map((e) => e.toJson()).toList(),
       };
+      _syncKey ??= 'bus-sync-${DateTime.now().microsecondsSinceEpoch}';
 
       final response = await http.post(
         Uri.parse('http://localhost:8000/bus_sync'),
-        headers: {'Content-Type': 'application/json'},
+        headers: {
+          'Content-Type': 'application/json',
+          'Idempotency-Key': _syncKey!,
+        },
         body: jsonEncode(syncData),
       );
 
@@ -210,6 +219,7 @@ class _DriverPageState extends State<DriverPage> {
         setState(() {
           _collectedStudents.clear();
           _studentList.clear();
+          _syncKey = null;
         });
         
         _showStatus('Data synced successfully! ${_collectedStudents.length} students', Colors.green);
@@ -232,6 +242,7 @@ class _DriverPageState extends State<DriverPage> {
     setState(() {
       _collectedStudents.clear();
       _studentList.clear();
+      _syncKey = null;
     });
     _saveOfflineData();
     _showStatus('Collected data cleared', Colors.orange);
@@ -22,6 +22,7 @@ class _TeacherPageState extends State<TeacherPage> with TickerProviderStateMixin
   
   List<AttendanceRecord> _attendanceRecords = [];
   List<ODRequest> _odRequests = [];
+  int? _odNextCursor;
   List<AnalyticsData> _analyticsData = [];
   
   late TabController _tabController;
@@ -102,18 +103,21 @@ class _TeacherPageState extends State<TeacherPage> with TickerProviderStateMixin
     }
   }
 
-  Future<void> _fetchODRequests() async {
+  Future<void> _fetchODRequests({bool loadMore = false}) async {
     try {
+      final query = loadMore && _odNextCursor != null ? '?cursor=$_odNextCursor' : '';
       final response = await http.get(
-        Uri.parse('http://localhost:8000/od_requests'),
+        Uri.parse('http://localhost:8000/od_requests$query'),
       );
 
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
+        final page = (data['requests'] as List)
+            .map((request) => ODRequest.fromJson(request))
+            .toList();
         setState(() {
-          _odRequests = (data['requests'] as List)
-              .map((request) => ODRequest.fromJson(request))
-              .toList();
+          _odRequests = loadMore ? [..._odRequests, ...page] : page;
+          _odNextCursor = data['next_cursor'] as int?;
         });
       }
     } catch (e) {
@@ -416,6 +420,12 @@ class _TeacherPageState extends State<TeacherPage> with TickerProviderStateMixin
             )
           else
             ..._odRequests.map((request) => _buildODRequestCard(request)),
+
+          if (_odNextCursor != null)
+            TextButton(
+              onPressed: () => _fetchODRequests(loadMore: true),
+              child: const Text('Load more'),
+            ),
           
           // Status Message
           if (_statusMessage.isNotEmpty)
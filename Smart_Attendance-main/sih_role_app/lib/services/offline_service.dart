@@ -127,6 +127,14 @@ class OfflineService {
   }
 
   // Sync methods
+
+  /// Idempotency-Key for a queued record: stable across every retry of the
+  /// same record, so the server replays its first response instead of
+  /// writing the record twice.
+  static String _idempotencyKey(String box, HiveObject record, DateTime timestamp) {
+    return '$box-${record.key}-${timestamp.microsecondsSinceEpoch}';
+  }
+
   static Future<bool> isOnline() async {
     final connectivityResult = await Connectivity().checkConnectivity();
     return connectivityResult != ConnectivityResult.none;
@@ -135,33 +143,95 @@ class OfflineService {
   static Future<void> syncAllData() async {
     if (!await isOnline()) return;
 
-    await _syncAttendance();
+    await _syncBatch();
     await _syncODRequests();
-    await _syncEnrollments();
   }
 
-  static Future<void> _syncAttendance() async {
-    final unsyncedAttendance = getUnsyncedAttendance();
-    
-    for (final attendance in unsyncedAttendance) {
+  // Queued records go to /sync/batch in chunks of at most this many
+  static const int _maxBatchOperations = 1000;
+  static const Set<String> _appliedOutcomes = {'marked', 'enrolled', 'already_enrolled', 'submitted'};
+  // Idempotency-Key per pending chunk (by its local keys), reused until it succeeds
+  static final Map<String, String> _batchKeys = {};
+
+  static Future<void> _markSynced(HiveObject record) async {
+    if (record is OfflineAttendance) {
+      record.synced = true;
+    } else if (record is OfflineEnrollment) {
+      record.synced = true;
+    } else if (record is OfflineODRequest) {
+      record.synced = true;
+    }
+    await record.save();
+  }
+
+  /// Attendance, enrollments and attachment-less OD requests in one
+  /// round trip per chunk; each record is marked synced from its own result.
+  static Future<void> _syncBatch() async {
+    final records = <String, HiveObject>{};
+    final operations = <Map<String, dynamic>>[];
+
+    for (final enrollment in getUnsyncedEnrollments()) {
+      final key = _idempotencyKey(_enrollmentBox, enrollment, enrollment.timestamp);
+      records[key] = enrollment;
+      operations.add({
+        'type': 'enrollment',
+        'local_key': key,
+        'student_name': enrollment.studentName,
+        'class_name': enrollment.className,
+        if (enrollment.rollNumber.isNotEmpty) 'roll_number': enrollment.rollNumber,
+      });
+    }
+    for (final attendance in getUnsyncedAttendance()) {
+      final key = _idempotencyKey(_attendanceBox, attendance, attendance.timestamp);
+      records[key] = attendance;
+      operations.add({...attendance.toJson(), 'type': 'attendance', 'local_key': key});
+    }
+    for (final request in getUnsyncedODRequests().where((request) => request.filePath.isEmpty)) {
+      final key = _idempotencyKey(_odRequestBox, request, request.timestamp);
+      records[key] = request;
+      operations.add({
+        'type': 'od_request',
+        'local_key': key,
+        'student_name': request.studentName,
+        'roll_number': request.rollNumber,
+        'date': request.date,
+        'reason': request.reason,
+      });
+    }
+
+    for (var start = 0; start < operations.length; start += _maxBatchOperations) {
+      final end = start + _maxBatchOperations < operations.length ? start + _maxBatchOperations : operations.length;
+      final chunk = operations.sublist(start, end);
+      final signature = chunk.map((operation) => operation['local_key']).join(',');
+      final batchKey = _batchKeys.putIfAbsent(signature, () => 'batch-${DateTime.now().microsecondsSinceEpoch}');
       try {
         final response = await http.post(
-          Uri.parse('http://localhost:8000/mark_attendance'),
-          headers: {'Content-Type': 'application/json'},
-          body: jsonEncode(attendance.toJson()),
+          Uri.parse('http://localhost:8000/sync/batch'),
+          headers: {
+            'Content-Type': 'application/json',
+            'Idempotency-Key': batchKey,
+          },
+          body: jsonEncode({'operations': chunk}),
         );
 
         if (response.statusCode == 200) {
-          await markAttendanceSynced(attendance.key.toString());
+          _batchKeys.remove(signature);
+          final results = jsonDecode(response.body)['results'] as Map<String, dynamic>;
+          for (final entry in results.entries) {
+            if (_appliedOutcomes.contains(entry.value['outcome'])) {
+              await _markSynced(records[entry.key]!);
+            }
+          }
         }
       } catch (e) {
-        print('Error syncing attendance: $e');
+        print('Error syncing batch: $e');
       }
     }
   }
 
+  /// OD requests with an attachment, uploaded one by one as multipart forms.
   static Future<void> _syncODRequests() async {
-    final unsyncedRequests = getUnsyncedODRequests();
+    final unsyncedRequests = getUnsyncedODRequests().where((request) => request.filePath.isNotEmpty);
     
     for (final request in unsyncedRequests) {
       try {
@@ -170,6 +240,8 @@ class OfflineService {
           Uri.parse('http://localhost:8000/od_requests'),
         );
 
+        multipartRequest.headers['Idempotency-Key'] =
+            _idempotencyKey(_odRequestBox, request, request.timestamp);
         multipartRequest.fields['student_name'] = request.studentName;
         multipartRequest.fields['roll_number'] = request.rollNumber;
         multipartRequest.fields['date'] = request.date;
@@ -194,26 +266,6 @@ class OfflineService {
     }
   }
 
-  static Future<void> _syncEnrollments() async {
-    final unsyncedEnrollments = getUnsyncedEnrollments();
-    
-    for (final enrollment in unsyncedEnrollments) {
-      try {
-        final response = await http.post(
-          Uri.parse('http://localhost:8000/enroll'),
-          headers: {'Content-Type': 'application/json'},
-          body: jsonEncode(enrollment.toJson()),
-        );
-
-        if (response.statusCode == 200) {
-          await markEnrollmentSynced(enrollment.key.toString());
-        }
-      } catch (e) {
-        print('Error syncing enrollment: $e');
-      }
-    }
-  }
-
   // Cleanup methods
   static Future<void> clearSyncedData() async {
     // Remove synced attendance records older than 7 days